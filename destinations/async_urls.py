@@ -0,0 +1,9 @@
+from django.urls import path
+from . import async_views
+
+app_name = 'destinations_async'
+
+urlpatterns = [
+    path('destinations/', async_views.destination_list, name='destination-list'),
+    path('destinations/active-destinations/', async_views.active_destinations, name='destination-active'),
+]
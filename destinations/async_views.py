@@ -0,0 +1,32 @@
+from evolutionflyapp.async_api import async_api_view, async_condition, json_response
+from . import cache as destination_cache
+from .models import Destination
+from .serializers import DestinationSerializer
+
+async def destinations_etag(request, *args, **kwargs):
+    return f'destinations-{await destination_cache.aget_version()}'
+
+conditional_get = async_condition(etag_func=destinations_etag)
+
+async def _cached_list(name, queryset):
+    # Same cache entries as DestinationViewSet, so both deployments share them
+    destinations = await destination_cache.aget_cached(name)
+    
+    if destinations is None:
+        destinations = DestinationSerializer([destination async for destination in queryset], many=True).data
+        await destination_cache.aset_cached(name, destinations)
+    
+    return destinations
+
+@async_api_view
+@conditional_get
+async def destination_list(request):
+    """Async version of DestinationViewSet.list"""
+    return json_response(await _cached_list('all', Destination.objects.all()))
+
+@async_api_view
+@conditional_get
+async def active_destinations(request):
+    """Async version of DestinationViewSet.active_destinations"""
+    queryset = Destination.objects.filter(is_active=True).order_by('name')
+    return json_response(await _cached_list('active', queryset))
@@ -0,0 +1,53 @@
+import time
+from django.core.cache import cache
+from django.db import transaction
+
+# All destination read paths share one namespace. Entries are stored with
+# Django's cache `version` argument set to the namespace version, so bumping
+# the version makes every cached destination payload unreachable at once.
+VERSION_KEY = 'destinations:version'
+TIMEOUT = 3600
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seed from the clock so an evicted counter never reuses an old version
+        cache.add(VERSION_KEY, int(time.time()), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+async def aget_version():
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, int(time.time()), timeout=None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+def bump_version():
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        # Counter missing or evicted: start a fresh namespace
+        version = int(time.time())
+        cache.set(VERSION_KEY, version, timeout=None)
+        return version
+
+def invalidate():
+    """
+    Bump the namespace now and again once the current transaction commits,
+    so a reader that cached pre-commit rows in between is also discarded
+    """
+    bump_version()
+    transaction.on_commit(bump_version)
+
+def get_cached(name, default=None):
+    return cache.get(f'destinations:{name}', default, version=get_version())
+
+def set_cached(name, value):
+    cache.set(f'destinations:{name}', value, timeout=TIMEOUT, version=get_version())
+
+async def aget_cached(name, default=None):
+    return await cache.aget(f'destinations:{name}', default, version=await aget_version())
+
+async def aset_cached(name, value):
+    await cache.aset(f'destinations:{name}', value, timeout=TIMEOUT, version=await aget_version())
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-17 01:10
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('destinations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='destination',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('name', 'code', config='simple'), name='destination_search_idx'),
+        ),
+    ]
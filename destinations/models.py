@@ -1,5 +1,33 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 from django.db import models
-from django.core.cache import cache
+from . import cache as destination_cache
+
+def search_vector():
+    """
+    Document searched by flight request search; filters must use this exact
+    expression for PostgreSQL to match it against destination_search_idx
+    """
+    return SearchVector('name', 'code', config='simple')
+
+class DestinationQuerySet(models.QuerySet):
+    """
+    Bulk writes bypass model signals, so they invalidate the cache here
+    """
+    def update(self, **kwargs):
+        updated = super().update(**kwargs)
+        destination_cache.invalidate()
+        return updated
+    
+    def bulk_create(self, *args, **kwargs):
+        created = super().bulk_create(*args, **kwargs)
+        destination_cache.invalidate()
+        return created
+    
+    def bulk_update(self, *args, **kwargs):
+        updated = super().bulk_update(*args, **kwargs)
+        destination_cache.invalidate()
+        return updated
 
 class Destination(models.Model):
     """
@@ -28,36 +56,30 @@ class Destination(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = DestinationQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Destino'
         verbose_name_plural = 'Destinos'
         ordering = ['name']
+        indexes = [
+            GinIndex(search_vector(), name='destination_search_idx'),
+        ]
         
     def __str__(self):
         return f"{self.name} ({self.code})"
     
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # Clear cache when destination is modified
-        cache.delete('destinations_list')
-    
-    def delete(self, *args, **kwargs):
-        super().delete(*args, **kwargs)
-        # Clear cache when destination is deleted
-        cache.delete('destinations_list')
-    
     @classmethod
     def get_active_destinations(cls):
         """
         Get all active destinations from cache or database
         """
-        cache_key = 'destinations_list'
-        destinations = cache.get(cache_key)
+        destinations = destination_cache.get_cached('active_list')
         
         if destinations is None:
             destinations = list(cls.objects.filter(is_active=True).values(
                 'id', 'name', 'code', 'description'
             ))
-            cache.set(cache_key, destinations, timeout=3600)  # Cache for 1 hour
+            destination_cache.set_cached('active_list', destinations)
             
         return destinations
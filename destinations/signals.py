@@ -0,0 +1,9 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from . import cache as destination_cache
+from .models import Destination
+
+@receiver(post_save, sender=Destination)
+@receiver(post_delete, sender=Destination)
+def invalidate_destination_cache(sender, **kwargs):
+    destination_cache.invalidate()
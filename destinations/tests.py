@@ -1,5 +1,9 @@
+import time
 from django.test import TestCase
 from django.core.cache import cache
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+from users.models import User
 from destinations.models import Destination
 
 class DestinationModelTest(TestCase):
@@ -74,3 +78,95 @@ class DestinationModelTest(TestCase):
         # Cache should be cleared (we can't directly test this, but ensure method works)
         active_destinations = Destination.get_active_destinations()
         self.assertIsInstance(active_destinations, list)
+
+class DestinationCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='client',
+            email='client@example.com',
+            password='clientpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.quito = Destination.objects.create(name='Quito', code='UIO', is_active=True)
+        self.cuenca = Destination.objects.create(name='Cuenca', code='CUE', is_active=True)
+
+    def active_codes(self):
+        response = self.client.get('/api/destinations/destinations/active-destinations/')
+        return [dest['code'] for dest in response.data]
+
+    def test_cached_reads_do_not_query(self):
+        """Test that warm read paths are served from the cache"""
+        self.active_codes()
+        self.client.get('/api/destinations/destinations/')
+        Destination.get_active_destinations()
+        
+        with self.assertNumQueries(0):
+            self.active_codes()
+            self.client.get('/api/destinations/destinations/')
+            Destination.get_active_destinations()
+
+    def test_save_invalidates_every_read_path(self):
+        """Test that saving a destination refreshes all cached payloads"""
+        self.assertEqual(self.active_codes(), ['CUE', 'UIO'])
+        Destination.get_active_destinations()
+        
+        self.quito.name = 'San Francisco de Quito'
+        self.quito.save()
+        
+        names = [dest['name'] for dest in self.client.get('/api/destinations/destinations/').data]
+        self.assertIn('San Francisco de Quito', names)
+        names = [dest['name'] for dest in Destination.get_active_destinations()]
+        self.assertIn('San Francisco de Quito', names)
+
+    def test_bulk_update_invalidates(self):
+        """Test that queryset.update(), as used by admin actions, invalidates"""
+        self.assertEqual(self.active_codes(), ['CUE', 'UIO'])
+        
+        Destination.objects.filter(code='UIO').update(is_active=False)
+        
+        self.assertEqual(self.active_codes(), ['CUE'])
+        self.assertEqual([dest['code'] for dest in Destination.get_active_destinations()], ['CUE'])
+
+    def test_delete_invalidates(self):
+        """Test that deleting a destination invalidates"""
+        self.assertEqual(self.active_codes(), ['CUE', 'UIO'])
+        
+        self.cuenca.delete()
+        
+        self.assertEqual(self.active_codes(), ['UIO'])
+
+    def test_empty_result_is_cached(self):
+        """Test that an empty active list is cached too"""
+        Destination.objects.update(is_active=False)
+        self.active_codes()
+        
+        with self.assertNumQueries(0):
+            self.assertEqual(self.active_codes(), [])
+
+    def test_conditional_get_returns_not_modified(self):
+        """Test ETag revalidation on the destination lists"""
+        for url in ('/api/destinations/destinations/', '/api/destinations/destinations/active-destinations/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('Last-Modified', response.headers)
+            etag = response.headers['ETag']
+            
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            
+            self.quito.save()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since_alone_is_not_a_validator(self):
+        """Test that a bulk update is never hidden behind If-Modified-Since"""
+        url = '/api/destinations/destinations/active-destinations/'
+        since = http_date(time.time() + 60)
+        Destination.objects.update(is_active=False)
+        
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [])
@@ -2,10 +2,23 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.core.cache import cache
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from . import cache as destination_cache
 from .models import Destination
 from .serializers import DestinationSerializer
 
+def destinations_etag(request, *args, **kwargs):
+    # Every cached destination payload belongs to the current namespace version
+    return f'destinations-{destination_cache.get_version()}'
+
+# Clients always revalidate, and get a 304 while the version is unchanged.
+# The ETag is the only validator: bulk updates keep updated_at and deletes
+# can lower its MAX, so a Last-Modified date would miss changes.
+revalidate = method_decorator(cache_control(private=True, no_cache=True))
+conditional_get = method_decorator(condition(etag_func=destinations_etag))
+
 class DestinationViewSet(viewsets.ModelViewSet):
     """
     ViewSet for managing destinations
@@ -21,29 +34,30 @@ class DestinationViewSet(viewsets.ModelViewSet):
         return super().get_permissions()
 
     @action(detail=False, methods=['get'], url_path='active-destinations')
+    @revalidate
+    @conditional_get
     def active_destinations(self, request):
         """Endpoint para obtener destinos activos (con cache)"""
-        cache_key = 'active_destinations'
-        destinations = cache.get(cache_key)
+        destinations = destination_cache.get_cached('active')
         
-        if not destinations:
-            destinations = Destination.objects.filter(is_active=True).order_by('name')
-            serializer = self.get_serializer(destinations, many=True)
-            destinations_data = serializer.data
-            cache.set(cache_key, destinations_data, 300)  # 5 minutos de cache
-            return Response(destinations_data)
+        if destinations is None:
+            queryset = Destination.objects.filter(is_active=True).order_by('name')
+            serializer = self.get_serializer(queryset, many=True)
+            destinations = serializer.data
+            destination_cache.set_cached('active', destinations)
         
         return Response(destinations)
 
+    @revalidate
+    @conditional_get
     def list(self, request, *args, **kwargs):
         """Override list para usar cache"""
-        cache_key = 'all_destinations'
-        destinations = cache.get(cache_key)
+        destinations = destination_cache.get_cached('all')
         
-        if not destinations:
+        if destinations is None:
             queryset = self.get_queryset()
             serializer = self.get_serializer(queryset, many=True)
             destinations = serializer.data
-            cache.set(cache_key, destinations, 300)  # 5 minutos de cache
+            destination_cache.set_cached('all', destinations)
         
         return Response(destinations)
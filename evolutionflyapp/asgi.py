@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'evolutionflyapp.settings')
+# Read by settings to default to per-request database connections
+os.environ.setdefault('DJANGO_ASGI', 'True')
 
 application = get_asgi_application()
@@ -0,0 +1,80 @@
+"""
+Helpers for the async read endpoints served under ASGI.
+
+DRF views are synchronous, so the async endpoints are plain Django async
+views. These helpers give them the same authentication, error bodies,
+JSON encoding and conditional GET handling as their DRF counterparts.
+"""
+import datetime
+from functools import wraps
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+from rest_framework import exceptions
+from rest_framework.utils.encoders import JSONEncoder
+from users.authentication import aauthenticate
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False)
+
+def error_response(exc):
+    # Same body as DRF's exception handler: field errors as they are
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    response = json_response(data, status=exc.status_code)
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        response.headers['WWW-Authenticate'] = 'Bearer realm="api"'
+    return response
+
+def async_api_view(view):
+    """
+    Read-only (GET/HEAD) async view for authenticated users.
+
+    Sets request.user from users.authentication.aauthenticate and marks
+    responses private/no-cache, so clients always revalidate.
+    """
+    @require_safe
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            user = await aauthenticate(request)
+            if user is None:
+                raise exceptions.NotAuthenticated()
+            request.user = user
+            response = await view(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            response = error_response(exc)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    return wrapper
+
+def async_condition(etag_func=None, last_modified_func=None):
+    """
+    django.views.decorators.http.condition for async views whose ETag and
+    Last-Modified callables are coroutines
+    """
+    def decorator(view):
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            res_last_modified = None
+            if last_modified_func:
+                if dt := await last_modified_func(request, *args, **kwargs):
+                    if not timezone.is_aware(dt):
+                        dt = timezone.make_aware(dt, datetime.timezone.utc)
+                    res_last_modified = int(dt.timestamp())
+            res_etag = await etag_func(request, *args, **kwargs) if etag_func else None
+            res_etag = quote_etag(res_etag) if res_etag is not None else None
+
+            response = get_conditional_response(request, etag=res_etag, last_modified=res_last_modified)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+
+            if request.method in ('GET', 'HEAD'):
+                if res_last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(res_last_modified)
+                if res_etag:
+                    response.headers.setdefault('ETag', res_etag)
+            return response
+        return inner
+    return decorator
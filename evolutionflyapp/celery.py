@@ -1,4 +1,6 @@
+import logging
 import os
+from datetime import timedelta
 from celery import Celery
 from django.conf import settings
 
@@ -7,6 +9,8 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'evolutionflyapp.settings')
 
 app = Celery('evolutionflyapp')
 
+logger = logging.getLogger(__name__)
+
 # Using a string here means the worker doesn't have to serialize
 # the configuration object to child processes.
 app.config_from_object('django.conf:settings', namespace='CELERY')
@@ -16,4 +20,28 @@ app.autodiscover_tasks()
 
 @app.task(bind=True)
 def debug_task(self):
-    print(f'Request: {self.request!r}')
\ No newline at end of file
+    print(f'Request: {self.request!r}')
+
+@app.task
+def purge_task_results(chunk_size=5000):
+    """
+    Delete django-db task results older than TASK_RESULT_RETENTION_DAYS.
+    Rows are deleted by id in chunks, each in its own short transaction,
+    instead of the single DELETE of Celery's backend_cleanup.
+    """
+    from django.utils import timezone
+    from django_celery_results.models import GroupResult, TaskResult
+
+    older_than = timezone.now() - timedelta(days=settings.TASK_RESULT_RETENTION_DAYS)
+    deleted = 0
+    for model in (TaskResult, GroupResult):
+        while True:
+            ids = list(
+                model.objects.filter(date_done__lt=older_than)
+                .values_list('id', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            deleted += model.objects.filter(id__in=ids).delete()[0]
+    logger.info(f'Purged {deleted} task results')
+    return {'deleted': deleted}
@@ -84,6 +84,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'evolutionflyapp.wsgi.application'
 
+# Set by evolutionflyapp.asgi before settings are loaded
+RUNNING_ASGI = config('DJANGO_ASGI', default=False, cast=bool)
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -96,6 +99,15 @@ DATABASES = {
         'PASSWORD': config('DATABASE_PASSWORD', default='password'),
         'HOST': config('DATABASE_HOST', default='localhost'),
         'PORT': config('DATABASE_PORT', default='5432'),
+        # Keep connections open between requests/tasks instead of reconnecting
+        # each time; 0 restores per-request connections, None keeps them forever.
+        # Under ASGI, sync ORM calls run in sync_to_async threads that each
+        # keep their own persistent connection, which Django does not reuse
+        # across requests, so they pile up: pool there instead (pgbouncer).
+        'CONN_MAX_AGE': config('DATABASE_CONN_MAX_AGE', default=0 if RUNNING_ASGI else 60, cast=int),
+        # Ping a persistent connection before reusing it so a dropped
+        # connection is replaced instead of failing the request.
+        'CONN_HEALTH_CHECKS': config('DATABASE_CONN_HEALTH_CHECKS', default=True, cast=bool),
     }
 }
 
@@ -152,8 +164,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'users.authentication.SignedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -162,6 +175,19 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20,
 }
 
+# Seconds a token -> user lookup is served from the cache
+AUTH_TOKEN_CACHE_TIMEOUT = config('AUTH_TOKEN_CACHE_TIMEOUT', default=60, cast=int)
+
+# Credentials issued on login/register: 'authtoken' (DB-backed, never
+# expires) or 'signed' (stateless Bearer access token + refresh token)
+AUTH_TOKEN_MODE = config('AUTH_TOKEN_MODE', default='authtoken')
+ACCESS_TOKEN_LIFETIME = config('ACCESS_TOKEN_LIFETIME', default=300, cast=int)
+REFRESH_TOKEN_LIFETIME = config('REFRESH_TOKEN_LIFETIME', default=7 * 24 * 3600, cast=int)
+# Access tokens are verified from their signature alone, so after logout they
+# stay valid until they expire. Enable to also check the revocation list on
+# every request, at the cost of one cache read.
+SIGNED_TOKEN_CHECK_REVOCATION = config('SIGNED_TOKEN_CHECK_REVOCATION', default=False, cast=bool)
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",  # React development server
@@ -207,25 +233,141 @@ else:
     CELERY_BROKER_URL = 'memory://'
     CELERY_RESULT_BACKEND = 'django-db'
     CELERY_CACHE_BACKEND = 'django-cache'
+    # Old results are deleted in chunks by purge_task_results; this turns
+    # off Celery's backend_cleanup, which deletes them in one statement
+    CELERY_RESULT_EXPIRES = None
 
 CELERY_ACCEPT_CONTENT = ['application/json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# Tasks are split by urgency so a reminder burst or a long maintenance
+# task never sits in front of a reservation confirmation. A worker started
+# without -Q consumes every queue, confirmations first; see the worker
+# profile in the README for dedicated workers per queue.
+try:
+    from kombu import Queue
+    CELERY_TASK_QUEUES = [
+        Queue(name) for name in ('confirmations', 'reminders', 'maintenance', 'celery')
+    ]
+except ImportError:
+    # Celery not installed, tasks run without a broker
+    pass
+CELERY_TASK_ROUTES = {
+    'flight_requests.tasks.dispatch_email_outbox': {'queue': 'confirmations', 'priority': 0},
+    'flight_requests.tasks.send_reservation_confirmation': {'queue': 'confirmations', 'priority': 0},
+    'flight_requests.tasks.send_reservation_confirmation_batch': {'queue': 'confirmations', 'priority': 0},
+    # Single reminders due now go before the chunks of the hourly pass
+    'flight_requests.tasks.send_flight_reminder_notification': {'queue': 'reminders', 'priority': 3},
+    'flight_requests.tasks.schedule_flight_reminders': {'queue': 'reminders', 'priority': 3},
+    'flight_requests.tasks.send_flight_reminder_batch': {'queue': 'reminders', 'priority': 6},
+    'flight_requests.tasks.check_and_send_flight_reminders': {'queue': 'reminders', 'priority': 6},
+    'flight_requests.tasks.release_expired_claims': {'queue': 'maintenance', 'priority': 9},
+    'flight_requests.tasks.reconcile_flight_request_stats': {'queue': 'maintenance', 'priority': 9},
+    'flight_requests.tasks.purge_email_outbox': {'queue': 'maintenance', 'priority': 9},
+    'users.tasks.purge_expired_sessions': {'queue': 'maintenance', 'priority': 9},
+    'evolutionflyapp.celery.purge_task_results': {'queue': 'maintenance', 'priority': 9},
+}
+
+# Every task is safe to run twice (outbox keys, row locks, idempotent
+# updates), so messages are acknowledged after the task finishes and a
+# crashed worker's message is redelivered instead of lost. Mail tasks
+# mostly wait on SMTP, so each worker process reserves only the message
+# it runs and leaves the rest of a burst to idle workers.
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# Per-request and per-minute tasks are declared with ignore_result=True
+# and only log their outcome; periodic tasks store a small dict. Failures
+# are stored either way so they can be inspected.
+CELERY_TASK_STORE_ERRORS_EVEN_IF_IGNORED = True
+TASK_RESULT_RETENTION_DAYS = config('TASK_RESULT_RETENTION_DAYS', default=7, cast=int)
+
 # Celery Beat Configuration
 try:
     from celery.schedules import crontab
     CELERY_BEAT_SCHEDULE = {
         'check-flight-reminders': {
             'task': 'flight_requests.tasks.check_and_send_flight_reminders',
-            'schedule': crontab(hour=9, minute=0),  # Every day at 9:00 AM
+            'schedule': crontab(minute=0),  # Every hour, see FLIGHT_REMINDER_SCHEDULE_WINDOW
+        },
+        'release-expired-claims': {
+            'task': 'flight_requests.tasks.release_expired_claims',
+            'schedule': crontab(minute='*'),  # Every minute
+        },
+        'reconcile-flight-request-stats': {
+            'task': 'flight_requests.tasks.reconcile_flight_request_stats',
+            'schedule': crontab(minute=30),  # Every hour
+        },
+        'dispatch-email-outbox': {
+            'task': 'flight_requests.tasks.dispatch_email_outbox',
+            'schedule': crontab(minute='*'),  # Every minute, picks up retries
+            'kwargs': {'kinds': ['reservation_confirmation']},
+        },
+        'dispatch-reminder-outbox': {
+            'task': 'flight_requests.tasks.dispatch_email_outbox',
+            'schedule': crontab(minute='*'),  # Every minute, picks up retries
+            'kwargs': {'kinds': ['flight_reminder']},
+            'options': {'queue': 'reminders', 'priority': 3},
+        },
+        'purge-email-outbox': {
+            'task': 'flight_requests.tasks.purge_email_outbox',
+            'schedule': crontab(hour=3, minute=30),  # Every day at 3:30 AM
+        },
+        'purge-expired-sessions': {
+            'task': 'users.tasks.purge_expired_sessions',
+            'schedule': crontab(hour=3, minute=0),  # Every day at 3:00 AM
+        },
+        'purge-task-results': {
+            'task': 'evolutionflyapp.celery.purge_task_results',
+            'schedule': crontab(hour=4, minute=0),  # Every day at 4:00 AM
         },
     }
 except ImportError:
     # Celery not installed, skip beat configuration
     CELERY_BEAT_SCHEDULE = {}
 
+# Reminders are sent in chunks of this many requests per task, sharing one
+# SMTP connection. Set to 1 to enqueue one task per request.
+FLIGHT_REMINDER_BATCH_SIZE = config('FLIGHT_REMINDER_BATCH_SIZE', default=100, cast=int)
+
+# Reminders are queued with an ETA once they are due within this many
+# seconds; keep it equal to the check-flight-reminders interval
+FLIGHT_REMINDER_SCHEDULE_WINDOW = config('FLIGHT_REMINDER_SCHEDULE_WINDOW', default=3600, cast=int)
+
+# The Redis transport redelivers unacknowledged messages after the
+# visibility timeout, so it must outlast the longest ETA a worker holds.
+# Redis has no native priorities: each priority gets its own list per
+# queue, 0 being the highest. A worker reads priority 0 of all its queues
+# first, in the order it lists them, then priority 1, and so on.
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'visibility_timeout': 2 * FLIGHT_REMINDER_SCHEDULE_WINDOW,
+    'priority_steps': list(range(10)),
+    'sep': ':',
+    'queue_order_strategy': 'priority',
+}
+
+# Transactional email outbox (flight_requests/outbox.py): emails per batch
+# and batches per dispatcher run, all sent over one SMTP connection
+EMAIL_OUTBOX_BATCH_SIZE = config('EMAIL_OUTBOX_BATCH_SIZE', default=100, cast=int)
+EMAIL_OUTBOX_MAX_BATCHES = config('EMAIL_OUTBOX_MAX_BATCHES', default=50, cast=int)
+# Failed sends are retried after 1, 2, 4... minutes, up to one hour apart
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', default=8, cast=int)
+EMAIL_OUTBOX_RETRY_BACKOFF = config('EMAIL_OUTBOX_RETRY_BACKOFF', default=60, cast=int)
+EMAIL_OUTBOX_RETRY_BACKOFF_MAX = config('EMAIL_OUTBOX_RETRY_BACKOFF_MAX', default=3600, cast=int)
+# A claimed batch is retried after this long if its dispatcher dies mid-send
+EMAIL_OUTBOX_LEASE_SECONDS = config('EMAIL_OUTBOX_LEASE_SECONDS', default=300, cast=int)
+EMAIL_OUTBOX_RETENTION_DAYS = config('EMAIL_OUTBOX_RETENTION_DAYS', default=30, cast=int)
+# Queue and priority each kind is dispatched with (see CELERY_TASK_ROUTES)
+EMAIL_OUTBOX_DISPATCH_OPTIONS = {
+    'reservation_confirmation': {'queue': 'confirmations', 'priority': 0},
+    'flight_reminder': {'queue': 'reminders', 'priority': 3},
+}
+
+# How long an operator keeps the requests returned by the claim endpoint
+FLIGHT_REQUEST_CLAIM_LEASE_SECONDS = config('FLIGHT_REQUEST_CLAIM_LEASE_SECONDS', default=300, cast=int)
+
 # Email configuration
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = config('EMAIL_HOST', default='smtp.gmail.com')
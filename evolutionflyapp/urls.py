@@ -25,6 +25,10 @@ urlpatterns = [
     path('api/destinations/', include('destinations.urls')),
     path('api/flight-requests/', include('flight_requests.urls')),
     
+    # Async read endpoints, for ASGI deployments
+    path('api/async/destinations/', include('destinations.async_urls')),
+    path('api/async/flight-requests/', include('flight_requests.async_urls')),
+    
     # DRF Auth
     path('api-auth/', include('rest_framework.urls')),
 ]
@@ -1,7 +1,97 @@
-from django.contrib import admin
+import json
+from datetime import timedelta
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
 from django.utils.html import format_html
 from django.utils import timezone
-from .models import FlightRequest
+from . import transitions
+from .models import FlightRequest, FlightRequestStat, OutboxEmail
+from .search import SEARCH_MIN_LENGTH
+from .transitions import apply_transition
+
+def planner_row_estimate(queryset):
+    """
+    Rows PostgreSQL expects queryset to return, from table statistics
+    (pg_class.reltuples and column histograms) instead of a COUNT(*)
+    """
+    plan = queryset.order_by().explain(format='json')
+    return int(json.loads(plan)[0]['Plan']['Plan Rows'])
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that reports the planner's estimate instead of running an
+    exact COUNT(*) when the estimate is above `threshold` rows.
+
+    Selective filters still get an exact count; only pages over very large
+    result sets show an approximate total.
+    """
+    threshold = 100_000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if (
+            isinstance(queryset, QuerySet) and
+            not queryset.query.is_empty() and
+            connections[queryset.db].vendor == 'postgresql'
+        ):
+            estimate = planner_row_estimate(queryset)
+            if estimate > self.threshold:
+                return estimate
+        return super().count
+
+class TravelDateFilter(admin.SimpleListFilter):
+    """
+    Travel date drill-down replacing date_hierarchy, which runs
+    SELECT DISTINCT over the whole table on every changelist load.
+
+    Months are listed from the FlightRequestStat summary table, whose size
+    does not grow with the number of requests.
+    """
+    title = 'fecha de viaje'
+    parameter_name = 'travel'
+    upcoming = (('next_7_days', 'Próximos 7 días', 7), ('next_30_days', 'Próximos 30 días', 30))
+
+    def lookups(self, request, model_admin):
+        months = FlightRequestStat.objects.exclude(count=0).dates('travel_date', 'month', order='DESC')
+        return [
+            *[(value, label) for value, label, _ in self.upcoming],
+            ('past', 'Pasadas'),
+            *[(month.strftime('%Y-%m'), month.strftime('%m/%Y')) for month in months],
+        ]
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        today = timezone.localdate()
+        for key, _, days in self.upcoming:
+            if value == key:
+                return queryset.filter(travel_date__gte=today, travel_date__lte=today + timedelta(days=days))
+        if value == 'past':
+            return queryset.filter(travel_date__lt=today)
+        if value:
+            try:
+                year, month = (int(part) for part in value.split('-'))
+                start = today.replace(year=year, month=month, day=1)
+            except ValueError:
+                return queryset.none()
+            end = (start + timedelta(days=32)).replace(day=1)
+            return queryset.filter(travel_date__gte=start, travel_date__lt=end)
+        return queryset
+
+class SearchRankChangeList(ChangeList):
+    """
+    Changelist that orders search results by relevance unless the user
+    sorted by a column
+    """
+    def get_ordering(self, request, queryset):
+        ordering = super().get_ordering(request, queryset)
+        if 'search_rank' in queryset.query.annotations and ORDER_VAR not in self.params:
+            ordering = ['-search_rank', *ordering]
+        return ordering
 
 @admin.register(FlightRequest)
 class FlightRequestAdmin(admin.ModelAdmin):
@@ -9,20 +99,27 @@ class FlightRequestAdmin(admin.ModelAdmin):
         'user_info', 'destination', 'travel_date', 'status_display', 
         'reserved_by', 'days_until_travel_display', 'created_at'
     )
-    list_filter = ('status', 'travel_date', 'created_at', 'destination')
+    list_filter = ('status', TravelDateFilter, 'created_at', 'destination')
+    # Columns rendered for every row: join them instead of one query each
+    list_select_related = ('user', 'destination', 'reserved_by')
+    paginator = EstimatedCountPaginator
+    # Skip the unfiltered COUNT(*) shown next to filtered results
+    show_full_result_count = False
+    raw_id_fields = ('user', 'reserved_by')
+    # Searched through FlightRequestQuerySet.search (see get_search_results)
     search_fields = (
         'user__email', 'user__first_name', 'user__last_name',
-        'destination__name', 'destination__code'
+        'destination__name', 'destination__code', 'notes'
     )
+    search_help_text = 'Nombre o email del usuario, destino o notas; también parte de un email (p. ej. el dominio) o del código de destino'
     ordering = ('-created_at',)
-    date_hierarchy = 'travel_date'
     
     fieldsets = (
         ('Información del Solicitante', {
             'fields': ('user', 'destination', 'travel_date', 'notes')
         }),
         ('Estado de la Solicitud', {
-            'fields': ('status', 'reserved_by', 'reserved_at', 'operator_notes')
+            'fields': ('status', 'reserved_by', 'reserved_at', 'status_changed_by', 'status_changed_at', 'operator_notes')
         }),
         ('Notificaciones', {
             'fields': ('notification_sent',),
@@ -34,10 +131,37 @@ class FlightRequestAdmin(admin.ModelAdmin):
         }),
     )
     
-    readonly_fields = ('created_at', 'updated_at', 'reserved_at')
+    readonly_fields = ('created_at', 'updated_at', 'reserved_at', 'status_changed_by', 'status_changed_at')
     
     actions = ['mark_as_reserved', 'mark_as_cancelled', 'mark_as_completed']
     
+    def get_changelist(self, request, **kwargs):
+        return SearchRankChangeList
+    
+    def save_model(self, request, obj, form, change):
+        # save() stamps status_changed_at; record who made the change too
+        if 'status' in form.changed_data:
+            obj.status_changed_by = request.user
+        super().save_model(request, obj, form, change)
+    
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Use the indexed, ranked full-text search instead of ILIKE '%term%'
+        over every search field, keeping substring matches on user email
+        and destination code (e.g. "example.com") that word prefixes miss
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if len(search_term) < SEARCH_MIN_LENGTH:
+            self.message_user(
+                request,
+                f'La búsqueda requiere al menos {SEARCH_MIN_LENGTH} caracteres.',
+                level=messages.WARNING
+            )
+            return queryset.none(), False
+        return queryset.search(search_term, match_substrings=True), False
+    
     def user_info(self, obj):
         return f"{obj.user.get_full_name()} ({obj.user.email})"
     user_info.short_description = 'Usuario'
@@ -71,22 +195,39 @@ class FlightRequestAdmin(admin.ModelAdmin):
             return f'{days} días'
     days_until_travel_display.short_description = 'Días restantes'
     
+    def apply_transition(self, request, queryset, status):
+        outcomes = apply_transition(queryset.values_list('pk', flat=True), status, request.user)
+        return sum(1 for outcome in outcomes.values() if outcome == transitions.CHANGED)
+    
     def mark_as_reserved(self, request, queryset):
-        updated = 0
-        for flight_request in queryset.filter(status='pending'):
-            flight_request.status = 'reserved'
-            flight_request.reserved_by = request.user
-            flight_request.save()
-            updated += 1
+        updated = self.apply_transition(request, queryset, 'reserved')
         self.message_user(request, f'{updated} solicitudes marcadas como reservadas.')
     mark_as_reserved.short_description = 'Marcar como reservadas'
     
     def mark_as_cancelled(self, request, queryset):
-        updated = queryset.update(status='cancelled')
+        updated = self.apply_transition(request, queryset, 'cancelled')
         self.message_user(request, f'{updated} solicitudes canceladas.')
     mark_as_cancelled.short_description = 'Cancelar solicitudes'
     
     def mark_as_completed(self, request, queryset):
-        updated = queryset.update(status='completed')
+        updated = self.apply_transition(request, queryset, 'completed')
         self.message_user(request, f'{updated} solicitudes completadas.')
     mark_as_completed.short_description = 'Marcar como completadas'
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('idempotency_key', 'kind', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status', 'kind')
+    search_fields = ('idempotency_key',)
+    raw_id_fields = ('flight_request',)
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+    ordering = ('-id',)
+    
+    actions = ['retry_now']
+    
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status='sent').update(
+            status='pending', attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f'{updated} emails reprogramados.')
+    retry_now.short_description = 'Reintentar envío ahora'
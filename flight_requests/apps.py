@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class FlightRequestsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'flight_requests'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,10 @@
+from django.urls import path
+from . import async_views
+
+app_name = 'flight_requests_async'
+
+urlpatterns = [
+    path('', async_views.flight_request_list, name='flightrequest-list'),
+    path('pending/', async_views.pending, name='flightrequest-pending'),
+    path('<int:pk>/', async_views.flight_request_detail, name='flightrequest-detail'),
+]
@@ -0,0 +1,52 @@
+from rest_framework import exceptions
+from rest_framework.request import Request
+from destinations import cache as destination_cache
+from evolutionflyapp.async_api import async_api_view, async_condition, json_response
+from . import cache as list_cache
+from .models import FlightRequest
+from .pagination import FlightRequestCursorPagination
+from .serializers import FlightRequestSerializer
+from .views import list_etag, search_list
+
+def _is_operator(user):
+    return user.is_operator() or user.is_admin_user()
+
+async def flight_requests_etag(request, *args, **kwargs):
+    return list_etag(request, await list_cache.aget_version(request.user), await destination_cache.aget_version())
+
+async def pending_etag(request, *args, **kwargs):
+    if not _is_operator(request.user):
+        return None
+    return await flight_requests_etag(request)
+
+async def _paginated_response(request, queryset):
+    paginator = FlightRequestCursorPagination()
+    page = await paginator.apaginate_queryset(queryset, Request(request))
+    serializer = FlightRequestSerializer(page, many=True)
+    return json_response(paginator.get_paginated_response(serializer.data).data)
+
+@async_api_view
+@async_condition(etag_func=flight_requests_etag)
+async def flight_request_list(request):
+    """Async version of FlightRequestViewSet.list"""
+    queryset = search_list(FlightRequest.objects.with_related().visible_to(request.user), request.GET)
+    return await _paginated_response(request, queryset)
+
+@async_api_view
+async def flight_request_detail(request, pk):
+    """Async version of FlightRequestViewSet.retrieve"""
+    try:
+        flight_request = await FlightRequest.objects.with_related().visible_to(request.user).aget(pk=pk)
+    except FlightRequest.DoesNotExist:
+        raise exceptions.NotFound()
+    return json_response(FlightRequestSerializer(flight_request).data)
+
+@async_api_view
+@async_condition(etag_func=pending_etag)
+async def pending(request):
+    """Async version of FlightRequestViewSet.pending"""
+    if not _is_operator(request.user):
+        return json_response({'error': 'Permission denied'}, status=403)
+    
+    queryset = FlightRequest.objects.with_related().filter(status='pending')
+    return await _paginated_response(request, queryset)
@@ -0,0 +1,61 @@
+import time
+from functools import partial
+from django.core.cache import cache
+from django.db import transaction
+
+# Flight request lists are validated per scope: operators see every request,
+# a client only their own. Each scope has a version key holding the time of
+# the last write to its rows, in nanoseconds; list ETags are derived from
+# it, so a conditional GET costs one cache read instead of an aggregate over
+# the table. Writes whose owners are unknown bump CLIENTS_KEY, which every
+# client scope includes, instead of looking the owners up.
+ALL_KEY = 'flight_requests:version:all'
+CLIENTS_KEY = 'flight_requests:version:clients'
+
+def user_key(user_id):
+    return f'flight_requests:version:user:{user_id}'
+
+def scope_keys(user):
+    if user.is_operator() or user.is_admin_user():
+        return [ALL_KEY]
+    return [user_key(user.pk), CLIENTS_KEY]
+
+def get_version(user):
+    keys = scope_keys(user)
+    versions = cache.get_many(keys)
+    if len(versions) < len(keys):
+        # Missing or evicted: start from now, which no client validator
+        # can already hold
+        for key in keys:
+            cache.add(key, time.time_ns(), timeout=None)
+        versions = cache.get_many(keys)
+    return tuple(versions.get(key) for key in keys)
+
+async def aget_version(user):
+    keys = scope_keys(user)
+    versions = await cache.aget_many(keys)
+    if len(versions) < len(keys):
+        for key in keys:
+            await cache.aadd(key, time.time_ns(), timeout=None)
+        versions = await cache.aget_many(keys)
+    return tuple(versions.get(key) for key in keys)
+
+def bump_version(user_ids):
+    version = time.time_ns()
+    if user_ids is None:
+        keys = [ALL_KEY, CLIENTS_KEY]
+    else:
+        keys = [ALL_KEY, *(user_key(user_id) for user_id in user_ids)]
+    cache.set_many(dict.fromkeys(keys, version), timeout=None)
+
+def invalidate(user_ids=None):
+    """
+    Bump the operator scope and the scopes of user_ids (every client's if
+    None) now and again once the current transaction commits, so a reader
+    that served pre-commit rows under the new version in between is also
+    discarded
+    """
+    if user_ids is not None:
+        user_ids = set(user_ids)
+    bump_version(user_ids)
+    transaction.on_commit(partial(bump_version, user_ids))
@@ -0,0 +1,130 @@
+from collections import OrderedDict
+from functools import lru_cache
+from types import SimpleNamespace
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.html import conditional_escape
+
+# Number of rendered destination/date fragments kept per worker process
+FRAGMENT_CACHE_SIZE = 1024
+
+class Slot:
+    """
+    Placeholder rendered in place of a per-recipient value.
+
+    Shared fragments are rendered once with slots and the real values are
+    substituted afterwards, escaped the same way the template would.
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def __str__(self):
+        return f'\x1a{self.name}\x1a'
+
+class FragmentCache:
+    """
+    Small LRU of rendered fragments, local to the worker process
+    """
+    def __init__(self, maxsize=FRAGMENT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._fragments = OrderedDict()
+
+    def get_or_render(self, key, render):
+        try:
+            self._fragments.move_to_end(key)
+            return self._fragments[key]
+        except KeyError:
+            pass
+        fragment = render()
+        self._fragments[key] = fragment
+        if len(self._fragments) > self.maxsize:
+            self._fragments.popitem(last=False)
+        return fragment
+
+    def clear(self):
+        self._fragments.clear()
+
+fragment_cache = FragmentCache()
+
+@lru_cache(maxsize=None)
+def get_compiled_template(template_name):
+    return get_template(template_name)
+
+def render_with_slots(template_name, key, context, slots):
+    """
+    Render template_name with context, reusing the fragment cached under key.
+
+    context must only differ between calls with the same key through Slot
+    placeholders; slots maps each slot name to its per-recipient value.
+    """
+    fragment = fragment_cache.get_or_render(
+        (template_name,) + key,
+        lambda: get_compiled_template(template_name).render(context),
+    )
+    for name, value in slots.items():
+        fragment = fragment.replace(str(Slot(name)), conditional_escape(value))
+    return fragment
+
+def _person(slot_name):
+    return SimpleNamespace(get_full_name=lambda: Slot(slot_name))
+
+def render_flight_reminder(flight_request):
+    """
+    Build (subject, plain_message, html_message) for a reminder email
+    """
+    destination = flight_request.destination
+    subject = f'Recordatorio: Tu vuelo a {destination.name} es en 2 días'
+
+    has_notes = bool(flight_request.operator_notes)
+    key = (destination.pk, destination.updated_at, flight_request.travel_date, has_notes)
+    context = {
+        'user': _person('user'),
+        'flight_request': SimpleNamespace(
+            operator_notes=Slot('operator_notes') if has_notes else flight_request.operator_notes
+        ),
+        'travel_date': flight_request.travel_date,
+        'destination': destination,
+    }
+    slots = {'user': flight_request.user.get_full_name()}
+    if has_notes:
+        slots['operator_notes'] = flight_request.operator_notes
+
+    html_message = render_with_slots('emails/flight_reminder.html', key, context, slots)
+    plain_message = render_with_slots('emails/flight_reminder.txt', key, context, slots)
+    return subject, plain_message, html_message
+
+def render_reservation_confirmation(flight_request):
+    """
+    Build (subject, plain_message, html_message) for a confirmation email
+    """
+    destination = flight_request.destination
+    subject = f'Confirmación: Tu vuelo a {destination.name} ha sido reservado'
+
+    has_notes = bool(flight_request.operator_notes)
+    reserved_by = flight_request.reserved_by
+    reserved_at = flight_request.reserved_at
+    # The templates print reserved_at down to the minute in local time
+    reserved_at_key = timezone.localtime(reserved_at).strftime('%Y-%m-%d %H:%M') if reserved_at else None
+    key = (
+        destination.pk, destination.updated_at, flight_request.travel_date,
+        reserved_at_key, reserved_by is not None, has_notes
+    )
+    context = {
+        'user': _person('user'),
+        'flight_request': SimpleNamespace(
+            destination=destination,
+            travel_date=flight_request.travel_date,
+            operator_notes=Slot('operator_notes') if has_notes else flight_request.operator_notes,
+        ),
+        'reserved_by': _person('reserved_by') if reserved_by is not None else None,
+        'reserved_at': reserved_at,
+    }
+    slots = {'user': flight_request.user.get_full_name()}
+    if reserved_by is not None:
+        slots['reserved_by'] = reserved_by.get_full_name()
+    if has_notes:
+        slots['operator_notes'] = flight_request.operator_notes
+
+    html_message = render_with_slots('emails/reservation_confirmation.html', key, context, slots)
+    plain_message = render_with_slots('emails/reservation_confirmation.txt', key, context, slots)
+    return subject, plain_message, html_message
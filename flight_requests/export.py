@@ -0,0 +1,68 @@
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_CHUNK_SIZE = 2000
+
+# (column name, lookup) pairs; rows are read with values_list so no model
+# instances are built and memory stays flat however many rows are exported
+EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('user_email', 'user__email'),
+    ('user_first_name', 'user__first_name'),
+    ('user_last_name', 'user__last_name'),
+    ('destination_code', 'destination__code'),
+    ('destination_name', 'destination__name'),
+    ('travel_date', 'travel_date'),
+    ('status', 'status'),
+    ('notes', 'notes'),
+    ('operator_notes', 'operator_notes'),
+    ('reserved_by_email', 'reserved_by__email'),
+    ('reserved_at', 'reserved_at'),
+    ('created_at', 'created_at'),
+]
+
+class _ErrorLineRenderer(BaseRenderer):
+    """
+    Export renderers only render error responses, as one JSON line;
+    the export itself is a StreamingHttpResponse
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False).encode() + b'\n'
+
+class CSVRenderer(_ErrorLineRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+class NDJSONRenderer(_ErrorLineRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+class _Echo:
+    # csv.writer only needs write(); hand each line straight back
+    def write(self, value):
+        return value
+
+def _rows(queryset):
+    lookups = [lookup for _, lookup in EXPORT_COLUMNS]
+    return queryset.order_by('id').values_list(*lookups).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+def stream_csv(queryset):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for row in _rows(queryset):
+        yield writer.writerow(row)
+
+def stream_ndjson(queryset):
+    names = [name for name, _ in EXPORT_COLUMNS]
+    for row in _rows(queryset):
+        yield json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+STREAMS = {
+    'csv': stream_csv,
+    'ndjson': stream_ndjson,
+}
@@ -0,0 +1,267 @@
+import json
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from statistics import mean, quantiles
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.utils import timezone
+from destinations.models import Destination
+
+User = get_user_model()
+
+# Steps of one journey, in order
+STEPS = ('register', 'login', 'destinations', 'create', 'pending', 'reserve')
+
+PASSWORD = 'carga-Prueba-2025'
+
+class JourneyError(Exception):
+    pass
+
+class QueryCounter:
+    """
+    Execute wrapper counting the queries of the current thread's connection
+    """
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+class InProcessTransport:
+    """
+    Requests through Django's test client, in the calling thread, with the
+    database queries each one ran
+    """
+    def __init__(self):
+        self.client = Client()
+
+    def request(self, method, path, body=None, auth=None):
+        headers = {'Authorization': auth} if auth else {}
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            if method == 'GET':
+                response = self.client.get(path, headers=headers)
+            else:
+                response = self.client.post(
+                    path, json.dumps(body or {}), content_type='application/json', headers=headers
+                )
+        data = response.json() if response.content else None
+        return response.status_code, data, counter.count
+
+class HttpTransport:
+    """
+    Requests to a running server; the queries it runs are not visible here
+    """
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, body=None, auth=None):
+        headers = {'Content-Type': 'application/json'}
+        if auth:
+            headers['Authorization'] = auth
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request) as response:
+                status, content = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, content = e.code, e.read()
+        return status, json.loads(content) if content else None, None
+
+def summarize(samples):
+    """
+    Latency percentiles in ms, and queries per request, of a list of
+    (seconds, queries) samples
+    """
+    latencies = sorted(seconds * 1000 for seconds, _ in samples)
+    if len(latencies) > 1:
+        cuts = quantiles(latencies, n=100, method='inclusive')
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = latencies[0]
+    queries = [count for _, count in samples if count is not None]
+    return {
+        'requests': len(samples),
+        'p50_ms': round(p50, 2),
+        'p95_ms': round(p95, 2),
+        'p99_ms': round(p99, 2),
+        'max_ms': round(latencies[-1], 2),
+        'queries_per_request': round(mean(queries), 2) if queries else None,
+    }
+
+class Command(BaseCommand):
+    help = (
+        'Replay register, login, list destinations, create a flight request, operator '
+        'pending list and reserve with N concurrent users, and write p50/p95/p99 latency, '
+        'requests/s and queries per request of each step to a JSON file'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--journeys', type=int, default=200, help='Journeys to run in total')
+        parser.add_argument('--concurrency', type=int, default=8, help='Journeys running at the same time')
+        parser.add_argument('--url', default=None, help='Base URL of a running server (defaults to the in-process test client)')
+        parser.add_argument('--output', default=None, help='JSON report path (defaults to benchmark_api_journeys-<timestamp>.json)')
+        parser.add_argument('--keep', action='store_true', help='Keep the users and requests created by the run')
+
+    def make_transport(self):
+        return HttpTransport(self.url) if self.url else InProcessTransport()
+
+    def call(self, transport, step, method, path, expected, body=None, auth=None, record=True):
+        start = time.perf_counter()
+        status, data, queries = transport.request(method, path, body, auth)
+        seconds = time.perf_counter() - start
+        if status != expected:
+            raise JourneyError(f'{step}: {method} {path} returned {status}')
+        if record:
+            with self.lock:
+                self.samples[step].append((seconds, queries))
+        return data
+
+    def register(self, transport, email, role, record=True):
+        """Register and log in a user; returns (user id, Authorization header)"""
+        user = self.call(transport, 'register', 'POST', '/api/auth/register/', 201, {
+            'username': email,
+            'email': email,
+            'first_name': 'Carga',
+            'last_name': role,
+            'role': role,
+            'password': PASSWORD,
+            'password_confirm': PASSWORD,
+        }, record=record)['user']
+        credentials = self.call(transport, 'login', 'POST', '/api/auth/login/', 200, {
+            'email': email, 'password': PASSWORD,
+        }, record=record)
+        return user['id'], f'{credentials.get("token_type", "Token")} {credentials["token"]}'
+
+    def journey(self, transport, operator_auth, index):
+        """Run one timed journey as a new client"""
+        client_id, auth = self.register(transport, f'{self.prefix}-{index}@example.com', 'client')
+        destinations = self.call(
+            transport, 'destinations', 'GET', '/api/destinations/destinations/active-destinations/', 200, auth=auth
+        )
+        if not destinations:
+            raise JourneyError('destinations: no active destinations')
+        self.call(transport, 'create', 'POST', '/api/flight-requests/', 201, {
+            'destination': destinations[index % len(destinations)]['id'],
+            'travel_date': (timezone.now().date() + timedelta(days=7 + index % 60)).isoformat(),
+            'notes': f'Prueba de carga {index}',
+        }, auth=auth)
+        pending = self.call(
+            transport, 'pending', 'GET', '/api/flight-requests/pending/?page_size=100', 200, auth=operator_auth
+        )
+        flight_request_id = next(
+            (item['id'] for item in pending['results'] if item['user']['id'] == client_id), None
+        )
+        if flight_request_id is None:
+            raise JourneyError('pending: request not on the first page')
+        self.call(
+            transport, 'reserve', 'POST', f'/api/flight-requests/{flight_request_id}/reserve/', 200,
+            auth=operator_auth
+        )
+
+    def worker(self, slot):
+        """
+        Run the journeys of one concurrency slot, which works as one
+        operator registered untimed beforehand
+        """
+        transport = self.make_transport()
+        try:
+            try:
+                operator_auth = self.register(
+                    transport, f'{self.prefix}-operator-{slot}@example.com', 'operator', record=False
+                )[1]
+            except JourneyError as e:
+                raise CommandError(f'Operator set-up failed: {e}')
+            for index in range(slot, self.total, self.concurrency):
+                try:
+                    self.journey(transport, operator_auth, index)
+                except JourneyError as e:
+                    with self.lock:
+                        self.errors.append(str(e))
+        finally:
+            if not self.url:
+                connection.close()
+
+    def revision(self):
+        try:
+            result = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+            )
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        return result.stdout.strip()
+
+    def handle(self, *args, **options):
+        # The test client always sends Host: testserver
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            self.benchmark(options)
+
+    def benchmark(self, options):
+        self.url = options['url']
+        self.prefix = f'loadtest-{uuid.uuid4().hex[:8]}'
+        self.samples = {step: [] for step in STEPS}
+        self.errors = []
+        self.lock = threading.Lock()
+        self.total = journeys = options['journeys']
+        self.concurrency = concurrency = options['concurrency']
+        if not self.url and not Destination.objects.filter(is_active=True).exists():
+            raise CommandError('No active destinations; run load_destinations first')
+
+        started_at = timezone.now()
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(self.worker, range(concurrency)))
+            elapsed = time.perf_counter() - start
+        finally:
+            if not options['keep']:
+                User.objects.filter(email__startswith=f'{self.prefix}-').delete()
+
+        requests = sum(len(samples) for samples in self.samples.values())
+        if not requests:
+            raise CommandError(f'Every journey failed, first error: {self.errors[0]}')
+
+        report = {
+            'started_at': started_at.isoformat(),
+            'revision': self.revision(),
+            'target': self.url or 'in-process',
+            'database': connection.vendor,
+            'journeys': journeys,
+            'concurrency': concurrency,
+            'duration_s': round(elapsed, 3),
+            'requests': requests,
+            'requests_per_second': round(requests / elapsed, 1),
+            'journeys_per_second': round((journeys - len(self.errors)) / elapsed, 1),
+            'errors': len(self.errors),
+            'error_samples': self.errors[:10],
+            'steps': {step: summarize(samples) for step, samples in self.samples.items() if samples},
+            'overall': summarize([sample for samples in self.samples.values() for sample in samples]),
+        }
+        output = options['output'] or f'benchmark_api_journeys-{started_at:%Y%m%d-%H%M%S}.json'
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+        self.stdout.write(f'{"":<14}{"requests":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"queries":>10}')
+        for step, summary in [*report['steps'].items(), ('overall', report['overall'])]:
+            queries = summary['queries_per_request']
+            self.stdout.write(
+                f'{step:<14}{summary["requests"]:>10}{summary["p50_ms"]:>10.1f}{summary["p95_ms"]:>10.1f}'
+                f'{summary["p99_ms"]:>10.1f}{"-" if queries is None else f"{queries:.1f}":>10}'
+            )
+        style = self.style.WARNING if self.errors else self.style.SUCCESS
+        self.stdout.write(style(
+            f'{"✓ " if not self.errors else ""}{report["requests_per_second"]} requests/s, '
+            f'{report["journeys_per_second"]} journeys/s, {len(self.errors)} failed journeys; '
+            f'report written to {output}'
+        ))
@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from statistics import quantiles
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.test import AsyncClient, Client, override_settings
+from users.tokens import issue_token_pair
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = (
+        'Compare a read endpoint served by N synchronous workers (WSGI, one request '
+        'per worker at a time) with its async version served by a single event loop '
+        '(ASGI), reporting throughput, latency and peak memory of each'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per run')
+        parser.add_argument('--workers', type=int, default=4, help='Concurrent sync workers')
+        parser.add_argument('--concurrency', type=int, default=64, help='Concurrent requests on the event loop')
+        parser.add_argument('--email', default=None, help='Operator used for the requests (defaults to the first operator)')
+        parser.add_argument('--path', default='flight-requests/pending/', help='Endpoint below /api/ and /api/async/')
+
+    def measure(self, run):
+        """
+        Run the benchmark under tracemalloc and return
+        (requests/s, p50 ms, p95 ms, peak KiB)
+        """
+        tracemalloc.start()
+        start = time.perf_counter()
+        latencies = run()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        cuts = quantiles(latencies, n=100)
+        return len(latencies) / elapsed, cuts[49] * 1000, cuts[94] * 1000, peak / 1024
+
+    def run_sync(self, url, headers, total, workers):
+        local = threading.local()
+
+        def request(_):
+            if not hasattr(local, 'client'):
+                local.client = Client()
+            start = time.perf_counter()
+            response = local.client.get(url, headers=headers)
+            latency = time.perf_counter() - start
+            close_old_connections()
+            if response.status_code != 200:
+                raise CommandError(f'GET {url} returned {response.status_code}')
+            return latency
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(request, range(total)))
+
+    def run_async(self, url, headers, total, concurrency):
+        async def main():
+            client = AsyncClient()
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def request():
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.get(url, headers=headers)
+                    latency = time.perf_counter() - start
+                if response.status_code != 200:
+                    raise CommandError(f'GET {url} returned {response.status_code}')
+                return latency
+
+            return await asyncio.gather(*(request() for _ in range(total)))
+
+        return asyncio.run(main())
+
+    def handle(self, *args, **options):
+        # The test clients always send Host: testserver
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            self.benchmark(options)
+
+    def benchmark(self, options):
+        if options['email']:
+            operator = User.objects.get(email=options['email'])
+        else:
+            operator = User.objects.filter(role='operator').first()
+            if operator is None:
+                raise CommandError('No operator user found; pass --email')
+
+        headers = {'Authorization': f'Bearer {issue_token_pair(operator)["token"]}'}
+        total, path = options['requests'], options['path']
+        # Warm up caches and connections so neither run pays for them
+        self.run_sync(f'/api/{path}', headers, 10, 1)
+        self.run_async(f'/api/async/{path}', headers, 10, 1)
+
+        results = [
+            (f'sync x{options["workers"]} workers', self.measure(
+                lambda: self.run_sync(f'/api/{path}', headers, total, options['workers'])
+            )),
+            (f'async x{options["concurrency"]} tasks', self.measure(
+                lambda: self.run_async(f'/api/async/{path}', headers, total, options['concurrency'])
+            )),
+        ]
+
+        self.stdout.write(f'{"":<24}{"requests/s":>12}{"p50 ms":>10}{"p95 ms":>10}{"peak KiB":>12}')
+        for label, (requests_per_second, p50, p95, peak) in results:
+            self.stdout.write(f'{label:<24}{requests_per_second:>12.0f}{p50:>10.1f}{p95:>10.1f}{peak:>12.0f}')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✓ One event loop kept {options["concurrency"]} requests in flight; a sync '
+                f'deployment needs one worker process per concurrent request'
+            )
+        )
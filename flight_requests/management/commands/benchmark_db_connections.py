@@ -0,0 +1,79 @@
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from rest_framework.test import APIClient
+from flight_requests.tasks import release_expired_claims
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = (
+        'Measure API requests/s and Celery tasks/s against the configured database, '
+        'reconnecting every time (CONN_MAX_AGE=0) versus the configured CONN_MAX_AGE'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=500, help='Requests and tasks per run')
+        parser.add_argument('--email', default=None, help='Operator used for the API requests (defaults to the first operator)')
+        parser.add_argument('--url', default='/api/flight-requests/pending/', help='Endpoint to request')
+
+    def run(self, iterations, unit_of_work):
+        """
+        Wrap each unit of work the way Django's request_started/request_finished
+        signals and Celery's task_prerun/task_postrun fixup do
+        """
+        start = time.perf_counter()
+        for _ in range(iterations):
+            close_old_connections()
+            unit_of_work()
+            close_old_connections()
+        return iterations / (time.perf_counter() - start)
+
+    def benchmark(self, conn_max_age, iterations, client, url):
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+
+        def request():
+            response = client.get(url)
+            if response.status_code != 200:
+                raise CommandError(f'GET {url} returned {response.status_code}')
+
+        requests_per_second = self.run(iterations, request)
+        tasks_per_second = self.run(iterations, lambda: release_expired_claims.apply())
+        connection.close()
+        return requests_per_second, tasks_per_second
+
+    def handle(self, *args, **options):
+        configured = connection.settings_dict['CONN_MAX_AGE']
+        if configured == 0:
+            raise CommandError('DATABASE_CONN_MAX_AGE is 0; set it to compare against persistent connections')
+
+        if options['email']:
+            operator = User.objects.get(email=options['email'])
+        else:
+            operator = User.objects.filter(role='operator').first()
+            if operator is None:
+                raise CommandError('No operator user found; pass --email')
+
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(user=operator)
+        iterations = options['iterations']
+
+        results = [
+            ('CONN_MAX_AGE=0', self.benchmark(0, iterations, client, options['url'])),
+            (f'CONN_MAX_AGE={configured}', self.benchmark(configured, iterations, client, options['url'])),
+        ]
+        connection.settings_dict['CONN_MAX_AGE'] = configured
+
+        self.stdout.write(f'{"":<20}{"requests/s":>12}{"tasks/s":>12}')
+        for label, (requests_per_second, tasks_per_second) in results:
+            self.stdout.write(f'{label:<20}{requests_per_second:>12.0f}{tasks_per_second:>12.0f}')
+
+        (before_requests, before_tasks), (after_requests, after_tasks) = results[0][1], results[1][1]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✓ Persistent connections: {after_requests / before_requests:.1f}x requests/s, '
+                f'{after_tasks / before_tasks:.1f}x tasks/s'
+            )
+        )
@@ -0,0 +1,88 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+from django.utils import timezone
+from destinations.models import Destination
+from flight_requests.emails import fragment_cache, render_flight_reminder
+from flight_requests.models import FlightRequest
+from users.models import User
+
+class Command(BaseCommand):
+    help = 'Render reminder emails with and without fragment caching and compare the output'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=10000, help='Number of reminders to render')
+        parser.add_argument('--destinations', type=int, default=14, help='Number of distinct destinations')
+        parser.add_argument('--dates', type=int, default=3, help='Number of distinct travel dates')
+
+    def build_requests(self, count, destination_count, date_count):
+        """Build unsaved requests in memory; no database access is needed"""
+        now = timezone.now()
+        destinations = [
+            Destination(pk=i + 1, name=f'Destino {i}', code=f'D{i:02d}',
+                        description=f'Descripción <{i}> & más', updated_at=now)
+            for i in range(destination_count)
+        ]
+        today = now.date()
+        flight_requests = []
+        for i in range(count):
+            user = User(pk=i + 1, first_name=f"Ana{i}", last_name="O'Brien <Díaz>",
+                        email=f'user{i}@example.com')
+            flight_requests.append(FlightRequest(
+                pk=i + 1,
+                user=user,
+                destination=destinations[i % destination_count],
+                travel_date=today + timedelta(days=2 + i % date_count),
+                status='reserved',
+                operator_notes='Asiento "ventana" & equipaje extra' if i % 3 == 0 else None,
+            ))
+        return flight_requests
+
+    def render_uncached(self, flight_request):
+        """Rendering exactly as the tasks did before the fragment cache"""
+        subject = f'Recordatorio: Tu vuelo a {flight_request.destination.name} es en 2 días'
+        context = {
+            'user': flight_request.user,
+            'flight_request': flight_request,
+            'travel_date': flight_request.travel_date,
+            'destination': flight_request.destination,
+        }
+        html_message = render_to_string('emails/flight_reminder.html', context)
+        plain_message = render_to_string('emails/flight_reminder.txt', context)
+        return subject, plain_message, html_message
+
+    def handle(self, *args, **options):
+        flight_requests = self.build_requests(
+            options['count'], options['destinations'], options['dates']
+        )
+
+        start = time.perf_counter()
+        expected = [self.render_uncached(flight_request) for flight_request in flight_requests]
+        uncached_seconds = time.perf_counter() - start
+
+        fragment_cache.clear()
+        start = time.perf_counter()
+        rendered = [render_flight_reminder(flight_request) for flight_request in flight_requests]
+        cached_seconds = time.perf_counter() - start
+
+        mismatches = [
+            flight_request.pk
+            for flight_request, old, new in zip(flight_requests, expected, rendered)
+            if old != new
+        ]
+        if mismatches:
+            raise CommandError(
+                f'{len(mismatches)} reminders differ from render_to_string output, '
+                f'first ids: {mismatches[:10]}'
+            )
+
+        count = len(flight_requests)
+        self.stdout.write(f'render_to_string: {uncached_seconds:.3f}s ({count / uncached_seconds:.0f} emails/s)')
+        self.stdout.write(f'fragment cache:   {cached_seconds:.3f}s ({count / cached_seconds:.0f} emails/s)')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✓ {count} reminders identical byte for byte, '
+                f'{uncached_seconds / cached_seconds:.1f}x faster'
+            )
+        )
@@ -0,0 +1,156 @@
+import math
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from destinations.models import Destination
+from evolutionflyapp.celery import app
+from flight_requests import outbox, transitions
+from flight_requests.models import FlightRequest, OutboxEmail
+from flight_requests.tasks import send_flight_reminder_batch
+
+User = get_user_model()
+
+# Fixture rows created for the run and deleted afterwards
+BENCHMARK_CODE = 'ZZQ'
+BENCHMARK_EMAIL = 'benchmark-queues@example.com'
+
+def percentile(values, pct):
+    """Nearest-rank percentile of values"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+class Command(BaseCommand):
+    help = (
+        'Measure reservation confirmation latency through the running Celery workers, '
+        'first idle and then while a reminder burst is being sent'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=20, help='Reservations timed per phase')
+        parser.add_argument('--burst', type=int, default=5000, help='Reminders queued by the burst')
+        parser.add_argument('--interval', type=float, default=0.5, help='Seconds between timed reservations')
+        parser.add_argument('--timeout', type=float, default=60, help='Seconds to wait for each confirmation')
+        parser.add_argument('--email', default=None, help='Operator making the reservations (defaults to the first operator)')
+
+    def check_workers(self):
+        """
+        Fail early unless a broker and workers consuming the notification
+        queues are running, since nothing would be sent otherwise
+        """
+        if settings.CELERY_BROKER_URL.startswith('memory://'):
+            raise CommandError('The in-memory broker has no workers; set REDIS_URL and start the workers')
+        replies = app.control.inspect(timeout=2).active_queues() or {}
+        consumed = {queue['name'] for queues in replies.values() for queue in queues}
+        missing = {'confirmations', 'reminders'} - consumed
+        if missing:
+            raise CommandError(f'No worker consumes: {", ".join(sorted(missing))}')
+
+    def create_fixture(self, samples, burst):
+        """
+        Pending requests to reserve during both phases and reserved requests
+        travelling in 2 days for the burst, bulk created so nothing is
+        queued until the run starts
+        """
+        if Destination.objects.filter(code=BENCHMARK_CODE).exists():
+            raise CommandError(f'Destination {BENCHMARK_CODE} exists; delete it or the leftovers of a previous run')
+        destination = Destination.objects.create(name='Benchmark de colas', code=BENCHMARK_CODE)
+        client, _ = User.objects.get_or_create(
+            email=BENCHMARK_EMAIL, defaults={'username': BENCHMARK_EMAIL, 'role': 'client'}
+        )
+        today = timezone.now().date()
+        pending = FlightRequest.objects.bulk_create([
+            FlightRequest(user=client, destination=destination, travel_date=today + timedelta(days=30))
+            for _ in range(2 * samples)
+        ])
+        reserved = FlightRequest.objects.bulk_create([
+            FlightRequest(
+                user=client,
+                destination=destination,
+                travel_date=today + timedelta(days=2),
+                status='reserved',
+                reserved_at=timezone.now()
+            )
+            for _ in range(burst)
+        ], batch_size=1000)
+        return destination, client, [request.id for request in pending], [request.id for request in reserved]
+
+    def time_confirmations(self, ids, operator, interval, timeout):
+        """
+        Reserve each request through the bulk transition service and wait
+        for its confirmation to be sent. Returns the latencies in seconds,
+        from the outbox write to the SMTP hand-off.
+        """
+        latencies = []
+        for pk in ids:
+            transitions.apply_transition([pk], 'reserved', operator)
+            key = outbox.confirmation_key(pk)
+            deadline = time.monotonic() + timeout
+            while True:
+                email = OutboxEmail.objects.filter(idempotency_key=key, status='sent').first()
+                if email:
+                    latencies.append((email.sent_at - email.created_at).total_seconds())
+                    break
+                if time.monotonic() > deadline:
+                    raise CommandError(f'Confirmation of request {pk} not sent after {timeout:.0f}s')
+                time.sleep(0.01)
+            time.sleep(interval)
+        return latencies
+
+    def start_burst(self, ids):
+        """Fan the burst out in chunks, the way the hourly reminder pass does"""
+        size = settings.FLIGHT_REMINDER_BATCH_SIZE
+        for start in range(0, len(ids), size):
+            send_flight_reminder_batch.delay(ids[start:start + size])
+
+    def handle(self, *args, **options):
+        self.check_workers()
+
+        if options['email']:
+            operator = User.objects.get(email=options['email'])
+        else:
+            operator = User.objects.filter(role='operator').first()
+            if operator is None:
+                raise CommandError('No operator user found; pass --email')
+
+        samples = options['samples']
+        destination, client, pending_ids, burst_ids = self.create_fixture(samples, options['burst'])
+        try:
+            idle = self.time_confirmations(
+                pending_ids[:samples], operator, options['interval'], options['timeout']
+            )
+            self.start_burst(burst_ids)
+            during_burst = self.time_confirmations(
+                pending_ids[samples:], operator, options['interval'], options['timeout']
+            )
+            reminders_sent = OutboxEmail.objects.filter(
+                flight_request_id__in=burst_ids, kind='flight_reminder', status='sent'
+            ).count()
+        finally:
+            destination.delete()
+            client.delete()
+
+        self.stdout.write(f'{"":<14}{"p50":>10}{"p95":>10}{"max":>10}')
+        for label, latencies in (('idle', idle), ('during burst', during_burst)):
+            self.stdout.write(
+                f'{label:<14}{percentile(latencies, 50):>9.3f}s{percentile(latencies, 95):>9.3f}s'
+                f'{max(latencies):>9.3f}s'
+            )
+        self.stdout.write(f'Reminders sent while sampling: {reminders_sent}/{len(burst_ids)}')
+
+        idle_p95, burst_p95 = percentile(idle, 95), percentile(during_burst, 95)
+        if reminders_sent == len(burst_ids):
+            self.stdout.write(self.style.WARNING('The burst finished before sampling did; raise --burst'))
+        if burst_p95 <= 2 * idle_p95:
+            self.stdout.write(
+                self.style.SUCCESS(f'✓ Confirmation p95 {burst_p95:.3f}s during the burst, {idle_p95:.3f}s idle')
+            )
+        else:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'Confirmation p95 went from {idle_p95:.3f}s to {burst_p95:.3f}s during the burst; '
+                    f'check that confirmations have a dedicated worker'
+                )
+            )
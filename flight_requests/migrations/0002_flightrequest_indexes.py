@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-17 00:21
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction; building the
+    # indexes concurrently keeps flightrequest writable during the migration.
+    atomic = False
+
+    dependencies = [
+        ('destinations', '0001_initial'),
+        ('flight_requests', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='flightrequest',
+            index=models.Index(fields=['-created_at', '-id'], name='flightreq_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='flightrequest',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='flightreq_user_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='flightrequest',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['-created_at', '-id'], name='flightreq_pending_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='flightrequest',
+            index=models.Index(condition=models.Q(('notification_sent', False), ('status', 'reserved')), fields=['travel_date'], name='flightreq_reminder_due_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-17 00:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('destinations', '0001_initial'),
+        ('flight_requests', '0002_flightrequest_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flightrequest',
+            name='claimed_by',
+            field=models.ForeignKey(blank=True, help_text='Operador que tiene la solicitud asignada', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='claimed_flights', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='flightrequest',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, help_text='Fecha y hora en que vence la asignación al operador', null=True),
+        ),
+        AddIndexConcurrently(
+            model_name='flightrequest',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['travel_date', 'created_at'], name='flightreq_pending_travel_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='flightrequest',
+            index=models.Index(condition=models.Q(('claimed_until__isnull', False)), fields=['claimed_until'], name='flightreq_claimed_until_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-17 00:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_stats(apps, schema_editor):
+    FlightRequest = apps.get_model('flight_requests', 'FlightRequest')
+    FlightRequestStat = apps.get_model('flight_requests', 'FlightRequestStat')
+    counters = (
+        FlightRequest.objects.values_list('destination_id', 'status', 'travel_date')
+        .annotate(total=Count('id')).order_by()
+    )
+    FlightRequestStat.objects.bulk_create(
+        (
+            FlightRequestStat(destination_id=destination_id, status=status, travel_date=travel_date, count=total)
+            for destination_id, status, travel_date, total in counters.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('destinations', '0001_initial'),
+        ('flight_requests', '0003_flightrequest_claims'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlightRequestStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('reserved', 'Reservada'), ('cancelled', 'Cancelada'), ('completed', 'Completada')], max_length=10)),
+                ('travel_date', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('destination', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='destinations.destination')),
+            ],
+            options={
+                'verbose_name': 'Estadística de Solicitudes',
+                'verbose_name_plural': 'Estadísticas de Solicitudes',
+                'indexes': [models.Index(fields=['travel_date'], name='flightreqstat_travel_idx')],
+                'constraints': [models.UniqueConstraint(fields=('destination', 'status', 'travel_date'), name='flightreqstat_key_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-17 01:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight_requests', '0004_flightrequeststat'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flightrequest',
+            name='status_changed_at',
+            field=models.DateTimeField(blank=True, help_text='Fecha y hora del último cambio de estado', null=True),
+        ),
+        migrations.AddField(
+            model_name='flightrequest',
+            name='status_changed_by',
+            field=models.ForeignKey(blank=True, help_text='Usuario que realizó el último cambio de estado', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
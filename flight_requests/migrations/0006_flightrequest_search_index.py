@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-17 01:10
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # Build the GIN index without blocking writes to the table
+    atomic = False
+
+    dependencies = [
+        ('destinations', '0002_destination_search_index'),
+        ('flight_requests', '0005_flightrequest_status_audit'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='flightrequest',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('notes', config='simple'), name='flightreq_notes_search_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-17 01:27
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight_requests', '0006_flightrequest_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(help_text='Identifica el email; no se encola dos veces la misma clave', max_length=100, unique=True)),
+                ('kind', models.CharField(choices=[('reservation_confirmation', 'Confirmación de reserva'), ('flight_reminder', 'Recordatorio de vuelo')], max_length=30)),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('sent', 'Enviado'), ('failed', 'Fallido')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Próximo intento de envío; también actúa como lease mientras se envía')),
+                ('last_error', models.TextField(blank=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('flight_request', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='flight_requests.flightrequest')),
+            ],
+            options={
+                'verbose_name': 'Email en Cola',
+                'verbose_name_plural': 'Emails en Cola',
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['next_attempt_at'], name='outbox_pending_due_idx')],
+            },
+        ),
+    ]
@@ -1,7 +1,121 @@
-from django.db import models
+from collections import Counter
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchRank
+from django.db import models, transaction
+from django.db.models.functions import Cast
 from django.conf import settings
 from django.utils import timezone
-from destinations.models import Destination
+from destinations.models import Destination, search_vector as destination_search_vector
+from users.models import search_vector as user_search_vector
+from . import cache as list_cache
+from .search import RANK_KEY_SCALE, EqualsAny, notes_search_vector, parse_query, rank_vector
+
+# Fields of a FlightRequestStat counter, as (field name, attribute name)
+STAT_FIELDS = (
+    ('destination', 'destination_id'),
+    ('status', 'status'),
+    ('travel_date', 'travel_date'),
+)
+
+class FlightRequestQuerySet(models.QuerySet):
+    """
+    Bulk writes bypass model signals, so they invalidate the list versions
+    here (bulk_update runs through update)
+    """
+    def update(self, **kwargs):
+        return self.update_owned(None, **kwargs)
+    
+    def update_owned(self, user_ids, **kwargs):
+        """
+        update() for callers that already read the owners of the rows, e.g.
+        while locking them, so only those clients' list versions are bumped.
+        Plain update() bumps every client's rather than look the owners up.
+        """
+        updated = super().update(**kwargs)
+        if updated:
+            list_cache.invalidate(user_ids)
+        return updated
+    
+    def bulk_create(self, objs, batch_size=None, **kwargs):
+        """
+        Like save(), count the new rows in their FlightRequestStat counters
+        in the same transaction
+        """
+        from .stats import apply_deltas
+        
+        if kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts'):
+            # Which rows were inserted, skipped or updated is not returned
+            raise ValueError('FlightRequest bulk_create cannot handle conflicts without leaving stat counters stale.')
+        with transaction.atomic():
+            created = super().bulk_create(objs, batch_size=batch_size, **kwargs)
+            deltas = Counter()
+            for obj in created:
+                obj._loaded_status = obj.status
+                obj._loaded_stat_key = obj._stat_key()
+                deltas[obj._loaded_stat_key] += 1
+            apply_deltas(deltas)
+        list_cache.invalidate(obj.user_id for obj in created)
+        return created
+    
+    def with_related(self):
+        """
+        Join the relations rendered by FlightRequestSerializer so that
+        listing N requests costs a fixed number of queries
+        """
+        return self.select_related('user', 'destination', 'reserved_by')
+    
+    def visible_to(self, user):
+        """
+        Operators and admins see every request, clients only their own
+        """
+        if user.is_operator() or user.is_admin_user():
+            return self
+        return self.filter(user=user)
+    
+    def search(self, text, match_substrings=False):
+        """
+        Requests whose user (name or email), destination (name or code) or
+        notes contain every word of text as a word prefix, annotated with
+        search_rank and with search_rank_key, the rank as an integer that
+        cursor positions can compare exactly.
+
+        Matching users and destinations are looked up through their own GIN
+        indexes in subqueries PostgreSQL runs once, so the query is a bitmap
+        OR of index scans on user, destination and notes instead of a scan
+        over the joins.
+
+        With match_substrings, user emails and destination codes containing
+        text anywhere (e.g. a mail domain) match too. There is no index for
+        that, so users and destinations are scanned; it is meant for the
+        admin, not the API.
+        """
+        query = parse_query(text)
+        if query is None:
+            return self.annotate(
+                search_rank=models.Value(0.0, output_field=models.FloatField()),
+                search_rank_key=models.Value(0, output_field=models.IntegerField())
+            ).none()
+        
+        users = models.Q(document=query)
+        destinations = models.Q(document=query)
+        if match_substrings:
+            users |= models.Q(email__icontains=text)
+            destinations |= models.Q(code__icontains=text)
+        # order_by() drops Meta.ordering, which would sort each subquery
+        user_ids = get_user_model().objects.annotate(document=user_search_vector()).filter(users).order_by()
+        destination_ids = Destination.objects.annotate(document=destination_search_vector()).filter(destinations).order_by()
+        
+        return self.annotate(notes_document=notes_search_vector()).filter(
+            models.Q(notes_document=query) |
+            models.Q(EqualsAny('user', ArraySubquery(user_ids.values('pk')))) |
+            models.Q(EqualsAny('destination', ArraySubquery(destination_ids.values('pk'))))
+        ).annotate(
+            search_rank=SearchRank(rank_vector(), query)
+        ).annotate(
+            search_rank_key=Cast(models.F('search_rank') * RANK_KEY_SCALE, models.IntegerField())
+        )
 
 class FlightRequest(models.Model):
     """
@@ -59,6 +173,32 @@ class FlightRequest(models.Model):
         blank=True,
         help_text='Fecha y hora de reserva'
     )
+    claimed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='claimed_flights',
+        help_text='Operador que tiene la solicitud asignada'
+    )
+    claimed_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Fecha y hora en que vence la asignación al operador'
+    )
+    status_changed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        help_text='Usuario que realizó el último cambio de estado'
+    )
+    status_changed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Fecha y hora del último cambio de estado'
+    )
     notification_sent = models.BooleanField(
         default=False,
         help_text='Indica si se envió la notificación de recordatorio'
@@ -66,32 +206,149 @@ class FlightRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = FlightRequestQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Solicitud de Vuelo'
         verbose_name_plural = 'Solicitudes de Vuelo'
         ordering = ['-created_at']
+        indexes = [
+            # Operator listing, paginated by (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='flightreq_created_idx'),
+            # Client listing: user=... ORDER BY -created_at
+            models.Index(fields=['user', '-created_at', '-id'], name='flightreq_user_created_idx'),
+            # Operator queue of pending requests
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(status='pending'),
+                name='flightreq_pending_idx',
+            ),
+            # Operator work queue: pending requests by travel-date urgency
+            models.Index(
+                fields=['travel_date', 'created_at'],
+                condition=models.Q(status='pending'),
+                name='flightreq_pending_travel_idx',
+            ),
+            # Lease expiry sweep
+            models.Index(
+                fields=['claimed_until'],
+                condition=models.Q(claimed_until__isnull=False),
+                name='flightreq_claimed_until_idx',
+            ),
+            # Full-text search over notes (see FlightRequestQuerySet.search)
+            GinIndex(notes_search_vector(), name='flightreq_notes_search_idx'),
+            # Reminder scan: reserved requests not notified yet, by travel date
+            models.Index(
+                fields=['travel_date'],
+                condition=models.Q(status='reserved', notification_sent=False),
+                name='flightreq_reminder_due_idx',
+            ),
+        ]
         
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.destination.name} ({self.travel_date})"
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Status as last read from / written to the database, used by save()
+        # to detect transitions without re-fetching the row
+        self._loaded_status = None
+        # FlightRequestStat counter this row was last read/written under
+        self._loaded_stat_key = None
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get('status')
+        instance._loaded_stat_key = instance._stat_key()
+        return instance
+    
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        if fields is None or 'status' in fields:
+            self._loaded_status = self.__dict__.get('status')
+        self._loaded_stat_key = self._stat_key()
+    
+    def _stat_key(self, update_fields=None, loaded_key=None):
+        """
+        (destination_id, status, travel_date) of this row, or None if unknown.
+        
+        With update_fields, fields that are not saved keep their loaded value.
+        """
+        key = []
+        for i, (name, attname) in enumerate(STAT_FIELDS):
+            if update_fields is None or name in update_fields or attname in update_fields:
+                value = self.__dict__.get(attname)
+            else:
+                value = loaded_key[i] if loaded_key else None
+            if value is None:
+                return None
+            key.append(value)
+        return tuple(key)
+    
     def save(self, *args, **kwargs):
         # Check if this is a new reservation
-        is_new_reservation = False
-        if self.pk:
-            old_instance = FlightRequest.objects.get(pk=self.pk)
-            is_new_reservation = (old_instance.status != 'reserved' and self.status == 'reserved')
-        else:
-            is_new_reservation = self.status == 'reserved'
+        update_fields = kwargs.get('update_fields')
+        is_new_reservation = (
+            self.status == 'reserved' and
+            self._loaded_status != 'reserved' and
+            (update_fields is None or 'status' in update_fields)
+        )
         
+        stamped = set()
         if self.status == 'reserved' and not self.reserved_at:
             self.reserved_at = timezone.now()
+            stamped.add('reserved_at')
+        if (
+            not self._state.adding and
+            self._loaded_status is not None and
+            self.status != self._loaded_status and
+            (update_fields is None or 'status' in update_fields)
+        ):
+            self.status_changed_at = timezone.now()
+            stamped.add('status_changed_at')
+        if stamped and update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *stamped}
         
-        super().save(*args, **kwargs)
+        # Move the row between summary counters in the same transaction
+        old_key = None if self._state.adding else self._loaded_stat_key
+        new_key = self._stat_key(update_fields, old_key)
+        deltas = {}
+        if self._state.adding and new_key:
+            deltas = {new_key: 1}
+        elif old_key and new_key and old_key != new_key:
+            deltas = {old_key: -1, new_key: 1}
+        
+        if deltas or is_new_reservation:
+            from . import outbox
+            from .stats import apply_deltas
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                apply_deltas(deltas)
+                if is_new_reservation:
+                    # Queue the confirmation email with the reservation itself
+                    outbox.enqueue('reservation_confirmation', {self.id: outbox.confirmation_key(self.id)})
+        else:
+            super().save(*args, **kwargs)
+        if update_fields is None or 'status' in update_fields:
+            self._loaded_status = self.status
+        if new_key:
+            self._loaded_stat_key = new_key
         
-        # Send confirmation email for new reservations
+        # Schedule the reminder for new reservations once the row is committed
         if is_new_reservation:
-            from .tasks import send_reservation_confirmation
-            send_reservation_confirmation.delay(self.id)
+            from .tasks import schedule_flight_reminders
+            flight_request_id = self.id
+            transaction.on_commit(lambda: schedule_flight_reminders.delay([flight_request_id]))
+    
+    def is_claimed_by_other(self, user):
+        """Check if another operator holds an active lease on this request"""
+        return (
+            self.claimed_by_id is not None and
+            self.claimed_by_id != user.pk and
+            self.claimed_until is not None and
+            self.claimed_until > timezone.now()
+        )
     
     @property
     def is_pending(self):
@@ -117,3 +374,90 @@ class FlightRequest(models.Model):
             not self.notification_sent and 
             self.days_until_travel == 2
         )
+
+
+class FlightRequestStat(models.Model):
+    """
+    Number of flight requests per (destination, status, travel date).
+
+    Kept up to date with atomic increments whenever a request is created,
+    deleted or changes status, destination or travel date, and periodically
+    reconciled against flight_requests_flightrequest (see stats.py). Its size
+    depends on destinations and dates, not on the number of requests.
+    """
+    destination = models.ForeignKey(Destination, on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=10, choices=FlightRequest.STATUS_CHOICES)
+    travel_date = models.DateField()
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        verbose_name = 'Estadística de Solicitudes'
+        verbose_name_plural = 'Estadísticas de Solicitudes'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['destination', 'status', 'travel_date'],
+                name='flightreqstat_key_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['travel_date'], name='flightreqstat_travel_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.destination_id} {self.status} {self.travel_date}: {self.count}"
+
+class OutboxEmail(models.Model):
+    """
+    Transactional email waiting to be sent, written in the same transaction
+    as the change that triggers it and delivered by the outbox dispatcher
+    (see outbox.py).
+
+    The unique idempotency_key stops a retried task or a repeated save from
+    queueing the same email twice. The body is rendered when the email is
+    sent.
+    """
+    KIND_CHOICES = [
+        ('reservation_confirmation', 'Confirmación de reserva'),
+        ('flight_reminder', 'Recordatorio de vuelo'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('sent', 'Enviado'),
+        ('failed', 'Fallido'),
+    ]
+    
+    idempotency_key = models.CharField(
+        max_length=100,
+        unique=True,
+        help_text='Identifica el email; no se encola dos veces la misma clave'
+    )
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    flight_request = models.ForeignKey(
+        FlightRequest,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        help_text='Próximo intento de envío; también actúa como lease mientras se envía'
+    )
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Email en Cola'
+        verbose_name_plural = 'Emails en Cola'
+        indexes = [
+            # Dispatcher queue: pending emails whose next attempt is due
+            models.Index(
+                fields=['next_attempt_at'],
+                condition=models.Q(status='pending'),
+                name='outbox_pending_due_idx',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.idempotency_key} ({self.status})"
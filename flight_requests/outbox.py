@@ -0,0 +1,172 @@
+import logging
+from datetime import timedelta
+from functools import partial
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.utils import DNS_NAME
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .emails import render_flight_reminder, render_reservation_confirmation
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+# Builds (subject, plain_message, html_message) for each OutboxEmail.kind
+RENDERERS = {
+    'reservation_confirmation': render_reservation_confirmation,
+    'flight_reminder': render_flight_reminder,
+}
+
+def confirmation_key(flight_request_id):
+    return f'reservation_confirmation:{flight_request_id}'
+
+def reminder_key(flight_request_id, travel_date):
+    return f'flight_reminder:{flight_request_id}:{travel_date.isoformat()}'
+
+def enqueue(kind, keys):
+    """
+    Queue one email of kind per {flight_request_id: idempotency_key} in
+    keys, in the caller's transaction. Keys already in the outbox are
+    skipped. The dispatcher of kind is woken up once the transaction
+    commits.
+    """
+    if not keys:
+        return
+    OutboxEmail.objects.bulk_create(
+        [
+            OutboxEmail(kind=kind, flight_request_id=flight_request_id, idempotency_key=key)
+            for flight_request_id, key in keys.items()
+        ],
+        ignore_conflicts=True
+    )
+    transaction.on_commit(partial(_wake_dispatcher, kind))
+
+def _wake_dispatcher(kind):
+    from .tasks import dispatch_email_outbox
+    dispatch_email_outbox.apply_async(
+        kwargs={'kinds': [kind]}, **settings.EMAIL_OUTBOX_DISPATCH_OPTIONS[kind]
+    )
+
+def retry_delay(attempts):
+    """
+    Seconds to wait after the given number of failed attempts, doubling
+    from EMAIL_OUTBOX_RETRY_BACKOFF up to EMAIL_OUTBOX_RETRY_BACKOFF_MAX
+    """
+    return min(
+        settings.EMAIL_OUTBOX_RETRY_BACKOFF * 2 ** (attempts - 1),
+        settings.EMAIL_OUTBOX_RETRY_BACKOFF_MAX
+    )
+
+def claim(batch_size, now, kinds=None):
+    """
+    Take up to batch_size due emails, of the given kinds or of any kind,
+    skipping rows another dispatcher has locked, and move their
+    next_attempt_at past the lease so the batch of a dispatcher that dies
+    mid-send is retried once the lease expires
+    """
+    due = OutboxEmail.objects.filter(status='pending', next_attempt_at__lte=now)
+    if kinds:
+        due = due.filter(kind__in=kinds)
+    with transaction.atomic():
+        emails = list(
+            due.select_related(
+                'flight_request__user', 'flight_request__destination', 'flight_request__reserved_by'
+            ).select_for_update(of=('self',), skip_locked=True)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        if emails:
+            OutboxEmail.objects.filter(id__in=[email.id for email in emails]).update(
+                attempts=F('attempts') + 1,
+                next_attempt_at=now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS)
+            )
+    for email in emails:
+        email.attempts += 1
+    return emails
+
+def send(emails, connection):
+    """
+    Send claimed emails over connection and record the outcome of each:
+    one UPDATE marks the sent ones, and failures are rescheduled with
+    backoff, or marked failed after EMAIL_OUTBOX_MAX_ATTEMPTS.
+    Returns (sent, failed).
+    """
+    sent_ids = []
+    failed = []
+    for email in emails:
+        flight_request = email.flight_request
+        try:
+            subject, plain_message, html_message = RENDERERS[email.kind](flight_request)
+            message = EmailMultiAlternatives(
+                subject=subject,
+                body=plain_message,
+                from_email=settings.EMAIL_HOST_USER,
+                to=[flight_request.user.email],
+                connection=connection,
+                # Stable across retries, so receiving servers can drop duplicates
+                headers={'Message-ID': f'<{email.idempotency_key.replace(":", ".")}@{DNS_NAME}>'},
+            )
+            message.attach_alternative(html_message, 'text/html')
+            # Opens the session on the first send, and again after a failure
+            # closed it; send_messages() on a closed connection would open and
+            # close one per message
+            connection.open()
+            connection.send_messages([message])
+            sent_ids.append(email.id)
+        except Exception as e:
+            # Drop a possibly broken SMTP session; the next send reopens it
+            connection.close()
+            logger.error(f"Error sending outbox email {email.idempotency_key}: {str(e)}")
+            email.last_error = str(e)
+            if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                email.status = 'failed'
+            else:
+                email.next_attempt_at = timezone.now() + timedelta(seconds=retry_delay(email.attempts))
+            failed.append(email)
+
+    if sent_ids:
+        OutboxEmail.objects.filter(id__in=sent_ids).update(
+            status='sent', sent_at=timezone.now(), last_error=''
+        )
+    if failed:
+        OutboxEmail.objects.bulk_update(failed, ['status', 'next_attempt_at', 'last_error'])
+    return len(sent_ids), len(failed)
+
+def dispatch(batch_size=None, max_batches=None, kinds=None):
+    """
+    Drain due emails of the given kinds, or of any kind, batch by batch
+    over one SMTP connection, until none are due or max_batches ran.
+    Returns (sent, failed).
+    """
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    max_batches = max_batches or settings.EMAIL_OUTBOX_MAX_BATCHES
+    total_sent = total_failed = 0
+    connection = get_connection(fail_silently=False)
+    try:
+        for _ in range(max_batches):
+            emails = claim(batch_size, timezone.now(), kinds)
+            if not emails:
+                break
+            sent, failed = send(emails, connection)
+            total_sent += sent
+            total_failed += failed
+            if len(emails) < batch_size:
+                break
+    finally:
+        connection.close()
+    return total_sent, total_failed
+
+def purge_sent(older_than, chunk_size=10_000):
+    """
+    Delete sent emails older than older_than in chunks, so no single
+    DELETE holds locks for long. Returns the number deleted.
+    """
+    deleted = 0
+    while True:
+        ids = list(
+            OutboxEmail.objects.filter(status='sent', sent_at__lt=older_than)
+            .values_list('id', flat=True)[:chunk_size]
+        )
+        if not ids:
+            return deleted
+        deleted += OutboxEmail.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,160 @@
+from datetime import datetime
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+# Joins the ordering values of a row into a cursor position
+POSITION_SEPARATOR = '|'
+
+class FlightRequestCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (created_at, id), newest first.
+
+    A cursor holds the full (created_at, id) of the row the page starts
+    after, and the page is fetched with a WHERE on that tuple instead of
+    OFFSET. id makes every position unique, so rows sharing a created_at
+    are neither skipped nor repeated. No COUNT(*) is issued, so page N
+    costs the same as page 1.
+
+    Search results are ordered by (search_rank_key, created_at, id) the
+    same way.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Search results (FlightRequestQuerySet.search) are ordered by rank
+        first; ties keep the usual newest-first order
+        """
+        ordering = super().get_ordering(request, queryset, view)
+        if 'search_rank_key' in queryset.query.annotations:
+            return ('-search_rank_key', *ordering)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.get_page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+        return self.set_page(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        paginate_queryset for async views, fetching the page with the async ORM
+        """
+        page_queryset = self.get_page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+        return self.set_page([obj async for obj in page_queryset])
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        The unevaluated query for the requested page, with one extra row to
+        tell whether another page follows
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        # A previous link walks the ordering backwards from its position
+        ordering = self.ordering
+        if self.cursor and self.cursor.reverse:
+            ordering = tuple(reverse_order(order) for order in ordering)
+        queryset = queryset.order_by(*ordering)
+
+        if self.cursor and self.cursor.position is not None:
+            values = self.decode_position(queryset, self.cursor.position)
+            queryset = queryset.filter(rows_after(ordering, values))
+
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        """
+        Build the page and whether pages exist before and after it
+        """
+        self.page = list(results[:self.page_size])
+        has_more = len(results) > self.page_size
+        has_position = self.cursor is not None and self.cursor.position is not None
+
+        if self.cursor and self.cursor.reverse:
+            # Fetched backwards, so put the rows back in order
+            self.page.reverse()
+            self.has_next = has_position
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = has_position
+
+        # Display page controls in the browsable API if there is more
+        # than one page.
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self.encode_position(self.page[-1]) if self.page else self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self.encode_position(self.page[0]) if self.page else self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def encode_position(self, instance):
+        values = [getattr(instance, order.lstrip('-')) for order in self.ordering]
+        return POSITION_SEPARATOR.join(
+            value.isoformat() if isinstance(value, datetime) else str(value)
+            for value in values
+        )
+
+    def decode_position(self, queryset, position):
+        """
+        Values of a cursor position, converted by the field (or annotation)
+        each was read from
+        """
+        parts = position.split(POSITION_SEPARATOR)
+        if len(parts) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        values = []
+        for order, part in zip(self.ordering, parts):
+            name = order.lstrip('-')
+            if name in queryset.query.annotations:
+                field = queryset.query.annotations[name].output_field
+            else:
+                field = queryset.model._meta.get_field(name)
+            try:
+                values.append(field.to_python(part))
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+        return values
+
+def reverse_order(order):
+    return order[1:] if order.startswith('-') else f'-{order}'
+
+def rows_after(ordering, values):
+    """
+    Filter for the rows that follow values in ordering, i.e. the row
+    comparison (a, b) > (x, y) written out as a > x OR (a = x AND b > y)
+    so fields may be sorted in different directions. The range on the
+    first field alone is repeated so it can bound an index scan.
+    """
+    names = [order.lstrip('-') for order in ordering]
+    lookups = ['lt' if order.startswith('-') else 'gt' for order in ordering]
+
+    condition = Q()
+    for i, (name, lookup) in enumerate(zip(names, lookups)):
+        equal = {names[j]: values[j] for j in range(i)}
+        condition |= Q(**equal, **{f'{name}__{lookup}': values[i]})
+    return Q(**{f'{names[0]}__{lookups[0]}e': values[0]}) & condition
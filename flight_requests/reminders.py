@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+from django.conf import settings
+
+# Reminders go out this many days before travel
+REMINDER_DAYS_BEFORE = 2
+
+def reminder_eta(travel_date, reserved_at):
+    """
+    Moment a reservation's reminder is due: REMINDER_DAYS_BEFORE days
+    before travel, at the time of day it was reserved, so reminders are
+    spread over the day the same way reservations are
+    """
+    return datetime.combine(travel_date - timedelta(days=REMINDER_DAYS_BEFORE), reserved_at.timetz())
+
+def plan(rows, now):
+    """
+    Split rows of (id, travel_date, reserved_at) into the ids to send right
+    away, whose ETA already passed on their reminder day, and the (id, eta)
+    pairs due within the next FLIGHT_REMINDER_SCHEDULE_WINDOW seconds.
+
+    Reminders further ahead are left to a later pass. Reminders whose day
+    is over are dropped, since the email announces travel in 2 days.
+    """
+    horizon = now + timedelta(seconds=settings.FLIGHT_REMINDER_SCHEDULE_WINDOW)
+    send_now = []
+    scheduled = []
+    for pk, travel_date, reserved_at in rows:
+        eta = reminder_eta(travel_date, reserved_at)
+        if eta <= now:
+            if eta.date() == now.date():
+                send_now.append(pk)
+        elif eta <= horizon:
+            scheduled.append((pk, eta))
+    return send_now, scheduled
@@ -0,0 +1,61 @@
+import re
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db.models import BooleanField, Func
+
+# Shorter terms match too many prefixes to be served from the indexes
+SEARCH_MIN_LENGTH = 3
+
+# search_rank_key keeps the rank to 4 decimals: ts_rank is a float4 that
+# does not survive a round trip through a cursor, and many rows tie on it
+RANK_KEY_SCALE = 10_000
+
+# Text search configuration shared by every search index: lowercases
+# without stemming, so names, emails and IATA codes are matched as typed
+SEARCH_CONFIG = 'simple'
+
+# Words of a query; emails are kept whole because the parser indexes
+# them as one token
+_TERM_RE = re.compile(r'[\w@.+-]+')
+
+def notes_search_vector():
+    """
+    Document indexed by flightreq_notes_search_idx; filters must use this
+    exact expression for PostgreSQL to match it against the index
+    """
+    return SearchVector('notes', config=SEARCH_CONFIG)
+
+def rank_vector():
+    """
+    Weighted document of the rows already matched, used only for ranking:
+    user name and email first, then destination, then notes
+    """
+    return (
+        SearchVector('user__first_name', 'user__last_name', 'user__email', config=SEARCH_CONFIG, weight='A') +
+        SearchVector('destination__name', 'destination__code', config=SEARCH_CONFIG, weight='B') +
+        SearchVector('notes', config=SEARCH_CONFIG, weight='C')
+    )
+
+class EqualsAny(Func):
+    """
+    column = ANY(array). Given an ArraySubquery, PostgreSQL computes the
+    array once and can still serve the comparison from the column's index
+    inside an OR, which column IN (subquery) does not allow.
+    """
+    template = '%(expressions)s)'
+    arg_joiner = ' = ANY('
+    output_field = BooleanField()
+
+def parse_query(text):
+    """
+    SearchQuery matching every word of text as a prefix, or None when text
+    has no searchable words
+    """
+    terms = [term.strip('.+-') for term in _TERM_RE.findall(text)]
+    terms = [term for term in terms if term]
+    if not terms:
+        return None
+    return SearchQuery(
+        ' & '.join(f"'{term}':*" for term in terms),
+        search_type='raw',
+        config=SEARCH_CONFIG
+    )
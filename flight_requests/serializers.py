@@ -31,10 +31,12 @@ class FlightRequestSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'user', 'destination', 'travel_date', 'status', 'status_display',
             'notes', 'operator_notes', 'reserved_by', 'reserved_at',
-            'days_until_travel', 'created_at', 'updated_at'
+            'status_changed_by', 'status_changed_at',
+            'claimed_by', 'claimed_until', 'days_until_travel', 'created_at', 'updated_at'
         )
         read_only_fields = (
-            'id', 'user', 'reserved_by', 'reserved_at', 'created_at', 'updated_at'
+            'id', 'user', 'reserved_by', 'reserved_at', 'status_changed_by', 'status_changed_at',
+            'claimed_by', 'claimed_until', 'created_at', 'updated_at'
         )
 
 class FlightRequestUpdateSerializer(serializers.ModelSerializer):
@@ -47,4 +49,33 @@ class FlightRequestUpdateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 "No se puede modificar una solicitud completada"
             )
-        return value
\ No newline at end of file
+        return value
+
+class BulkTransitionSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000
+    )
+    operator_notes = serializers.CharField(
+        required=False,
+        allow_blank=True,
+        help_text='Notas del operador; si se omite se conservan las actuales'
+    )
+    
+    def validate_ids(self, value):
+        # Keep the caller's order but drop duplicates
+        return list(dict.fromkeys(value))
+
+class ClaimSerializer(serializers.Serializer):
+    count = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+class ExportFilterSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=FlightRequest.STATUS_CHOICES, required=False)
+    date_from = serializers.DateField(required=False, help_text='Fecha de viaje desde (inclusive)')
+    date_to = serializers.DateField(required=False, help_text='Fecha de viaje hasta (inclusive)')
+    
+    def validate(self, attrs):
+        if attrs.get('date_from') and attrs.get('date_to') and attrs['date_from'] > attrs['date_to']:
+            raise serializers.ValidationError('date_from no puede ser posterior a date_to')
+        return attrs
@@ -0,0 +1,28 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from users.models import User
+from users.serializers import UserSerializer
+from . import cache as list_cache
+from .models import FlightRequest
+from .stats import decrement
+
+@receiver(post_delete, sender=FlightRequest)
+def decrement_stat(sender, instance, **kwargs):
+    key = instance._stat_key()
+    if key:
+        decrement(key)
+
+@receiver(post_save, sender=FlightRequest)
+@receiver(post_delete, sender=FlightRequest)
+def invalidate_list_version(sender, instance, **kwargs):
+    list_cache.invalidate([instance.user_id])
+
+@receiver(post_save, sender=User)
+def invalidate_owner_list_version(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Lists embed their owner through UserSerializer, so edits to those
+    fields change the owner's lists (logins only touch last_login)
+    """
+    if created or (update_fields is not None and not set(update_fields) & set(UserSerializer.Meta.fields)):
+        return
+    list_cache.invalidate([instance.pk])
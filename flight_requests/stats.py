@@ -0,0 +1,133 @@
+from collections import Counter
+from datetime import timedelta
+from django.db import connection, transaction
+from django.db.models import Count, ExpressionWrapper, F, IntegerField, Q, Sum
+from django.utils import timezone
+from destinations.models import Destination
+from .models import FlightRequest, FlightRequestStat
+
+# Upcoming travel windows reported by get_stats(), in days from today
+UPCOMING_WINDOWS = (
+    ('today', 0),
+    ('next_7_days', 7),
+    ('next_30_days', 30),
+    ('next_90_days', 90),
+)
+# Only these statuses are trips that are still going to happen
+UPCOMING_STATUSES = ('pending', 'reserved')
+
+def apply_deltas(deltas):
+    """
+    Add {(destination_id, status, travel_date): delta} to the summary table.
+
+    All counters are changed by one INSERT ... ON CONFLICT DO UPDATE, an
+    atomic increment that needs no prior read. Keys are sorted so concurrent
+    callers lock counter rows in the same order.
+    """
+    rows = sorted((key, delta) for key, delta in deltas.items() if delta)
+    if not rows:
+        return
+
+    table = connection.ops.quote_name(FlightRequestStat._meta.db_table)
+    values = ', '.join(['(%s, %s, %s, %s)'] * len(rows))
+    params = [value for key, delta in rows for value in (*key, delta)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (destination_id, status, travel_date, count) VALUES {values} '
+            f'ON CONFLICT (destination_id, status, travel_date) '
+            f'DO UPDATE SET count = {table}.count + EXCLUDED.count',
+            params
+        )
+
+def decrement(key):
+    """
+    Take one request off a counter without creating it, for deletes that
+    may race with the cascade deleting the counter row itself
+    """
+    destination_id, status, travel_date = key
+    FlightRequestStat.objects.filter(
+        destination_id=destination_id, status=status, travel_date=travel_date
+    ).update(count=F('count') - 1)
+
+def transition_deltas(rows, new_status):
+    """
+    Counter deltas for moving rows of (destination_id, status, travel_date)
+    to new_status
+    """
+    deltas = Counter()
+    for destination_id, status, travel_date in rows:
+        if status != new_status:
+            deltas[(destination_id, status, travel_date)] -= 1
+            deltas[(destination_id, new_status, travel_date)] += 1
+    return deltas
+
+def get_stats(today=None):
+    """
+    Counts by status, by destination and by upcoming travel window, read
+    from the summary table only
+    """
+    today = today or timezone.localdate()
+    counters = FlightRequestStat.objects.exclude(count=0)
+
+    by_status = {key: 0 for key, _ in FlightRequest.STATUS_CHOICES}
+    for status, total in counters.values_list('status').annotate(total=Sum('count')).order_by():
+        by_status[status] = total
+
+    per_destination = {}
+    for destination_id, status, total in (
+        counters.values_list('destination_id', 'status').annotate(total=Sum('count')).order_by()
+    ):
+        per_destination.setdefault(destination_id, {})[status] = total
+    destinations = Destination.objects.filter(id__in=per_destination).values('id', 'code', 'name')
+    by_destination = sorted(
+        (
+            {
+                **destination,
+                'total': sum(per_destination[destination['id']].values()),
+                'by_status': per_destination[destination['id']],
+            }
+            for destination in destinations
+        ),
+        key=lambda item: (-item['total'], item['name'])
+    )
+
+    upcoming = counters.filter(status__in=UPCOMING_STATUSES).aggregate(**{
+        name: Sum('count', filter=Q(travel_date__gte=today, travel_date__lte=today + timedelta(days=days)), default=0)
+        for name, days in UPCOMING_WINDOWS
+    })
+
+    return {
+        'total': sum(by_status.values()),
+        'by_status': by_status,
+        'by_destination': by_destination,
+        'upcoming': upcoming,
+    }
+
+def reconcile():
+    """
+    Recount every counter from flight_requests_flightrequest and fix the
+    ones that drifted. Returns the number of counters corrected.
+
+    Rows and counters are read by one UNION ALL statement, so both come
+    from the same snapshot: every write moves its rows and its counters in
+    one transaction, hence any difference between them is drift. Only that
+    difference is applied, as the same atomic increments writers use, so
+    no lock is taken and writes committed meanwhile are kept.
+    """
+    actual = (
+        FlightRequest.objects.values_list('destination_id', 'status', 'travel_date')
+        .annotate(total=Count('id')).order_by()
+    )
+    stored = FlightRequestStat.objects.values_list('destination_id', 'status', 'travel_date').annotate(
+        total=ExpressionWrapper(-F('count'), output_field=IntegerField())
+    )
+    drift = Counter()
+    for destination_id, status, travel_date, total in actual.union(stored, all=True):
+        drift[(destination_id, status, travel_date)] += total
+
+    with transaction.atomic():
+        apply_deltas(drift)
+        # Counters of keys left without requests
+        FlightRequestStat.objects.filter(count=0).delete()
+
+    return sum(1 for delta in drift.values() if delta)
@@ -1,131 +1,229 @@
 from celery import shared_task
-from django.core.mail import send_mail
 from django.conf import settings
-from django.template.loader import render_to_string
+from django.db import transaction
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from . import outbox, reminders
 from .models import FlightRequest
 import logging
 
 logger = logging.getLogger(__name__)
 
-@shared_task
+@shared_task(ignore_result=True)
 def send_flight_reminder_notification(flight_request_id):
     """
-    Send reminder notification 2 days before flight
+    Queue the reminder email 2 days before flight in the outbox
     """
     try:
-        flight_request = FlightRequest.objects.get(id=flight_request_id)
-        
-        if flight_request.notification_sent:
-            logger.info(f"Notification already sent for flight request {flight_request_id}")
-            return
-        
-        # Check if flight is still reserved and 2 days away
-        if not flight_request.is_reserved:
-            logger.info(f"Flight request {flight_request_id} is not reserved, skipping notification")
-            return
-        
-        days_until_travel = flight_request.days_until_travel
-        if days_until_travel != 2:
-            logger.info(f"Flight request {flight_request_id} is {days_until_travel} days away, not 2 days")
-            return
-        
-        # Prepare email content
-        subject = f'Recordatorio: Tu vuelo a {flight_request.destination.name} es en 2 días'
-        
-        context = {
-            'user': flight_request.user,
-            'flight_request': flight_request,
-            'travel_date': flight_request.travel_date,
-            'destination': flight_request.destination,
-        }
-        
-        html_message = render_to_string('emails/flight_reminder.html', context)
-        plain_message = render_to_string('emails/flight_reminder.txt', context)
-        
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            html_message=html_message,
-            from_email=settings.EMAIL_HOST_USER,
-            recipient_list=[flight_request.user.email],
-            fail_silently=False,
-        )
-        
-        # Mark notification as sent
-        flight_request.notification_sent = True
-        flight_request.save(update_fields=['notification_sent'])
-        
-        logger.info(f"Reminder notification sent successfully for flight request {flight_request_id}")
-        return f"Notification sent to {flight_request.user.email}"
+        with transaction.atomic():
+            # Lock the row so a reminder queued twice (its ETA task and the
+            # hourly reconciliation) is only handled once
+            flight_request = FlightRequest.objects.select_for_update(of=('self',)).select_related(
+                'user'
+            ).get(id=flight_request_id)
+            
+            if flight_request.notification_sent:
+                logger.info(f"Notification already sent for flight request {flight_request_id}")
+                return f"Notification already sent for flight request {flight_request_id}"
+            
+            # Check if flight is still reserved and 2 days away; reminders
+            # scheduled before a cancellation or date change end here
+            if not flight_request.is_reserved:
+                logger.info(f"Flight request {flight_request_id} is not reserved, skipping notification")
+                return f"Flight request {flight_request_id} is not reserved, skipping notification"
+            
+            days_until_travel = flight_request.days_until_travel
+            if days_until_travel != reminders.REMINDER_DAYS_BEFORE:
+                logger.info(f"Flight request {flight_request_id} is {days_until_travel} days away, not 2 days")
+                return f"Flight request {flight_request_id} is {days_until_travel} days away, not 2 days"
+            
+            # The email and the flag are committed together
+            outbox.enqueue('flight_reminder', {
+                flight_request.id: outbox.reminder_key(flight_request.id, flight_request.travel_date)
+            })
+            flight_request.notification_sent = True
+            flight_request.save(update_fields=['notification_sent'])
+        
+        logger.info(f"Reminder notification queued for flight request {flight_request_id}")
+        return f"Notification queued for {flight_request.user.email}"
         
     except FlightRequest.DoesNotExist:
         logger.error(f"Flight request {flight_request_id} not found")
         return f"Flight request {flight_request_id} not found"
-    except Exception as e:
-        logger.error(f"Error sending notification for flight request {flight_request_id}: {str(e)}")
-        raise
 
-@shared_task
-def check_and_send_flight_reminders():
+@shared_task(ignore_result=True)
+def send_flight_reminder_batch(flight_request_ids):
     """
-    Periodic task to check all flight requests that need reminders
+    Queue the reminders for a chunk of flight requests in the outbox and
+    mark them with one UPDATE, in one transaction
     """
-    try:
-        # Get all reserved flights that need notification (2 days before travel)
-        today = timezone.now().date()
-        target_date = today + timezone.timedelta(days=2)
-        
-        flight_requests = FlightRequest.objects.filter(
+    target_date = timezone.now().date() + timezone.timedelta(days=reminders.REMINDER_DAYS_BEFORE)
+    with transaction.atomic():
+        # Rows locked by another task handling the same reminders are
+        # skipped; once it commits they are marked as sent
+        rows = FlightRequest.objects.select_for_update(skip_locked=True).filter(
+            id__in=flight_request_ids,
             status='reserved',
             travel_date=target_date,
             notification_sent=False
-        )
-        
-        count = 0
-        for flight_request in flight_requests:
-            send_flight_reminder_notification.delay(flight_request.id)
-            count += 1
-        
-        logger.info(f"Queued {count} flight reminder notifications")
-        return f"Queued {count} notifications"
+        ).values_list('id', 'travel_date', 'user_id')
+        due = {flight_request_id: (travel_date, user_id) for flight_request_id, travel_date, user_id in rows}
+        outbox.enqueue('flight_reminder', {
+            flight_request_id: outbox.reminder_key(flight_request_id, travel_date)
+            for flight_request_id, (travel_date, _) in due.items()
+        })
+        if due:
+            FlightRequest.objects.filter(id__in=due).update_owned(
+                {user_id for _, user_id in due.values()}, notification_sent=True
+            )
+    
+    skipped = len(flight_request_ids) - len(due)
+    logger.info(f"Reminder batch: {len(due)} queued, {skipped} skipped")
+    return f"Queued {len(due)} notifications, {skipped} skipped"
+
+def reminder_rows(queryset):
+    """
+    (id, travel_date, reserved_at) of the reserved, not yet notified
+    requests in queryset; rows without reserved_at use created_at
+    """
+    return queryset.filter(status='reserved', notification_sent=False).values_list(
+        'id', 'travel_date', Coalesce('reserved_at', 'created_at')
+    )
+
+def queue_reminders(flight_request_ids, scheduled=()):
+    """
+    Send the reminders in flight_request_ids now, in chunks of
+    FLIGHT_REMINDER_BATCH_SIZE, and queue each (id, eta) in scheduled
+    to run at its ETA
+    """
+    batch_size = settings.FLIGHT_REMINDER_BATCH_SIZE
+    if batch_size > 1:
+        for start in range(0, len(flight_request_ids), batch_size):
+            send_flight_reminder_batch.delay(flight_request_ids[start:start + batch_size])
+    else:
+        for flight_request_id in flight_request_ids:
+            send_flight_reminder_notification.delay(flight_request_id)
+    
+    for flight_request_id, eta in scheduled:
+        send_flight_reminder_notification.apply_async((flight_request_id,), eta=eta)
+
+@shared_task(ignore_result=True)
+def schedule_flight_reminders(flight_request_ids):
+    """
+    Queue the reminders of newly reserved requests that are due within the
+    next scheduling window; later ones are queued by the hourly pass
+    """
+    now = timezone.now()
+    send_now, scheduled = reminders.plan(
+        reminder_rows(FlightRequest.objects.filter(id__in=flight_request_ids)), now
+    )
+    queue_reminders(send_now, scheduled)
+    return f"Queued {len(send_now)} notifications, scheduled {len(scheduled)}"
+
+@shared_task
+def check_and_send_flight_reminders():
+    """
+    Hourly pass over the reminders due today and tomorrow: queue the ones
+    due within the next window with their ETA, and send right away any
+    whose ETA passed without it being sent (a lost task or missed run)
+    """
+    try:
+        now = timezone.now()
+        horizon = now + timezone.timedelta(seconds=settings.FLIGHT_REMINDER_SCHEDULE_WINDOW)
+        days_before = timezone.timedelta(days=reminders.REMINDER_DAYS_BEFORE)
+        
+        # Range scan over the flightreq_reminder_due_idx partial index
+        rows = reminder_rows(FlightRequest.objects.filter(
+            travel_date__gte=now.date() + days_before,
+            travel_date__lte=horizon.date() + days_before
+        ))
+        send_now, scheduled = reminders.plan(rows, now)
+        queue_reminders(send_now, scheduled)
+        count = len(send_now)
+        
+        logger.info(f"Queued {count} flight reminder notifications, scheduled {len(scheduled)}")
+        return {'queued': count, 'scheduled': len(scheduled)}
         
     except Exception as e:
         logger.error(f"Error in check_and_send_flight_reminders: {str(e)}")
         raise
 
-@shared_task
+def queue_confirmations(flight_request_ids):
+    """
+    Queue confirmation emails for the reserved requests among
+    flight_request_ids
+    """
+    with transaction.atomic():
+        reserved_ids = FlightRequest.objects.filter(
+            id__in=flight_request_ids, status='reserved'
+        ).values_list('id', flat=True)
+        outbox.enqueue('reservation_confirmation', {
+            flight_request_id: outbox.confirmation_key(flight_request_id)
+            for flight_request_id in reserved_ids
+        })
+    return len(reserved_ids)
+
+@shared_task(ignore_result=True)
 def send_reservation_confirmation(flight_request_id):
     """
-    Send confirmation email when flight is reserved
+    Queue the confirmation email of a reserved request in the outbox.
+    Reservations queue it themselves; this handles messages published
+    before the outbox existed.
     """
-    try:
-        flight_request = FlightRequest.objects.get(id=flight_request_id)
-        
-        subject = f'Confirmación: Tu vuelo a {flight_request.destination.name} ha sido reservado'
-        
-        context = {
-            'user': flight_request.user,
-            'flight_request': flight_request,
-            'reserved_by': flight_request.reserved_by,
-            'reserved_at': flight_request.reserved_at,
-        }
-        
-        html_message = render_to_string('emails/reservation_confirmation.html', context)
-        plain_message = render_to_string('emails/reservation_confirmation.txt', context)
-        
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            html_message=html_message,
-            from_email=settings.EMAIL_HOST_USER,
-            recipient_list=[flight_request.user.email],
-            fail_silently=False,
-        )
-        
-        logger.info(f"Reservation confirmation sent for flight request {flight_request_id}")
-        return f"Confirmation sent to {flight_request.user.email}"
-        
-    except Exception as e:
-        logger.error(f"Error sending reservation confirmation for {flight_request_id}: {str(e)}")
-        raise
\ No newline at end of file
+    queued = queue_confirmations([flight_request_id])
+    return f"Queued {queued} confirmations"
+
+@shared_task(ignore_result=True)
+def send_reservation_confirmation_batch(flight_request_ids):
+    """
+    Batch version of send_reservation_confirmation
+    """
+    queued = queue_confirmations(flight_request_ids)
+    skipped = len(flight_request_ids) - queued
+    return f"Queued {queued} confirmations, {skipped} skipped"
+
+@shared_task(ignore_result=True)
+def dispatch_email_outbox(kinds=None):
+    """
+    Send the outbox emails of the given kinds, or of any kind, that are
+    due. Woken up after every enqueue on the queue of its kind, see
+    EMAIL_OUTBOX_DISPATCH_OPTIONS, and run every minute to pick up retries.
+    """
+    sent, failed = outbox.dispatch(kinds=kinds)
+    if sent or failed:
+        logger.info(f"Outbox dispatch: {sent} sent, {failed} failed")
+    return f"Sent {sent} emails, {failed} failed"
+
+@shared_task
+def purge_email_outbox():
+    """
+    Delete sent outbox emails older than EMAIL_OUTBOX_RETENTION_DAYS
+    """
+    older_than = timezone.now() - timezone.timedelta(days=settings.EMAIL_OUTBOX_RETENTION_DAYS)
+    deleted = outbox.purge_sent(older_than)
+    logger.info(f"Purged {deleted} sent outbox emails")
+    return {'deleted': deleted}
+
+@shared_task(ignore_result=True)
+def release_expired_claims():
+    """
+    Periodic task to return requests with an expired operator lease to the queue
+    """
+    now = timezone.now()
+    released = FlightRequest.objects.filter(
+        claimed_until__lte=now
+    ).update(claimed_by=None, claimed_until=None, updated_at=now)
+    
+    logger.info(f"Released {released} expired flight request claims")
+    return f"Released {released} claims"
+
+@shared_task
+def reconcile_flight_request_stats():
+    """
+    Fix any drift between FlightRequestStat counters and the actual rows
+    """
+    from .stats import reconcile
+    corrected = reconcile()
+    if corrected:
+        logger.warning(f'Corrected {corrected} flight request stat counters')
+    return {'corrected': corrected}
@@ -1,10 +1,19 @@
+import unittest
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.template.loader import render_to_string
 from django.utils import timezone
 from datetime import date, timedelta
 from unittest.mock import patch
 from users.models import User
 from destinations.models import Destination
-from flight_requests.models import FlightRequest
+from flight_requests.models import FlightRequest, FlightRequestStat, OutboxEmail
+from flight_requests import stats, transitions
+from flight_requests.admin import EstimatedCountPaginator, planner_row_estimate
+from flight_requests.emails import (
+    fragment_cache, render_flight_reminder, render_reservation_confirmation
+)
 
 class FlightRequestModelTest(TestCase):
     def setUp(self):
@@ -117,21 +126,28 @@ class FlightRequestModelTest(TestCase):
         
         self.assertFalse(flight_request.needs_notification)
 
-    @patch('flight_requests.tasks.send_reservation_confirmation')
-    def test_reservation_triggers_notification(self, mock_send_confirmation):
+    @patch('flight_requests.tasks.dispatch_email_outbox')
+    def test_reservation_triggers_notification(self, mock_dispatch):
         """Test that changing status to reserved triggers notification"""
         flight_request = FlightRequest.objects.create(**self.flight_request_data)
         
         # Change to reserved
         flight_request.status = 'reserved'
         flight_request.reserved_by = self.operator
-        flight_request.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            flight_request.save()
         
         # Check that reserved_at was set
         self.assertIsNotNone(flight_request.reserved_at)
         
-        # Check that notification task was called
-        mock_send_confirmation.delay.assert_called_once_with(flight_request.id)
+        # Check that the confirmation was queued and the dispatcher woken up
+        self.assertEqual(
+            list(OutboxEmail.objects.values_list('kind', 'flight_request_id')),
+            [('reservation_confirmation', flight_request.id)]
+        )
+        mock_dispatch.apply_async.assert_called_once_with(
+            kwargs={'kinds': ['reservation_confirmation']}, queue='confirmations', priority=0
+        )
 
     def test_save_sets_reserved_at(self):
         """Test that saving with reserved status sets reserved_at"""
@@ -146,3 +162,507 @@ class FlightRequestModelTest(TestCase):
         
         # Now should have reserved_at
         self.assertIsNotNone(flight_request.reserved_at)
+
+    @patch('flight_requests.tasks.dispatch_email_outbox')
+    def test_reservation_notification_waits_for_commit(self, mock_dispatch):
+        """Test that the confirmation is written with the reservation and dispatched after commit"""
+        flight_request = FlightRequest.objects.create(**self.flight_request_data)
+        
+        with self.captureOnCommitCallbacks() as callbacks:
+            flight_request.status = 'reserved'
+            flight_request.save()
+            self.assertTrue(OutboxEmail.objects.filter(flight_request=flight_request).exists())
+        
+        # Bump the list versions, wake up the dispatcher, schedule the reminder
+        self.assertEqual(len(callbacks), 3)
+        mock_dispatch.apply_async.assert_not_called()
+        callbacks[1]()
+        mock_dispatch.apply_async.assert_called_once()
+
+    def test_repeated_reservation_save_queues_one_confirmation(self):
+        """Test that the idempotency key drops a second confirmation"""
+        flight_request = FlightRequest.objects.create(**self.flight_request_data)
+        # Two copies loaded while the request was pending
+        first = FlightRequest.objects.get(pk=flight_request.pk)
+        second = FlightRequest.objects.get(pk=flight_request.pk)
+        for copy in (first, second):
+            copy.status = 'reserved'
+            copy.save()
+        
+        self.assertEqual(OutboxEmail.objects.filter(flight_request=flight_request).count(), 1)
+
+    @patch('flight_requests.tasks.send_reservation_confirmation')
+    def test_save_does_not_refetch_row(self, mock_send_confirmation):
+        """Test that updating a loaded request issues a single UPDATE"""
+        created = FlightRequest.objects.create(**self.flight_request_data)
+        flight_request = FlightRequest.objects.get(pk=created.pk)
+        
+        # A status change also moves the row between stat counters
+        flight_request.status = 'reserved'
+        with CaptureQueriesContext(connection) as queries:
+            flight_request.save()
+        statements = [query['sql'].split()[0] for query in queries]
+        self.assertEqual(statements.count('UPDATE'), 1)
+        # Stat counters upsert and the confirmation email in the outbox
+        self.assertEqual(statements.count('INSERT'), 2)
+        self.assertNotIn('SELECT', statements)
+        
+        # Saving again without a status change is not a new reservation
+        with self.captureOnCommitCallbacks() as callbacks:
+            flight_request.operator_notes = 'Asiento de ventana'
+            with self.assertNumQueries(1):
+                flight_request.save()
+        
+        # Only the list version bump
+        self.assertEqual(len(callbacks), 1)
+
+    @patch('flight_requests.tasks.send_reservation_confirmation')
+    def test_update_fields_without_status_is_not_a_reservation(self, mock_send_confirmation):
+        """Test that partial saves that skip status do not notify"""
+        flight_request = FlightRequest.objects.create(**self.flight_request_data)
+        flight_request.status = 'reserved'
+        
+        with self.captureOnCommitCallbacks() as callbacks:
+            flight_request.save(update_fields=['notification_sent'])
+        
+        # Only the list version bump
+        self.assertEqual(len(callbacks), 1)
+
+class FlightRequestStatTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='client',
+            email='client@example.com',
+            password='testpass123'
+        )
+        self.quito = Destination.objects.create(name='Quito', code='UIO')
+        self.lima = Destination.objects.create(name='Lima', code='LIM')
+        self.travel_date = date.today() + timedelta(days=5)
+
+    def create(self, destination, **kwargs):
+        return FlightRequest.objects.create(
+            user=self.user,
+            destination=destination,
+            travel_date=kwargs.pop('travel_date', self.travel_date),
+            **kwargs
+        )
+
+    def counters(self):
+        return {
+            (stat.destination_id, stat.status, stat.travel_date): stat.count
+            for stat in FlightRequestStat.objects.exclude(count=0)
+        }
+
+    def assertCountersMatchRows(self):
+        actual = {}
+        for key in FlightRequest.objects.values_list('destination_id', 'status', 'travel_date'):
+            actual[key] = actual.get(key, 0) + 1
+        self.assertEqual(self.counters(), actual)
+
+    @patch('flight_requests.tasks.send_reservation_confirmation')
+    def test_transitions_keep_counters(self, mock_send_confirmation):
+        """Test that create, save, bulk status updates and delete move counters"""
+        first = self.create(self.quito)
+        second = self.create(self.quito)
+        third = self.create(self.lima, travel_date=self.travel_date + timedelta(days=40))
+        self.assertCountersMatchRows()
+        
+        first.status = 'reserved'
+        first.save()
+        second.travel_date += timedelta(days=1)
+        second.save(update_fields=['travel_date'])
+        self.assertCountersMatchRows()
+        
+        outcomes = transitions.apply_transition([first.pk, second.pk], 'cancelled', self.user)
+        self.assertEqual(list(outcomes.values()), [transitions.CHANGED] * 2)
+        self.assertCountersMatchRows()
+        
+        third.delete()
+        self.assertCountersMatchRows()
+
+    def test_bulk_create_keeps_counters(self):
+        """Test that bulk-created requests are counted and move counters when saved"""
+        created = FlightRequest.objects.bulk_create([
+            FlightRequest(user=self.user, destination=destination, travel_date=self.travel_date)
+            for destination in (self.quito, self.quito, self.lima)
+        ])
+        self.assertCountersMatchRows()
+        
+        created[0].status = 'cancelled'
+        created[0].save()
+        self.assertCountersMatchRows()
+        
+        with self.assertRaises(ValueError):
+            FlightRequest.objects.bulk_create(
+                [FlightRequest(user=self.user, destination=self.lima, travel_date=self.travel_date)],
+                ignore_conflicts=True
+            )
+
+    def test_get_stats(self):
+        """Test counts by status, destination and upcoming window"""
+        self.create(self.quito)
+        self.create(self.quito, status='reserved', travel_date=date.today() + timedelta(days=20))
+        self.create(self.lima, status='cancelled')
+        self.create(self.lima, travel_date=date.today() - timedelta(days=1))
+        
+        with self.assertNumQueries(4):
+            result = stats.get_stats()
+        
+        self.assertEqual(result['total'], 4)
+        self.assertEqual(result['by_status'], {'pending': 2, 'reserved': 1, 'cancelled': 1, 'completed': 0})
+        self.assertEqual(
+            [(item['code'], item['total']) for item in result['by_destination']],
+            [('LIM', 2), ('UIO', 2)]
+        )
+        self.assertEqual(result['by_destination'][1]['by_status'], {'pending': 1, 'reserved': 1})
+        self.assertEqual(
+            result['upcoming'],
+            {'today': 0, 'next_7_days': 1, 'next_30_days': 2, 'next_90_days': 2}
+        )
+
+    def test_reconcile_fixes_drift(self):
+        """Test that reconciliation rewrites counters that drifted"""
+        kept = self.create(self.quito)
+        self.create(self.lima)
+        # Writes that bypass the model leave the counters stale
+        FlightRequest.objects.filter(pk=kept.pk).update(status='completed')
+        FlightRequestStat.objects.filter(destination=self.lima).update(count=7)
+        FlightRequestStat.objects.create(
+            destination=self.lima, status='reserved', travel_date=self.travel_date, count=3
+        )
+        
+        self.assertEqual(stats.reconcile(), 4)
+        self.assertCountersMatchRows()
+        self.assertEqual(stats.reconcile(), 0)
+
+    def test_reconcile_reads_in_one_statement_without_locking(self):
+        """Test that the recount takes no table lock and applies only differences"""
+        self.create(self.quito)
+        FlightRequestStat.objects.update(count=5)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(stats.reconcile(), 1)
+        statements = [query['sql'].lstrip('(').split()[0] for query in queries]
+        self.assertNotIn('LOCK', statements)
+        # Rows and counters are compared within a single UNION ALL
+        self.assertEqual(statements.count('SELECT'), 1)
+        self.assertCountersMatchRows()
+
+class TransitionServiceTest(TestCase):
+    def setUp(self):
+        self.client_user = User.objects.create_user(
+            username='client',
+            email='client@example.com',
+            password='testpass123'
+        )
+        self.operator = User.objects.create_user(
+            username='operator',
+            email='operator@example.com',
+            password='testpass123',
+            role='operator'
+        )
+        self.other_operator = User.objects.create_user(
+            username='other',
+            email='other@example.com',
+            password='testpass123',
+            role='operator'
+        )
+        self.destination = Destination.objects.create(name='Quito', code='UIO')
+        self.requests = FlightRequest.objects.bulk_create([
+            FlightRequest(
+                user=self.client_user,
+                destination=self.destination,
+                travel_date=date.today() + timedelta(days=5)
+            )
+            for _ in range(5)
+        ])
+        self.ids = [flight_request.pk for flight_request in self.requests]
+
+    @patch('flight_requests.tasks.dispatch_email_outbox')
+    @patch('flight_requests.transitions.schedule_flight_reminders')
+    def test_batches_stamp_audit_and_run_side_effects_once_per_batch(self, mock_schedule, mock_dispatch):
+        """Test that each batch is one transaction with one side effect call"""
+        with self.captureOnCommitCallbacks(execute=True):
+            outcomes = transitions.apply_transition(self.ids, 'reserved', self.operator, batch_size=2)
+        
+        self.assertEqual(list(outcomes), self.ids)
+        self.assertEqual(set(outcomes.values()), {transitions.CHANGED})
+        self.assertEqual(
+            [call.args[0] for call in mock_schedule.delay.call_args_list],
+            [self.ids[0:2], self.ids[2:4], self.ids[4:]]
+        )
+        self.assertEqual(mock_dispatch.apply_async.call_count, 3)
+        self.assertEqual(
+            sorted(OutboxEmail.objects.values_list('flight_request_id', flat=True)), self.ids
+        )
+        
+        reserved = FlightRequest.objects.get(pk=self.ids[0])
+        self.assertEqual(reserved.status, 'reserved')
+        self.assertEqual(reserved.reserved_by, self.operator)
+        self.assertEqual(reserved.status_changed_by, self.operator)
+        self.assertIsNotNone(reserved.status_changed_at)
+
+    def test_disallowed_and_claimed_rows_are_skipped(self):
+        """Test outcomes for rows that may not move"""
+        FlightRequest.objects.filter(pk=self.ids[0]).update(status='cancelled')
+        FlightRequest.objects.filter(pk=self.ids[1]).update(
+            claimed_by=self.other_operator,
+            claimed_until=timezone.now() + timedelta(minutes=5)
+        )
+        
+        outcomes = transitions.apply_transition(
+            [self.ids[0], self.ids[1], self.ids[2], 999999], 'completed', self.operator
+        )
+        self.assertEqual(outcomes[self.ids[0]], transitions.INVALID_STATUS)
+        self.assertEqual(outcomes[self.ids[2]], transitions.INVALID_STATUS)
+        self.assertEqual(outcomes[999999], transitions.NOT_FOUND)
+        
+        outcomes = transitions.apply_transition(self.ids[1:3], 'cancelled', self.operator)
+        self.assertEqual(outcomes[self.ids[1]], transitions.CLAIMED)
+        self.assertEqual(outcomes[self.ids[2]], transitions.CHANGED)
+        self.assertEqual(FlightRequest.objects.get(pk=self.ids[1]).status, 'pending')
+
+    def test_unknown_status_rejected(self):
+        """Test that only statuses in TRANSITIONS are accepted"""
+        with self.assertRaises(ValueError):
+            transitions.apply_transition(self.ids, 'pending', self.operator)
+
+class FlightRequestSearchTest(TestCase):
+    def setUp(self):
+        self.ana = User.objects.create_user(
+            username='ana',
+            email='ana.torres@example.com',
+            password='testpass123',
+            first_name='Ana',
+            last_name='Torres'
+        )
+        self.luis = User.objects.create_user(
+            username='luis',
+            email='luis@example.com',
+            password='testpass123',
+            first_name='Luis',
+            last_name='Andrade'
+        )
+        self.quito = Destination.objects.create(name='Quito', code='UIO')
+        self.guayaquil = Destination.objects.create(name='Guayaquil', code='GYE')
+        self.ana_quito = self.create(self.ana, self.quito)
+        self.luis_guayaquil = self.create(self.luis, self.guayaquil, notes='Viaja con Ana Torres')
+        self.luis_quito = self.create(self.luis, self.quito, notes='Asiento de ventana')
+
+    def create(self, user, destination, **kwargs):
+        return FlightRequest.objects.create(
+            user=user,
+            destination=destination,
+            travel_date=date.today() + timedelta(days=5),
+            **kwargs
+        )
+
+    def search(self, text):
+        return list(FlightRequest.objects.search(text).order_by('-search_rank', '-id'))
+
+    def test_matches_user_destination_and_notes(self):
+        """Test each searched source, with word prefixes"""
+        self.assertEqual(set(self.search('quit')), {self.ana_quito, self.luis_quito})
+        self.assertEqual(self.search('GYE'), [self.luis_guayaquil])
+        self.assertEqual(self.search('ventan'), [self.luis_quito])
+        self.assertEqual(self.search('luis@example.com'), [self.luis_quito, self.luis_guayaquil])
+        self.assertEqual(self.search('!!!'), [])
+
+    def test_ranks_user_matches_above_notes(self):
+        """Test that a name match outranks the same words in notes"""
+        self.assertEqual(self.search('ana torres'), [self.ana_quito, self.luis_guayaquil])
+
+class FlightRequestAdminTest(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='adminpass123'
+        )
+        self.client.force_login(self.admin_user)
+        self.changelist_url = '/admin/flight_requests/flightrequest/'
+        self.destination = Destination.objects.create(name='Quito', code='UIO')
+
+    def create_requests(self, count, travel_date=None):
+        for i in range(count):
+            user = User.objects.create_user(
+                username=f'client{FlightRequest.objects.count()}',
+                email=f'client{FlightRequest.objects.count()}@example.com',
+                password='testpass123'
+            )
+            FlightRequest.objects.create(
+                user=user,
+                destination=self.destination,
+                travel_date=travel_date or date.today() + timedelta(days=10),
+                status='reserved',
+                reserved_by=self.admin_user
+            )
+
+    def changelist_queries(self, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.changelist_url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Test that list_display columns are joined, not fetched per row"""
+        self.create_requests(2)
+        few = self.changelist_queries()
+        
+        self.create_requests(20)
+        self.assertEqual(self.changelist_queries(), few)
+
+    def test_travel_date_filter(self):
+        """Test the month drill-down built from the summary table"""
+        self.create_requests(2, travel_date=date(2031, 3, 15))
+        self.create_requests(1, travel_date=date(2031, 4, 1))
+        
+        response = self.client.get(self.changelist_url)
+        self.assertContains(response, '?travel=2031-03')
+        
+        response = self.client.get(self.changelist_url, {'travel': '2031-03'})
+        self.assertEqual(response.context['cl'].result_count, 2)
+
+    def test_search_is_ranked(self):
+        """Test that the changelist search uses the ranked full-text search"""
+        self.create_requests(3)
+        FlightRequest.objects.filter(pk=FlightRequest.objects.order_by('pk')[0].pk).update(notes='Pasajero client2')
+        
+        response = self.client.get(self.changelist_url, {'q': 'client2'})
+        results = list(response.context['cl'].result_list)
+        self.assertEqual([flight_request.user.username for flight_request in results], ['client2', 'client0'])
+        
+        response = self.client.get(self.changelist_url, {'q': 'cl'})
+        self.assertEqual(response.context['cl'].result_count, 0)
+
+    def test_change_form_records_status_changes(self):
+        """Test that a status edit in the change form is audited"""
+        self.create_requests(1)
+        flight_request = FlightRequest.objects.get()
+        change_url = f'{self.changelist_url}{flight_request.pk}/change/'
+        response = self.client.get(change_url)
+        data = {
+            field.html_name: field.value() if field.value() is not None else ''
+            for field in response.context['adminform'].form
+        }
+        data['status'] = 'completed'
+        
+        response = self.client.post(change_url, data)
+        self.assertEqual(response.status_code, 302)
+        
+        flight_request.refresh_from_db()
+        self.assertEqual(flight_request.status, 'completed')
+        self.assertEqual(flight_request.status_changed_by, self.admin_user)
+        self.assertIsNotNone(flight_request.status_changed_at)
+
+    def test_search_matches_email_substrings(self):
+        """Test that the changelist search still finds a mail domain"""
+        self.create_requests(2)
+        
+        response = self.client.get(self.changelist_url, {'q': 'ample.com'})
+        self.assertEqual(len(response.context['cl'].result_list), 2)
+        
+        response = self.client.get(self.changelist_url, {'q': 'other.com'})
+        self.assertEqual(len(response.context['cl'].result_list), 0)
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Planner estimates are PostgreSQL-specific')
+    def test_estimated_count_skips_count_query(self):
+        """Test that large estimates are used instead of COUNT(*)"""
+        self.create_requests(3)
+        queryset = FlightRequest.objects.all()
+        paginator = EstimatedCountPaginator(queryset, 20)
+        paginator.threshold = -1
+        
+        with CaptureQueriesContext(connection) as queries:
+            count = paginator.count
+        
+        self.assertEqual(count, planner_row_estimate(queryset))
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries))
+        
+        # Below the threshold the exact count is used
+        self.assertEqual(EstimatedCountPaginator(queryset, 20).count, 3)
+
+class EmailRenderingTest(TestCase):
+    def setUp(self):
+        self.client = User.objects.create_user(
+            username='client',
+            email='client@example.com',
+            password='testpass123',
+            first_name='Ana <b>',
+            last_name="O'Brien",
+            role='client'
+        )
+        
+        self.operator = User.objects.create_user(
+            username='operator',
+            email='operator@example.com',
+            password='testpass123',
+            first_name='Jane',
+            last_name='Operator & Co',
+            role='operator'
+        )
+        
+        self.destination = Destination.objects.create(
+            name='Quito',
+            code='UIO',
+            description='Capital del <Ecuador>',
+            is_active=True
+        )
+        
+        fragment_cache.clear()
+
+    def create_request(self, **kwargs):
+        data = {
+            'user': self.client,
+            'destination': self.destination,
+            'travel_date': date.today() + timedelta(days=2),
+            'status': 'reserved',
+            'reserved_by': self.operator,
+            'reserved_at': timezone.now(),
+        }
+        data.update(kwargs)
+        return FlightRequest.objects.create(**data)
+
+    def test_reminder_matches_render_to_string(self):
+        """Test cached reminder rendering against the plain templates"""
+        for notes in (None, '', 'Asiento "ventana" & <extra>'):
+            flight_request = self.create_request(operator_notes=notes)
+            context = {
+                'user': flight_request.user,
+                'flight_request': flight_request,
+                'travel_date': flight_request.travel_date,
+                'destination': flight_request.destination,
+            }
+            
+            # Render twice so the second call is served from the fragment cache
+            for _ in range(2):
+                subject, plain_message, html_message = render_flight_reminder(flight_request)
+                self.assertEqual(plain_message, render_to_string('emails/flight_reminder.txt', context))
+                self.assertEqual(html_message, render_to_string('emails/flight_reminder.html', context))
+
+    def test_confirmation_matches_render_to_string(self):
+        """Test cached confirmation rendering against the plain templates"""
+        for reserved_by, notes in ((self.operator, 'Ventana & pasillo'), (None, None)):
+            flight_request = self.create_request(reserved_by=reserved_by, operator_notes=notes)
+            context = {
+                'user': flight_request.user,
+                'flight_request': flight_request,
+                'reserved_by': flight_request.reserved_by,
+                'reserved_at': flight_request.reserved_at,
+            }
+            
+            for _ in range(2):
+                subject, plain_message, html_message = render_reservation_confirmation(flight_request)
+                self.assertEqual(plain_message, render_to_string('emails/reservation_confirmation.txt', context))
+                self.assertEqual(html_message, render_to_string('emails/reservation_confirmation.html', context))
+
+    def test_destination_change_is_not_served_from_cache(self):
+        """Test that editing a destination renders a fresh fragment"""
+        flight_request = self.create_request()
+        render_flight_reminder(flight_request)
+        
+        self.destination.name = 'San Francisco de Quito'
+        self.destination.save()
+        
+        subject, plain_message, html_message = render_flight_reminder(flight_request)
+        self.assertIn('San Francisco de Quito', plain_message)
@@ -0,0 +1,103 @@
+from django.db import transaction
+from django.utils import timezone
+from .models import FlightRequest
+from .stats import apply_deltas, transition_deltas
+from . import outbox
+from .tasks import schedule_flight_reminders
+
+# Statuses a request may move to, and the statuses it may come from
+TRANSITIONS = {
+    'reserved': ('pending',),
+    'cancelled': ('pending', 'reserved'),
+    'completed': ('reserved',),
+}
+
+# Rows locked and updated per transaction
+BATCH_SIZE = 1000
+
+# Outcomes reported per id by apply_transition()
+CHANGED = 'changed'
+INVALID_STATUS = 'invalid_status'
+CLAIMED = 'claimed'
+NOT_FOUND = 'not_found'
+
+def _schedule_reminders(ids):
+    schedule_flight_reminders.delay(ids)
+
+# Bulk side effects run once per committed batch with the changed ids.
+# Cancelling needs none: queued reminders re-check the status when they run
+SIDE_EFFECTS = {
+    'reserved': [_schedule_reminders],
+}
+
+def _batches(ids, size):
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+def apply_transition(ids, status, user, operator_notes=None, batch_size=BATCH_SIZE):
+    """
+    Move the flight requests in ids to status on behalf of user.
+
+    Each batch locks its rows, checks them against TRANSITIONS and active
+    leases of other operators, and applies one UPDATE that also stamps
+    status_changed_by/at (and reserved_by/at, clearing the lease, for
+    reservations). Stat counters and confirmation emails are written in
+    the same transaction and SIDE_EFFECTS are queued once per batch after
+    it commits.
+
+    Returns {id: CHANGED | INVALID_STATUS | CLAIMED | NOT_FOUND}.
+    """
+    if status not in TRANSITIONS:
+        raise ValueError(f'Unknown target status: {status}')
+
+    ids = list(dict.fromkeys(ids))
+    outcomes = {}
+    for batch in _batches(ids, batch_size):
+        outcomes.update(_apply_batch(batch, status, user, operator_notes))
+    return {pk: outcomes[pk] for pk in ids}
+
+def _apply_batch(ids, status, user, operator_notes):
+    now = timezone.now()
+    outcomes = dict.fromkeys(ids, NOT_FOUND)
+
+    with transaction.atomic():
+        rows = FlightRequest.objects.select_for_update().filter(id__in=ids).values_list(
+            'id', 'status', 'claimed_by', 'claimed_until', 'destination_id', 'travel_date', 'user_id'
+        )
+        stat_keys = []
+        owner_ids = set()
+        for pk, current, claimed_by, claimed_until, destination_id, travel_date, owner_id in rows:
+            if current not in TRANSITIONS[status]:
+                outcomes[pk] = INVALID_STATUS
+            elif claimed_by not in (None, user.pk) and claimed_until and claimed_until > now:
+                outcomes[pk] = CLAIMED
+            else:
+                outcomes[pk] = CHANGED
+                stat_keys.append((destination_id, current, travel_date))
+                owner_ids.add(owner_id)
+
+        changed_ids = [pk for pk in ids if outcomes[pk] == CHANGED]
+        if not changed_ids:
+            return outcomes
+
+        fields = {
+            'status': status,
+            'status_changed_by': user,
+            'status_changed_at': now,
+            'updated_at': now,
+        }
+        if status == 'reserved':
+            fields.update(reserved_by=user, reserved_at=now, claimed_by=None, claimed_until=None)
+        if operator_notes is not None:
+            fields['operator_notes'] = operator_notes
+
+        FlightRequest.objects.filter(id__in=changed_ids).update_owned(owner_ids, **fields)
+        apply_deltas(transition_deltas(stat_keys, status))
+        if status == 'reserved':
+            outbox.enqueue('reservation_confirmation', {
+                pk: outbox.confirmation_key(pk) for pk in changed_ids
+            })
+        for side_effect in SIDE_EFFECTS.get(status, []):
+            transaction.on_commit(lambda side_effect=side_effect: side_effect(changed_ids))
+
+    return outcomes
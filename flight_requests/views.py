@@ -1,11 +1,30 @@
+import hashlib
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from destinations import cache as destination_cache
+from . import cache as list_cache
+from .export import STREAMS, CSVRenderer, NDJSONRenderer
 from .models import FlightRequest
+from .pagination import FlightRequestCursorPagination
+from .search import SEARCH_MIN_LENGTH
+from .stats import get_stats
+from . import transitions
+from .transitions import apply_transition
 from .serializers import (
     FlightRequestCreateSerializer, FlightRequestSerializer, 
-    FlightRequestUpdateSerializer
+    FlightRequestUpdateSerializer, BulkTransitionSerializer, ClaimSerializer,
+    ExportFilterSerializer
 )
 
 class IsOwnerOrOperator(permissions.BasePermission):
@@ -19,14 +38,49 @@ class IsOwnerOrOperator(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         # Read permissions for owner or operators
         if request.method in permissions.SAFE_METHODS:
-            return obj.user == request.user or request.user.is_operator() or request.user.is_admin_user()
+            return obj.user_id == request.user.pk or request.user.is_operator() or request.user.is_admin_user()
         
         # Write permissions only for operators and admins
         if view.action in ['reserve', 'update']:
             return request.user.is_operator() or request.user.is_admin_user()
         
         # Only owners can update their own requests (limited fields)
-        return obj.user == request.user
+        return obj.user_id == request.user.pk
+
+def list_etag(request, version, destination_version):
+    # days_until_travel changes daily and nested destinations change with
+    # the destination cache version, so both are part of the validator too.
+    # It is the only validator: a Last-Modified date would have to cover all
+    # of these and change more than once per second.
+    parts = (
+        request.user.pk, version, timezone.now().date().isoformat(),
+        destination_version, request.get_full_path(),
+    )
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+def flight_requests_etag(request, *args, **kwargs):
+    return list_etag(request, list_cache.get_version(request.user), destination_cache.get_version())
+
+def pending_etag(request, *args, **kwargs):
+    if not (request.user.is_operator() or request.user.is_admin_user()):
+        return None
+    return flight_requests_etag(request)
+
+def search_list(queryset, params):
+    """
+    Apply the ?q= search of list endpoints, shared by the sync and async views
+    """
+    text = params.get('q', '').strip()
+    if not text:
+        return queryset
+    if len(text) < SEARCH_MIN_LENGTH:
+        raise ValidationError({
+            'q': f'La búsqueda requiere al menos {SEARCH_MIN_LENGTH} caracteres'
+        })
+    return queryset.search(text)
+
+# Clients always revalidate, and get a 304 when nothing changed
+revalidate = method_decorator(cache_control(private=True, no_cache=True))
 
 class FlightRequestViewSet(viewsets.ModelViewSet):
     """
@@ -34,15 +88,21 @@ class FlightRequestViewSet(viewsets.ModelViewSet):
     """
     serializer_class = FlightRequestSerializer
     permission_classes = [IsOwnerOrOperator]
+    pagination_class = FlightRequestCursorPagination
     
     def get_queryset(self):
         """
-        Filter queryset based on user role
+        Filter queryset based on user role, and by the ?q= search on lists
         """
-        user = self.request.user
-        if user.is_operator() or user.is_admin_user():
-            return FlightRequest.objects.all()
-        return FlightRequest.objects.filter(user=user)
+        queryset = FlightRequest.objects.with_related().visible_to(self.request.user)
+        if self.action == 'list':
+            queryset = search_list(queryset, self.request.query_params)
+        return queryset
+    
+    @revalidate
+    @method_decorator(condition(etag_func=flight_requests_etag))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -61,18 +121,20 @@ class FlightRequestViewSet(viewsets.ModelViewSet):
         """
         Handle reservation logic when updating
         """
-        if serializer.validated_data.get('status') == 'reserved':
-            serializer.save(
-                reserved_by=self.request.user,
-                reserved_at=timezone.now()
-            )
-        else:
-            serializer.save()
+        new_status = serializer.validated_data.get('status', serializer.instance.status)
+        extra = {}
+        if new_status != serializer.instance.status:
+            extra['status_changed_by'] = self.request.user
+            if new_status == 'reserved':
+                extra.update(reserved_by=self.request.user, reserved_at=timezone.now())
+        serializer.save(**extra)
     
     @action(detail=False, methods=['get'])
+    @revalidate
+    @method_decorator(condition(etag_func=pending_etag))
     def pending(self, request):
         """
-        Get all pending flight requests (for operators)
+        Get pending flight requests (for operators), one cursor page at a time
         """
         if not (request.user.is_operator() or request.user.is_admin_user()):
             return Response(
@@ -80,9 +142,10 @@ class FlightRequestViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        pending_requests = FlightRequest.objects.filter(status='pending')
-        serializer = self.get_serializer(pending_requests, many=True)
-        return Response(serializer.data)
+        pending_requests = FlightRequest.objects.with_related().filter(status='pending')
+        page = self.paginate_queryset(pending_requests)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=True, methods=['post'])
     def reserve(self, request, pk=None):
@@ -95,19 +158,170 @@ class FlightRequestViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        flight_request = self.get_object()
+        with transaction.atomic():
+            # Lock the row so two operators cannot both pass the status check
+            queryset = self.filter_queryset(self.get_queryset()).select_for_update(of=('self',))
+            flight_request = get_object_or_404(queryset, pk=pk)
+            self.check_object_permissions(request, flight_request)
+            
+            if flight_request.status != 'pending':
+                return Response(
+                    {'error': 'Solo se pueden reservar solicitudes pendientes'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            if flight_request.is_claimed_by_other(request.user):
+                return Response(
+                    {'error': 'La solicitud está asignada a otro operador'}, 
+                    status=status.HTTP_409_CONFLICT
+                )
+            
+            flight_request.status = 'reserved'
+            flight_request.reserved_by = request.user
+            flight_request.reserved_at = timezone.now()
+            flight_request.status_changed_by = request.user
+            flight_request.operator_notes = request.data.get('operator_notes', '')
+            flight_request.claimed_by = None
+            flight_request.claimed_until = None
+            flight_request.save()
         
-        if flight_request.status != 'pending':
+        serializer = self.get_serializer(flight_request)
+        return Response(serializer.data)
+    
+    def _bulk_transition(self, request, target_status):
+        """
+        Move several flight requests to target_status through the
+        transition service; ids that cannot move are reported as conflicts
+        """
+        if not (request.user.is_operator() or request.user.is_admin_user()):
             return Response(
-                {'error': 'Solo se pueden reservar solicitudes pendientes'}, 
-                status=status.HTTP_400_BAD_REQUEST
+                {'error': 'Permission denied'}, 
+                status=status.HTTP_403_FORBIDDEN
             )
         
-        flight_request.status = 'reserved'
-        flight_request.reserved_by = request.user
-        flight_request.reserved_at = timezone.now()
-        flight_request.operator_notes = request.data.get('operator_notes', '')
-        flight_request.save()
+        serializer = BulkTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        outcomes = apply_transition(
+            serializer.validated_data['ids'],
+            target_status,
+            request.user,
+            operator_notes=serializer.validated_data.get('operator_notes')
+        )
         
-        serializer = self.get_serializer(flight_request)
-        return Response(serializer.data)
+        results = []
+        for pk, outcome in outcomes.items():
+            if outcome == transitions.CHANGED:
+                outcome = target_status
+            elif outcome != transitions.NOT_FOUND:
+                outcome = 'conflict'
+            results.append({'id': pk, 'result': outcome})
+        
+        return Response({
+            target_status: sum(1 for result in results if result['result'] == target_status),
+            'results': results
+        })
+    
+    @action(detail=False, methods=['post'], url_path='bulk-reserve')
+    def bulk_reserve(self, request):
+        """
+        Reserve several pending flight requests
+        """
+        return self._bulk_transition(request, 'reserved')
+    
+    @action(detail=False, methods=['post'], url_path='bulk-cancel')
+    def bulk_cancel(self, request):
+        """
+        Cancel several pending or reserved flight requests
+        """
+        return self._bulk_transition(request, 'cancelled')
+    
+    @action(detail=False, methods=['post'], url_path='bulk-complete')
+    def bulk_complete(self, request):
+        """
+        Mark several reserved flight requests as completed
+        """
+        return self._bulk_transition(request, 'completed')
+    
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """
+        Counts by status, destination and upcoming travel window (for operators)
+        """
+        if not (request.user.is_operator() or request.user.is_admin_user()):
+            return Response(
+                {'error': 'Permission denied'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        return Response(get_stats())
+    
+    @action(detail=False, methods=['post'])
+    def claim(self, request):
+        """
+        Lease the next pending flight requests to the current operator.
+        
+        Rows locked or leased by other operators are skipped rather than
+        waited on, so operators working the queue never collide.
+        """
+        if not (request.user.is_operator() or request.user.is_admin_user()):
+            return Response(
+                {'error': 'Permission denied'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        serializer = ClaimSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        now = timezone.now()
+        claimed_until = now + timezone.timedelta(seconds=settings.FLIGHT_REQUEST_CLAIM_LEASE_SECONDS)
+        
+        with transaction.atomic():
+            claimed = dict(
+                FlightRequest.objects.select_for_update(skip_locked=True)
+                .filter(status='pending')
+                .filter(Q(claimed_until__isnull=True) | Q(claimed_until__lte=now))
+                .order_by('travel_date', 'created_at')
+                .values_list('id', 'user_id')[:serializer.validated_data['count']]
+            )
+            claimed_ids = list(claimed)
+            FlightRequest.objects.filter(id__in=claimed_ids).update_owned(
+                claimed.values(),
+                claimed_by=request.user,
+                claimed_until=claimed_until,
+                updated_at=now
+            )
+        
+        claimed = FlightRequest.objects.with_related().filter(id__in=claimed_ids).order_by(
+            'travel_date', 'created_at'
+        )
+        return Response({
+            'claimed_until': claimed_until,
+            'results': FlightRequestSerializer(claimed, many=True).data
+        })
+    
+    @action(detail=False, methods=['get'], renderer_classes=[CSVRenderer, NDJSONRenderer])
+    def export(self, request):
+        """
+        Stream every visible flight request as CSV (default) or NDJSON.
+        
+        Pick the format with ?format=csv|ndjson or the Accept header, and
+        filter with ?status=, ?date_from= and ?date_to= (travel date).
+        """
+        filters = ExportFilterSerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+        
+        queryset = FlightRequest.objects.visible_to(request.user)
+        if 'status' in filters.validated_data:
+            queryset = queryset.filter(status=filters.validated_data['status'])
+        if 'date_from' in filters.validated_data:
+            queryset = queryset.filter(travel_date__gte=filters.validated_data['date_from'])
+        if 'date_to' in filters.validated_data:
+            queryset = queryset.filter(travel_date__lte=filters.validated_data['date_to'])
+        
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            STREAMS[renderer.format](queryset),
+            content_type=f'{renderer.media_type}; charset=utf-8'
+        )
+        filename = f'flight_requests_{timezone.localdate():%Y%m%d}.{renderer.format}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
@@ -3,12 +3,15 @@ import { Container, Row, Col, Card, Button, Table, Badge, Spinner, Alert } from
 import { Link } from 'react-router-dom';
 import { toast } from 'react-toastify';
 import { flightRequestsAPI } from '../services/api';
-import { FlightRequest } from '../types';
+import { FlightRequest, FlightRequestStats } from '../types';
 import { useAuth } from '../contexts/AuthContext';
 
 const Dashboard: React.FC = () => {
   const [flightRequests, setFlightRequests] = useState<FlightRequest[]>([]);
   const [pendingRequests, setPendingRequests] = useState<FlightRequest[]>([]);
+  const [nextPage, setNextPage] = useState<string | null>(null);
+  const [pendingNextPage, setPendingNextPage] = useState<string | null>(null);
+  const [stats, setStats] = useState<FlightRequestStats | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
 
@@ -24,13 +27,19 @@ const Dashboard: React.FC = () => {
       
       // Load user's flight requests (all users)
       const userRequests = await flightRequestsAPI.getAll();
-      setFlightRequests(userRequests.results || userRequests);
+      setFlightRequests(userRequests.results);
+      setNextPage(userRequests.next);
 
       // Load pending requests (only for operators and admins)
       if (isOperator || isAdmin) {
         try {
-          const pending = await flightRequestsAPI.getPending();
-          setPendingRequests(pending.results || pending);
+          const [pending, summary] = await Promise.all([
+            flightRequestsAPI.getPending(),
+            flightRequestsAPI.getStats(),
+          ]);
+          setPendingRequests(pending.results);
+          setPendingNextPage(pending.next);
+          setStats(summary);
         } catch (err) {
           console.error('Error loading pending requests:', err);
         }
@@ -43,6 +52,30 @@ const Dashboard: React.FC = () => {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextPage) return;
+    try {
+      const page = await flightRequestsAPI.getPage(nextPage);
+      setFlightRequests((current) => [...current, ...page.results]);
+      setNextPage(page.next);
+    } catch (error: any) {
+      console.error('Error loading more requests:', error);
+      toast.error('Error al cargar más solicitudes');
+    }
+  };
+
+  const loadMorePending = async () => {
+    if (!pendingNextPage) return;
+    try {
+      const page = await flightRequestsAPI.getPage(pendingNextPage);
+      setPendingRequests((current) => [...current, ...page.results]);
+      setPendingNextPage(page.next);
+    } catch (error: any) {
+      console.error('Error loading more pending requests:', error);
+      toast.error('Error al cargar más solicitudes');
+    }
+  };
+
   const handleReserve = async (requestId: number, operatorNotes?: string) => {
     try {
       await flightRequestsAPI.reserve(requestId, operatorNotes);
@@ -133,6 +166,27 @@ const Dashboard: React.FC = () => {
         </Col>
       </Row>
 
+      {/* Summary counts (Operators/Admins Only) */}
+      {(isOperator || isAdmin) && stats && (
+        <Row className="mb-4">
+          {[
+            { label: 'Pendientes', value: stats.by_status.pending, variant: 'warning' },
+            { label: 'Reservadas', value: stats.by_status.reserved, variant: 'success' },
+            { label: 'Viajes en 7 días', value: stats.upcoming.next_7_days, variant: 'info' },
+            { label: 'Viajes en 30 días', value: stats.upcoming.next_30_days, variant: 'secondary' },
+          ].map((item) => (
+            <Col key={item.label} md={3} sm={6} className="mb-2">
+              <Card border={item.variant}>
+                <Card.Body>
+                  <h3 className="mb-0">{item.value}</h3>
+                  <small className="text-muted">{item.label}</small>
+                </Card.Body>
+              </Card>
+            </Col>
+          ))}
+        </Row>
+      )}
+
       {/* Pending Requests (Operators/Admins Only) */}
       {(isOperator || isAdmin) && (
         <Row className="mb-4">
@@ -142,7 +196,7 @@ const Dashboard: React.FC = () => {
                 <h5 className="mb-0">
                   📋 Solicitudes Pendientes 
                   <Badge bg="warning" className="ms-2">
-                    {pendingRequests.length}
+                    {stats ? stats.by_status.pending : pendingRequests.length}
                   </Badge>
                 </h5>
               </Card.Header>
@@ -209,6 +263,11 @@ const Dashboard: React.FC = () => {
                     </tbody>
                   </Table>
                 )}
+                {pendingNextPage && (
+                  <Button variant="outline-secondary" size="sm" onClick={loadMorePending}>
+                    Cargar más
+                  </Button>
+                )}
               </Card.Body>
             </Card>
           </Col>
@@ -286,6 +345,11 @@ const Dashboard: React.FC = () => {
                   </tbody>
                 </Table>
               )}
+              {nextPage && (
+                <Button variant="outline-secondary" size="sm" onClick={loadMore}>
+                  Cargar más
+                </Button>
+              )}
             </Card.Body>
           </Card>
         </Col>
@@ -46,6 +46,17 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
     setLoading(false);
   }, []);
 
+  const storeCredentials = (response: AuthResponse) => {
+    localStorage.setItem('token', response.token);
+    localStorage.setItem('token_type', response.token_type || 'Token');
+    if (response.refresh) {
+      localStorage.setItem('refresh', response.refresh);
+    } else {
+      localStorage.removeItem('refresh');
+    }
+    localStorage.setItem('user', JSON.stringify(response.user));
+  };
+
   const login = async (credentials: LoginCredentials): Promise<boolean> => {
     try {
       const response: AuthResponse = await authAPI.login(credentials);
@@ -53,8 +64,7 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
       setUser(response.user);
       setToken(response.token);
       
-      localStorage.setItem('token', response.token);
-      localStorage.setItem('user', JSON.stringify(response.user));
+      storeCredentials(response);
       
       toast.success(`¡Bienvenido ${response.user.first_name}!`);
       return true;
@@ -76,8 +86,7 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
       setUser(response.user);
       setToken(response.token);
       
-      localStorage.setItem('token', response.token);
-      localStorage.setItem('user', JSON.stringify(response.user));
+      storeCredentials(response);
       
       toast.success('¡Registro exitoso! Bienvenido a Evolution Fly App');
       return true;
@@ -110,6 +119,8 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
       setUser(null);
       setToken(null);
       localStorage.removeItem('token');
+      localStorage.removeItem('token_type');
+      localStorage.removeItem('refresh');
       localStorage.removeItem('user');
       toast.info('Sesión cerrada exitosamente');
     }
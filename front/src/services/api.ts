@@ -1,4 +1,5 @@
 import axios from 'axios';
+import { CursorPage, FlightRequest, FlightRequestStats } from '../types';
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000/api';
 
@@ -14,19 +15,41 @@ const api = axios.create({
 api.interceptors.request.use((config) => {
   const token = localStorage.getItem('token');
   if (token) {
-    config.headers.Authorization = `Token ${token}`;
+    const tokenType = localStorage.getItem('token_type') || 'Token';
+    config.headers.Authorization = `${tokenType} ${token}`;
   }
   return config;
 });
 
-// Handle token expiration
+const clearSession = () => {
+  localStorage.removeItem('token');
+  localStorage.removeItem('token_type');
+  localStorage.removeItem('refresh');
+  localStorage.removeItem('user');
+  window.location.href = '/login';
+};
+
+// Handle token expiration: signed access tokens are refreshed once,
+// anything else sends the user back to the login page
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
+    const original = error.config;
     if (error.response?.status === 401) {
-      localStorage.removeItem('token');
-      localStorage.removeItem('user');
-      window.location.href = '/login';
+      const refresh = localStorage.getItem('refresh');
+      if (refresh && original && !original._retried && !original.url?.includes('/auth/token/refresh/')) {
+        original._retried = true;
+        try {
+          const response = await api.post('/auth/token/refresh/', { refresh });
+          localStorage.setItem('token', response.data.token);
+          localStorage.setItem('refresh', response.data.refresh);
+          return api(original);
+        } catch (refreshError) {
+          clearSession();
+          return Promise.reject(refreshError);
+        }
+      }
+      clearSession();
     }
     return Promise.reject(error);
   }
@@ -54,7 +77,7 @@ export const authAPI = {
   },
   
   logout: async () => {
-    await api.post('/auth/logout/');
+    await api.post('/auth/logout/', { refresh: localStorage.getItem('refresh') });
   },
   
   getProfile: async () => {
@@ -102,16 +125,22 @@ export const destinationsAPI = {
 
 // Flight Requests API
 export const flightRequestsAPI = {
-  getAll: async () => {
+  getAll: async (): Promise<CursorPage<FlightRequest>> => {
     const response = await api.get('/flight-requests/');
     return response.data;
   },
   
-  getPending: async () => {
+  getPending: async (): Promise<CursorPage<FlightRequest>> => {
     const response = await api.get('/flight-requests/pending/');
     return response.data;
   },
   
+  // Follow a `next`/`previous` link returned by a cursor-paginated endpoint
+  getPage: async (url: string): Promise<CursorPage<FlightRequest>> => {
+    const response = await api.get(url);
+    return response.data;
+  },
+  
   create: async (requestData: {
     destination: number;
     travel_date: string;
@@ -126,6 +155,17 @@ export const flightRequestsAPI = {
     return response.data;
   },
   
+  getStats: async (): Promise<FlightRequestStats> => {
+    const response = await api.get('/flight-requests/stats/');
+    return response.data;
+  },
+  
+  // Lease the next most urgent pending requests to the current operator
+  claim: async (count: number = 10): Promise<{ claimed_until: string; results: FlightRequest[] }> => {
+    const response = await api.post('/flight-requests/claim/', { count });
+    return response.data;
+  },
+  
   reserve: async (id: number, operatorNotes?: string) => {
     const response = await api.post(`/flight-requests/${id}/reserve/`, {
       operator_notes: operatorNotes,
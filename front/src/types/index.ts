@@ -13,6 +13,10 @@ export interface User {
 export interface AuthResponse {
   user: User;
   token: string;
+  // Only present when the backend issues signed tokens
+  refresh?: string;
+  token_type?: 'Bearer';
+  expires_in?: number;
 }
 
 export interface Destination {
@@ -36,11 +40,19 @@ export interface FlightRequest {
   operator_notes?: string;
   reserved_by?: User;
   reserved_at?: string;
+  claimed_by?: number | null;
+  claimed_until?: string | null;
   days_until_travel?: number;
   created_at: string;
   updated_at: string;
 }
 
+export interface CursorPage<T> {
+  next: string | null;
+  previous: string | null;
+  results: T[];
+}
+
 export interface CreateFlightRequest {
   destination: number;
   travel_date: string;
@@ -68,4 +80,21 @@ export interface RegisterData {
   last_name: string;
   role?: string;
   phone?: string;
-}
\ No newline at end of file
+}
+export interface FlightRequestStats {
+  total: number;
+  by_status: Record<FlightRequest['status'], number>;
+  by_destination: {
+    id: number;
+    code: string;
+    name: string;
+    total: number;
+    by_status: Partial<Record<FlightRequest['status'], number>>;
+  }[];
+  upcoming: {
+    today: number;
+    next_7_days: number;
+    next_30_days: number;
+    next_90_days: number;
+  };
+}
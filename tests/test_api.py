@@ -1,10 +1,25 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.utils.http import http_date
+from unittest.mock import patch
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from datetime import date, timedelta
 from destinations.models import Destination
-from flight_requests.models import FlightRequest
+from flight_requests.models import FlightRequest, OutboxEmail
+from users import tokens
 
 User = get_user_model()
 
@@ -230,6 +245,39 @@ class FlightRequestAPITest(TestCase):
         response = self.client.get(self.pending_url)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
+    def test_update_keeps_reservation_stamp(self):
+        """Test that editing a reserved request without changing its status keeps who reserved it"""
+        reserved_at = timezone.now() - timedelta(days=1)
+        flight_request = FlightRequest.objects.create(
+            user=self.client_user,
+            destination=self.destination,
+            travel_date=date.today() + timedelta(days=7),
+            status='reserved',
+            reserved_by=self.operator_user,
+            reserved_at=reserved_at
+        )
+        other_operator = User.objects.create_user(
+            username='other',
+            email='other@example.com',
+            password='otherpass123',
+            role='operator'
+        )
+        url = f'/api/flight-requests/{flight_request.id}/'
+        
+        self.client.force_authenticate(user=self.client_user)
+        response = self.client.patch(url, {'operator_notes': 'Ventana'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        self.client.force_authenticate(user=other_operator)
+        response = self.client.put(url, {'status': 'reserved', 'operator_notes': 'Asiento confirmado'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        flight_request.refresh_from_db()
+        self.assertEqual(flight_request.operator_notes, 'Asiento confirmado')
+        self.assertEqual(flight_request.reserved_by, self.operator_user)
+        self.assertEqual(flight_request.reserved_at, reserved_at)
+        self.assertIsNone(flight_request.status_changed_by)
+
     def test_reserve_flight_request(self):
         """Test reserving a flight request"""
         flight_request = FlightRequest.objects.create(
@@ -252,4 +300,1031 @@ class FlightRequestAPITest(TestCase):
         # Check in database
         flight_request.refresh_from_db()
         self.assertEqual(flight_request.status, 'reserved')
-        self.assertEqual(flight_request.reserved_by, self.operator_user)
\ No newline at end of file
+        self.assertEqual(flight_request.reserved_by, self.operator_user)
+
+class FlightRequestQueryBudgetTest(TestCase):
+    """
+    Read endpoints must issue a fixed number of queries regardless of
+    how many rows are returned
+    """
+    QUERY_BUDGETS = {
+        'list': 1,       # joined page; the ETag comes from the cache
+        'retrieve': 1,
+        'pending': 1,    # joined page
+    }
+
+    def setUp(self):
+        self.client = APIClient()
+        self.flight_requests_url = '/api/flight-requests/'
+        
+        self.client_user = User.objects.create_user(
+            username='client',
+            email='client@example.com',
+            password='clientpass123',
+            role='client'
+        )
+        
+        self.operator_user = User.objects.create_user(
+            username='operator',
+            email='operator@example.com',
+            password='operatorpass123',
+            role='operator'
+        )
+        
+        self.destinations = [
+            Destination.objects.create(name=f'Destino {i}', code=f'D{i:02d}', is_active=True)
+            for i in range(5)
+        ]
+
+    def create_requests(self, count, status='pending'):
+        return FlightRequest.objects.bulk_create([
+            FlightRequest(
+                user=self.client_user,
+                destination=self.destinations[i % len(self.destinations)],
+                travel_date=date.today() + timedelta(days=7 + i),
+                status=status,
+                reserved_by=self.operator_user if status == 'reserved' else None
+            )
+            for i in range(count)
+        ])
+
+    def test_list_query_budget_independent_of_page_size(self):
+        """Test that listing costs the same with 1 or 20 rows"""
+        self.client.force_authenticate(user=self.operator_user)
+        
+        for count in (1, 19):
+            self.create_requests(count, status='reserved')
+            with self.assertNumQueries(self.QUERY_BUDGETS['list']):
+                response = self.client.get(self.flight_requests_url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_query_budget_as_client(self):
+        """Test that clients get the same budget on their own requests"""
+        self.create_requests(10)
+        self.client.force_authenticate(user=self.client_user)
+        
+        with self.assertNumQueries(self.QUERY_BUDGETS['list']):
+            response = self.client.get(self.flight_requests_url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['user']['id'], self.client_user.id)
+
+    def test_retrieve_query_budget(self):
+        """Test retrieving a single request with its relations"""
+        flight_request = self.create_requests(1, status='reserved')[0]
+        self.client.force_authenticate(user=self.operator_user)
+        
+        with self.assertNumQueries(self.QUERY_BUDGETS['retrieve']):
+            response = self.client.get(f'{self.flight_requests_url}{flight_request.id}/')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['reserved_by'], self.operator_user.id)
+
+    def test_pending_query_budget(self):
+        """Test the pending queue with many rows"""
+        self.create_requests(15)
+        self.client.force_authenticate(user=self.operator_user)
+        
+        with self.assertNumQueries(self.QUERY_BUDGETS['pending']):
+            response = self.client.get(f'{self.flight_requests_url}pending/')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 15)
+
+class FlightRequestCursorPaginationTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.flight_requests_url = '/api/flight-requests/'
+        
+        self.client_user = User.objects.create_user(
+            username='client',
+            email='client@example.com',
+            password='clientpass123',
+            role='client'
+        )
+        
+        self.operator_user = User.objects.create_user(
+            username='operator',
+            email='operator@example.com',
+            password='operatorpass123',
+            role='operator'
+        )
+        
+        self.destination = Destination.objects.create(
+            name='Quito',
+            code='UIO',
+            is_active=True
+        )
+        
+        self.flight_requests = FlightRequest.objects.bulk_create([
+            FlightRequest(
+                user=self.client_user,
+                destination=self.destination,
+                travel_date=date.today() + timedelta(days=7),
+                status='pending'
+            )
+            for _ in range(45)
+        ])
+        # created_at is auto_now_add, so share it after the insert; every
+        # page boundary then falls on a tie only id can break
+        FlightRequest.objects.update(created_at=timezone.now())
+        self.client.force_authenticate(user=self.operator_user)
+
+    def follow_pages(self, url, max_pages=50):
+        ids = []
+        while url:
+            # A cursor that repeats rows could otherwise loop forever
+            max_pages -= 1
+            self.assertGreaterEqual(max_pages, 0, 'too many pages')
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_list_follows_next_links(self):
+        """Test that following next links returns every row exactly once"""
+        ids = self.follow_pages(self.flight_requests_url)
+        
+        self.assertEqual(len(ids), 45)
+        self.assertEqual(ids, sorted(ids, reverse=True))
+
+    def test_keyset_breaks_created_at_ties_by_id(self):
+        """Test that rows sharing created_at are paged once each, both ways"""
+        url = f'{self.flight_requests_url}?page_size=7'
+        
+        ids = self.follow_pages(url)
+        self.assertEqual(ids, sorted((fr.id for fr in self.flight_requests), reverse=True))
+        
+        # Back from the last page through the previous links
+        while url:
+            last = self.client.get(url)
+            url = last.data['next']
+        pages = [[item['id'] for item in last.data['results']]]
+        url = last.data['previous']
+        while url:
+            response = self.client.get(url)
+            pages.insert(0, [item['id'] for item in response.data['results']])
+            url = response.data['previous']
+        self.assertEqual([pk for page in pages for pk in page], ids)
+
+    def test_pending_is_paginated(self):
+        """Test that the pending action returns cursor pages"""
+        response = self.client.get(f'{self.flight_requests_url}pending/')
+        
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertIsNotNone(response.data['next'])
+        
+        ids = self.follow_pages(f'{self.flight_requests_url}pending/')
+        self.assertEqual(len(set(ids)), 45)
+
+    def test_later_pages_cost_the_same(self):
+        """Test that a deep page issues the same queries as the first"""
+        first = self.client.get(self.flight_requests_url)
+        second = self.client.get(first.data['next'])
+        
+        with self.assertNumQueries(1):
+            self.client.get(second.data['next'])
+
+    def test_search_is_ranked_and_paginated(self):
+        """Test ?q= search over user, destination and notes"""
+        other = User.objects.create_user(
+            username='maria',
+            email='maria@example.com',
+            password='mariapass123',
+            first_name='María',
+            last_name='Quiroz'
+        )
+        by_name = FlightRequest.objects.create(
+            user=other,
+            destination=self.destination,
+            travel_date=date.today() + timedelta(days=7)
+        )
+        
+        response = self.client.get(self.flight_requests_url, {'q': 'quiroz'})
+        self.assertEqual([item['id'] for item in response.data['results']], [by_name.id])
+        
+        # Every row matches the destination; the name match ranks first
+        ids = self.follow_pages(f'{self.flight_requests_url}?q=qui')
+        self.assertEqual(len(ids), 46)
+        self.assertEqual(len(set(ids)), 46)
+        self.assertEqual(ids[0], by_name.id)
+
+    def test_search_pages_return_each_match_once(self):
+        """Test that following next links over rank ties returns every match exactly once"""
+        # Matches through notes rank apart from the destination matches,
+        # which all tie on rank
+        for flight_request in self.flight_requests[:5]:
+            flight_request.notes = 'Quiere ventana'
+            flight_request.save()
+        
+        ids = self.follow_pages(f'{self.flight_requests_url}?q=qui&page_size=4')
+        
+        self.assertEqual(sorted(ids), sorted(fr.id for fr in self.flight_requests))
+        self.assertEqual(set(ids[:5]), {fr.id for fr in self.flight_requests[:5]})
+
+    def test_search_scoped_and_validated(self):
+        """Test that clients only search their own requests and q is validated"""
+        self.client.force_authenticate(user=User.objects.create_user(
+            username='other',
+            email='other@example.com',
+            password='otherpass123'
+        ))
+        response = self.client.get(self.flight_requests_url, {'q': 'quito'})
+        self.assertEqual(response.data['results'], [])
+        
+        response = self.client.get(self.flight_requests_url, {'q': 'qu'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('q', response.data)
+
+class BulkReserveAPITest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.bulk_reserve_url = '/api/flight-requests/bulk-reserve/'
+        
+        self.client_user = User.objects.create_user(
+            username='client',
+            email='client@example.com',
+            password='clientpass123',
+            role='client'
+        )
+        
+        self.operator_user = User.objects.create_user(
+            username='operator',
+            email='operator@example.com',
+            password='operatorpass123',
+            role='operator'
+        )
+        
+        self.destination = Destination.objects.create(
+            name='Quito',
+            code='UIO',
+            is_active=True
+        )
+        
+        self.pending = FlightRequest.objects.bulk_create([
+            FlightRequest(
+                user=self.client_user,
+                destination=self.destination,
+                travel_date=date.today() + timedelta(days=7),
+                status='pending'
+            )
+            for _ in range(30)
+        ])
+        self.cancelled = FlightRequest.objects.create(
+            user=self.client_user,
+            destination=self.destination,
+            travel_date=date.today() + timedelta(days=7),
+            status='cancelled'
+        )
+
+    @patch('flight_requests.tasks.dispatch_email_outbox')
+    def test_bulk_reserve_reports_each_id(self, mock_send_batch):
+        """Test reserving pending requests with conflicts and unknown ids"""
+        self.client.force_authenticate(user=self.operator_user)
+        ids = [self.pending[0].id, self.cancelled.id, 999999, self.pending[1].id]
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.bulk_reserve_url,
+                {'ids': ids, 'operator_notes': 'Lote de la mañana'},
+                format='json'
+            )
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['reserved'], 2)
+        self.assertEqual(
+            [item['result'] for item in response.data['results']],
+            ['reserved', 'conflict', 'not_found', 'reserved']
+        )
+        
+        reserved = FlightRequest.objects.get(id=self.pending[0].id)
+        self.assertEqual(reserved.status, 'reserved')
+        self.assertEqual(reserved.reserved_by, self.operator_user)
+        self.assertIsNotNone(reserved.reserved_at)
+        self.assertEqual(reserved.operator_notes, 'Lote de la mañana')
+        
+        self.assertEqual(
+            sorted(OutboxEmail.objects.filter(kind='reservation_confirmation').values_list('flight_request_id', flat=True)),
+            sorted([self.pending[0].id, self.pending[1].id])
+        )
+        mock_send_batch.apply_async.assert_called_once()
+
+    @patch('flight_requests.tasks.dispatch_email_outbox')
+    def test_bulk_reserve_query_count_is_constant(self, mock_send_batch):
+        """Test that 30 reservations cost the same queries as one"""
+        self.client.force_authenticate(user=self.operator_user)
+        
+        # SAVEPOINT, SELECT ... FOR UPDATE, UPDATE, stat counters upsert,
+        # outbox INSERT, RELEASE SAVEPOINT
+        with self.assertNumQueries(6):
+            response = self.client.post(
+                self.bulk_reserve_url,
+                {'ids': [flight_request.id for flight_request in self.pending]},
+                format='json'
+            )
+        
+        self.assertEqual(response.data['reserved'], 30)
+
+    @patch('flight_requests.tasks.dispatch_email_outbox')
+    def test_bulk_reserve_already_reserved_is_conflict(self, mock_send_batch):
+        """Test that a second bulk reserve of the same ids conflicts"""
+        self.client.force_authenticate(user=self.operator_user)
+        data = {'ids': [self.pending[0].id]}
+        
+        self.client.post(self.bulk_reserve_url, data, format='json')
+        response = self.client.post(self.bulk_reserve_url, data, format='json')
+        
+        self.assertEqual(response.data['reserved'], 0)
+        self.assertEqual(response.data['results'][0]['result'], 'conflict')
+
+    def test_bulk_reserve_as_client_forbidden(self):
+        """Test that clients cannot bulk reserve"""
+        self.client.force_authenticate(user=self.client_user)
+        
+        response = self.client.post(
+            self.bulk_reserve_url, {'ids': [self.pending[0].id]}, format='json'
+        )
+        
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_bulk_reserve_requires_ids(self):
+        """Test validation of the payload"""
+        self.client.force_authenticate(user=self.operator_user)
+        
+        response = self.client.post(self.bulk_reserve_url, {'ids': []}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_cancel_and_complete(self):
+        """Test the other bulk transitions share the bulk reserve contract"""
+        self.client.force_authenticate(user=self.operator_user)
+        with patch('flight_requests.tasks.dispatch_email_outbox'):
+            self.client.post(self.bulk_reserve_url, {'ids': [self.pending[0].id]}, format='json')
+        
+        response = self.client.post(
+            '/api/flight-requests/bulk-complete/',
+            {'ids': [self.pending[0].id, self.pending[1].id]},
+            format='json'
+        )
+        self.assertEqual(response.data['completed'], 1)
+        self.assertEqual(
+            [item['result'] for item in response.data['results']],
+            ['completed', 'conflict']
+        )
+        
+        response = self.client.post(
+            '/api/flight-requests/bulk-cancel/',
+            {'ids': [self.pending[1].id, self.cancelled.id], 'operator_notes': 'Sin cupo'},
+            format='json'
+        )
+        self.assertEqual(response.data['cancelled'], 1)
+        cancelled = FlightRequest.objects.get(id=self.pending[1].id)
+        self.assertEqual(cancelled.status, 'cancelled')
+        self.assertEqual(cancelled.operator_notes, 'Sin cupo')
+        self.assertEqual(cancelled.status_changed_by, self.operator_user)
+
+class ClaimAPITest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.claim_url = '/api/flight-requests/claim/'
+        
+        self.client_user = User.objects.create_user(
+            username='client',
+            email='client@example.com',
+            password='clientpass123',
+            role='client'
+        )
+        
+        self.operator_user = User.objects.create_user(
+            username='operator',
+            email='operator@example.com',
+            password='operatorpass123',
+            role='operator'
+        )
+        
+        self.other_operator = User.objects.create_user(
+            username='operator2',
+            email='operator2@example.com',
+            password='operatorpass123',
+            role='operator'
+        )
+        
+        self.destination = Destination.objects.create(
+            name='Quito',
+            code='UIO',
+            is_active=True
+        )
+        
+        # Travel dates in reverse creation order, so urgency differs from age
+        self.flight_requests = [
+            FlightRequest.objects.create(
+                user=self.client_user,
+                destination=self.destination,
+                travel_date=date.today() + timedelta(days=30 - i),
+                status='pending'
+            )
+            for i in range(6)
+        ]
+
+    def claim(self, user, count):
+        self.client.force_authenticate(user=user)
+        return self.client.post(self.claim_url, {'count': count}, format='json')
+
+    def test_claim_orders_by_travel_date(self):
+        """Test that the most urgent requests are claimed first"""
+        response = self.claim(self.operator_user, 3)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        claimed = [item['id'] for item in response.data['results']]
+        self.assertEqual(claimed, [fr.id for fr in reversed(self.flight_requests)][:3])
+        self.assertTrue(all(item['claimed_by'] == self.operator_user.id for item in response.data['results']))
+
+    def test_operators_receive_disjoint_work(self):
+        """Test that a second operator does not get leased requests"""
+        first = {item['id'] for item in self.claim(self.operator_user, 4).data['results']}
+        second = {item['id'] for item in self.claim(self.other_operator, 4).data['results']}
+        
+        self.assertEqual(len(first), 4)
+        self.assertEqual(len(second), 2)
+        self.assertFalse(first & second)
+
+    def test_expired_leases_are_reclaimed(self):
+        """Test that an expired lease can be claimed by another operator"""
+        self.claim(self.operator_user, 6)
+        FlightRequest.objects.update(claimed_until=timezone.now() - timedelta(seconds=1))
+        
+        response = self.claim(self.other_operator, 6)
+        
+        self.assertEqual(len(response.data['results']), 6)
+
+    @patch('flight_requests.tasks.dispatch_email_outbox')
+    def test_reserve_claimed_by_other_operator_conflicts(self, mock_dispatch):
+        """Test that reserving a request leased to someone else fails"""
+        claimed_id = self.claim(self.operator_user, 1).data['results'][0]['id']
+        
+        self.client.force_authenticate(user=self.other_operator)
+        response = self.client.post(f'/api/flight-requests/{claimed_id}/reserve/')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        
+        self.client.force_authenticate(user=self.operator_user)
+        response = self.client.post(f'/api/flight-requests/{claimed_id}/reserve/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['claimed_by'])
+
+    def test_claim_as_client_forbidden(self):
+        """Test that clients cannot claim requests"""
+        response = self.claim(self.client_user, 1)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+class ClaimSkipLockedTest(TransactionTestCase):
+    """
+    Uses real transactions so a second connection can hold row locks
+    """
+    def setUp(self):
+        self.client = APIClient()
+        
+        client_user = User.objects.create_user(
+            username='client',
+            email='client@example.com',
+            password='clientpass123',
+            role='client'
+        )
+        
+        self.operator_user = User.objects.create_user(
+            username='operator',
+            email='operator@example.com',
+            password='operatorpass123',
+            role='operator'
+        )
+        
+        destination = Destination.objects.create(name='Quito', code='UIO', is_active=True)
+        self.flight_requests = [
+            FlightRequest.objects.create(
+                user=client_user,
+                destination=destination,
+                travel_date=date.today() + timedelta(days=7 + i),
+                status='pending'
+            )
+            for i in range(3)
+        ]
+
+    def test_claim_skips_rows_locked_by_another_transaction(self):
+        """Test that claiming does not wait on rows another operator holds"""
+        locked = threading.Event()
+        release = threading.Event()
+        
+        def hold_lock():
+            with transaction.atomic():
+                FlightRequest.objects.select_for_update().filter(
+                    id=self.flight_requests[0].id
+                ).exists()
+                locked.set()
+                release.wait(10)
+            connection.close()
+        
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        try:
+            locked.wait(10)
+            self.client.force_authenticate(user=self.operator_user)
+            response = self.client.post('/api/flight-requests/claim/', {'count': 3}, format='json')
+        finally:
+            release.set()
+            holder.join()
+        
+        claimed = [item['id'] for item in response.data['results']]
+        self.assertEqual(claimed, [fr.id for fr in self.flight_requests[1:]])
+
+class FlightRequestConditionalGetTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.flight_requests_url = '/api/flight-requests/'
+        
+        self.client_user = User.objects.create_user(
+            username='client',
+            email='client@example.com',
+            password='clientpass123',
+            role='client'
+        )
+        
+        self.operator_user = User.objects.create_user(
+            username='operator',
+            email='operator@example.com',
+            password='operatorpass123',
+            role='operator'
+        )
+        
+        self.destination = Destination.objects.create(
+            name='Quito',
+            code='UIO',
+            is_active=True
+        )
+        
+        self.flight_request = FlightRequest.objects.create(
+            user=self.client_user,
+            destination=self.destination,
+            travel_date=date.today() + timedelta(days=7),
+            status='pending'
+        )
+
+    def test_list_not_modified_until_a_row_changes(self):
+        """Test that an unchanged list answers 304 without serializing"""
+        self.client.force_authenticate(user=self.client_user)
+        response = self.client.get(self.flight_requests_url)
+        etag = response.headers['ETag']
+        
+        # The validators come from the cache, so no query runs at all
+        with self.assertNumQueries(0):
+            response = self.client.get(self.flight_requests_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        self.flight_request.notes = 'Cambio de planes'
+        self.flight_request.save()
+        
+        response = self.client.get(self.flight_requests_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_new_row_changes_etag(self):
+        """Test that creating a request invalidates the list ETag"""
+        self.client.force_authenticate(user=self.operator_user)
+        etag = self.client.get(f'{self.flight_requests_url}pending/').headers['ETag']
+        
+        FlightRequest.objects.create(
+            user=self.client_user,
+            destination=self.destination,
+            travel_date=date.today() + timedelta(days=9),
+            status='pending'
+        )
+        
+        response = self.client.get(f'{self.flight_requests_url}pending/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def list_etags(self, *users):
+        etags = {}
+        for user in users:
+            self.client.force_authenticate(user=user)
+            etags[user] = self.client.get(self.flight_requests_url).headers['ETag']
+        return etags
+    
+    def revalidated(self, etags):
+        """
+        Users among etags whose list changed since the ETag was taken
+        """
+        changed = set()
+        for user, etag in etags.items():
+            self.client.force_authenticate(user=user)
+            response = self.client.get(self.flight_requests_url, HTTP_IF_NONE_MATCH=etag)
+            if response.status_code == status.HTTP_200_OK:
+                changed.add(user)
+        return changed
+    
+    def test_update_owned_changes_etag_of_its_owners_only(self):
+        """Test that an update given its owners invalidates only their lists, without a lookup"""
+        other_user = User.objects.create_user(
+            username='other',
+            email='other@example.com',
+            password='otherpass123',
+            role='client'
+        )
+        etags = self.list_etags(self.client_user, other_user, self.operator_user)
+        
+        with self.assertNumQueries(1):
+            FlightRequest.objects.filter(pk=self.flight_request.pk).update_owned(
+                [self.client_user.pk], operator_notes='Revisado'
+            )
+        
+        self.assertEqual(self.revalidated(etags), {self.client_user, self.operator_user})
+    
+    def test_update_without_owners_changes_every_etag(self):
+        """Test that a plain queryset update invalidates every list instead of reading owners"""
+        other_user = User.objects.create_user(
+            username='other',
+            email='other@example.com',
+            password='otherpass123',
+            role='client'
+        )
+        etags = self.list_etags(self.client_user, other_user, self.operator_user)
+        
+        with self.assertNumQueries(1):
+            FlightRequest.objects.filter(pk=self.flight_request.pk).update(operator_notes='Revisado')
+        
+        self.assertEqual(self.revalidated(etags), {self.client_user, other_user, self.operator_user})
+    
+    def test_owner_edit_changes_etag(self):
+        """Test that editing the embedded owner invalidates their lists but a login does not"""
+        etags = self.list_etags(self.client_user, self.operator_user)
+        
+        self.client_user.save(update_fields=['last_login'])
+        self.assertEqual(self.revalidated(etags), set())
+        
+        self.client_user.first_name = 'Ana'
+        self.client_user.save()
+        self.assertEqual(self.revalidated(etags), {self.client_user, self.operator_user})
+    
+    def test_if_modified_since_alone_is_not_a_validator(self):
+        """Test that a renamed destination is never hidden behind If-Modified-Since"""
+        self.client.force_authenticate(user=self.client_user)
+        response = self.client.get(self.flight_requests_url)
+        self.assertNotIn('Last-Modified', response.headers)
+        
+        self.destination.name = 'San Francisco de Quito'
+        self.destination.save()
+        
+        response = self.client.get(self.flight_requests_url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['destination']['name'], 'San Francisco de Quito')
+    
+    def test_etag_differs_per_user(self):
+        """Test that clients and operators never share validators"""
+        self.client.force_authenticate(user=self.client_user)
+        client_etag = self.client.get(self.flight_requests_url).headers['ETag']
+        
+        self.client.force_authenticate(user=self.operator_user)
+        response = self.client.get(self.flight_requests_url, HTTP_IF_NONE_MATCH=client_etag)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+class AsyncReadAPITest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.async_client = AsyncClient()
+        
+        self.client_user = User.objects.create_user(
+            username='client',
+            email='client@example.com',
+            password='clientpass123',
+            role='client'
+        )
+        
+        self.operator_user = User.objects.create_user(
+            username='operator',
+            email='operator@example.com',
+            password='operatorpass123',
+            role='operator'
+        )
+        
+        self.destination = Destination.objects.create(
+            name='Quito',
+            code='UIO',
+            is_active=True
+        )
+        Destination.objects.create(name='Cuenca', code='CUE', is_active=False)
+        
+        self.flight_requests = [
+            FlightRequest.objects.create(
+                user=self.client_user,
+                destination=self.destination,
+                travel_date=date.today() + timedelta(days=7 + i),
+                status='pending'
+            )
+            for i in range(3)
+        ]
+        
+        self.client_token = Token.objects.create(user=self.client_user).key
+        self.operator_token = tokens.issue_token_pair(self.operator_user)['token']
+
+    def sync_get(self, url, authorization):
+        self.client.credentials(HTTP_AUTHORIZATION=authorization)
+        return self.client.get(url)
+
+    async def async_get(self, url, authorization=None, headers=None):
+        headers = dict(headers or {})
+        if authorization:
+            headers['Authorization'] = authorization
+        return await self.async_client.get(url, headers=headers)
+
+    async def test_responses_match_sync_endpoints(self):
+        """Test that every async endpoint returns the sync payload"""
+        cases = [
+            ('destinations/destinations/', f'Token {self.client_token}'),
+            ('destinations/destinations/active-destinations/', f'Token {self.client_token}'),
+            ('flight-requests/', f'Token {self.client_token}'),
+            ('flight-requests/?page_size=2', f'Bearer {self.operator_token}'),
+            ('flight-requests/?q=quito&page_size=2', f'Bearer {self.operator_token}'),
+            (f'flight-requests/{self.flight_requests[0].id}/', f'Token {self.client_token}'),
+            ('flight-requests/pending/', f'Bearer {self.operator_token}'),
+        ]
+        for path, authorization in cases:
+            with self.subTest(path=path):
+                expected = await sync_to_async(self.sync_get)(f'/api/{path}', authorization)
+                response = await self.async_get(f'/api/async/{path}', authorization)
+                
+                self.assertEqual(expected.status_code, 200)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response.json(),
+                    self.replace_host(expected.json(), '/api/', '/api/async/')
+                )
+
+    def replace_host(self, data, old, new):
+        # Cursor links point at the endpoint that served the page
+        if isinstance(data, dict) and 'next' in data:
+            for key in ('next', 'previous'):
+                if data[key]:
+                    data[key] = data[key].replace(old, new)
+        return data
+
+    async def test_if_modified_since_alone_is_not_a_validator(self):
+        """Test that async lists answer If-Modified-Since with the full body"""
+        headers = {'If-Modified-Since': http_date(time.time() + 60)}
+        for path in ('flight-requests/', 'destinations/destinations/active-destinations/'):
+            with self.subTest(path=path):
+                response = await self.async_get(f'/api/async/{path}', f'Token {self.client_token}', headers)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn('Last-Modified', response.headers)
+
+    async def test_cursor_pages(self):
+        """Test that the async list follows its own cursor links"""
+        authorization = f'Bearer {self.operator_token}'
+        response = await self.async_get('/api/async/flight-requests/?page_size=2', authorization)
+        first = response.json()
+        self.assertIn('/api/async/flight-requests/', first['next'])
+        
+        response = await self.async_get(first['next'], authorization)
+        second = response.json()
+        ids = [item['id'] for item in first['results'] + second['results']]
+        self.assertEqual(sorted(ids), sorted(fr.id for fr in self.flight_requests))
+        self.assertIsNone(second['next'])
+
+    async def test_search_is_validated(self):
+        """Test that a too short ?q= gets the sync endpoint's 400 body"""
+        authorization = f'Bearer {self.operator_token}'
+        expected = await sync_to_async(self.sync_get)('/api/flight-requests/?q=qu', authorization)
+        response = await self.async_get('/api/async/flight-requests/?q=qu', authorization)
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), expected.json())
+
+    async def test_conditional_get(self):
+        """Test that async list responses carry validators and return 304"""
+        authorization = f'Token {self.client_token}'
+        response = await self.async_get('/api/async/flight-requests/', authorization)
+        self.assertIn('no-cache', response['Cache-Control'])
+        
+        response = await self.async_get(
+            '/api/async/flight-requests/', authorization, {'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_permissions(self):
+        """Test authentication and role checks of the async endpoints"""
+        response = await self.async_get('/api/async/flight-requests/')
+        self.assertEqual(response.status_code, 401)
+        
+        response = await self.async_get('/api/async/flight-requests/', 'Token invalid')
+        self.assertEqual(response.status_code, 401)
+        
+        response = await self.async_get('/api/async/flight-requests/pending/', f'Token {self.client_token}')
+        self.assertEqual(response.status_code, 403)
+        
+        other = await User.objects.acreate(username='other', email='other@example.com', role='client')
+        other_token = tokens.issue_token_pair(other)['token']
+        response = await self.async_get(
+            f'/api/async/flight-requests/{self.flight_requests[0].id}/', f'Bearer {other_token}'
+        )
+        self.assertEqual(response.status_code, 404)
+        
+        response = await self.async_client.post('/api/async/flight-requests/')
+        self.assertEqual(response.status_code, 405)
+
+class FlightRequestExportTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.export_url = '/api/flight-requests/export/'
+        
+        self.client_user = User.objects.create_user(
+            username='client',
+            email='client@example.com',
+            password='clientpass123',
+            role='client'
+        )
+        self.other_user = User.objects.create_user(
+            username='other',
+            email='other@example.com',
+            password='otherpass123',
+            role='client'
+        )
+        self.operator_user = User.objects.create_user(
+            username='operator',
+            email='operator@example.com',
+            password='operatorpass123',
+            role='operator'
+        )
+        
+        self.destination = Destination.objects.create(
+            name='Quito',
+            code='UIO',
+            is_active=True
+        )
+        
+        self.own_pending = FlightRequest.objects.create(
+            user=self.client_user,
+            destination=self.destination,
+            travel_date=date.today() + timedelta(days=5),
+            notes='Ventana, por favor'
+        )
+        self.own_reserved = FlightRequest.objects.create(
+            user=self.client_user,
+            destination=self.destination,
+            travel_date=date.today() + timedelta(days=20),
+            status='reserved'
+        )
+        self.other_pending = FlightRequest.objects.create(
+            user=self.other_user,
+            destination=self.destination,
+            travel_date=date.today() + timedelta(days=10)
+        )
+
+    def export(self, user, **params):
+        self.client.force_authenticate(user=user)
+        response = self.client.get(self.export_url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export_for_operator(self):
+        """Test that operators export every request as CSV"""
+        content = self.export(self.operator_user)
+        
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(
+            [int(row['id']) for row in rows],
+            [self.own_pending.id, self.own_reserved.id, self.other_pending.id]
+        )
+        self.assertEqual(rows[0]['user_email'], 'client@example.com')
+        self.assertEqual(rows[0]['destination_code'], 'UIO')
+        self.assertEqual(rows[0]['notes'], 'Ventana, por favor')
+
+    def test_client_exports_only_own_requests(self):
+        """Test that the export applies the same role filtering as the list"""
+        content = self.export(self.client_user)
+        
+        ids = [int(row['id']) for row in csv.DictReader(io.StringIO(content))]
+        self.assertEqual(ids, [self.own_pending.id, self.own_reserved.id])
+
+    def test_ndjson_export_with_filters(self):
+        """Test NDJSON output with status and travel date filters"""
+        content = self.export(
+            self.operator_user,
+            format='ndjson',
+            status='pending',
+            date_from=(date.today() + timedelta(days=6)).isoformat(),
+        )
+        
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.other_pending.id])
+        self.assertEqual(rows[0]['status'], 'pending')
+        self.assertEqual(rows[0]['travel_date'], self.other_pending.travel_date.isoformat())
+
+    def test_invalid_filters(self):
+        """Test that invalid filters are rejected before streaming"""
+        self.client.force_authenticate(user=self.operator_user)
+        
+        response = self.client.get(self.export_url, {'status': 'unknown'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        response = self.client.get(self.export_url, {
+            'date_from': date.today().isoformat(),
+            'date_to': (date.today() - timedelta(days=1)).isoformat(),
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class FlightRequestStatsAPITest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.stats_url = '/api/flight-requests/stats/'
+        
+        self.client_user = User.objects.create_user(
+            username='client',
+            email='client@example.com',
+            password='clientpass123',
+            role='client'
+        )
+        self.operator_user = User.objects.create_user(
+            username='operator',
+            email='operator@example.com',
+            password='operatorpass123',
+            role='operator'
+        )
+        
+        self.destination = Destination.objects.create(
+            name='Quito',
+            code='UIO',
+            is_active=True
+        )
+        self.flight_requests = [
+            FlightRequest.objects.create(
+                user=self.client_user,
+                destination=self.destination,
+                travel_date=date.today() + timedelta(days=3 + i)
+            )
+            for i in range(3)
+        ]
+
+    def test_stats_follow_bulk_reserve(self):
+        """Test that stats reflect reservations made through the API"""
+        self.client.force_authenticate(user=self.operator_user)
+        
+        with patch('flight_requests.tasks.dispatch_email_outbox'):
+            self.client.post('/api/flight-requests/bulk-reserve/', {
+                'ids': [self.flight_requests[0].id, self.flight_requests[1].id]
+            }, format='json')
+        
+        response = self.client.get(self.stats_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['by_status']['pending'], 1)
+        self.assertEqual(response.data['by_status']['reserved'], 2)
+        self.assertEqual(response.data['by_destination'][0]['code'], 'UIO')
+        self.assertEqual(response.data['upcoming']['next_7_days'], 3)
+
+    def test_stats_constant_queries(self):
+        """Test that the stats cost does not grow with the number of requests"""
+        self.client.force_authenticate(user=self.operator_user)
+        
+        with self.assertNumQueries(4):
+            self.client.get(self.stats_url)
+        
+        FlightRequest.objects.bulk_create([
+            FlightRequest(user=self.client_user, destination=self.destination, travel_date=date.today())
+            for _ in range(50)
+        ])
+        with self.assertNumQueries(4):
+            self.client.get(self.stats_url)
+
+    def test_stats_operator_only(self):
+        """Test that clients cannot read global stats"""
+        self.client.force_authenticate(user=self.client_user)
+        
+        response = self.client.get(self.stats_url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class JourneyBenchmarkTest(TransactionTestCase):
+    """
+    Uses real transactions so the benchmark threads see the destination
+    """
+    def test_report_covers_every_step(self):
+        """Test that a small run writes each step of the journey to the report"""
+        Destination.objects.create(name='Quito', code='UIO', is_active=True)
+        
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'report.json')
+            call_command(
+                'benchmark_api_journeys', journeys=4, concurrency=2, output=output, stdout=io.StringIO()
+            )
+            with open(output) as f:
+                report = json.load(f)
+        
+        self.assertEqual(report['errors'], 0)
+        self.assertEqual(
+            list(report['steps']), ['register', 'login', 'destinations', 'create', 'pending', 'reserve']
+        )
+        self.assertEqual(report['steps']['reserve']['requests'], 4)
+        self.assertGreater(report['steps']['reserve']['queries_per_request'], 0)
+        self.assertEqual(report['overall']['requests'], 24)
+        
+        # Users and requests created by the run are removed
+        self.assertFalse(User.objects.filter(email__startswith='loadtest-').exists())
+        self.assertFalse(FlightRequest.objects.exists())
@@ -0,0 +1,142 @@
+import os
+import unittest
+from datetime import date, timedelta
+from django.db import connection
+from django.test import TestCase
+from users.models import User
+from destinations.models import Destination
+from flight_requests.models import FlightRequest
+from flight_requests.pagination import rows_after
+
+SEED_ROWS = int(os.environ.get('QUERY_PLAN_SEED_ROWS', 1_000_000))
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'EXPLAIN plans are PostgreSQL-specific')
+class FlightRequestQueryPlanTest(TestCase):
+    """
+    Check that the hot FlightRequest predicates are served by the indexes
+    declared in FlightRequest.Meta on a realistically sized table.
+
+    Set QUERY_PLAN_SEED_ROWS to seed a smaller table on slow machines.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create([
+            User(username=f'user{i}', email=f'user{i}@example.com', role='client')
+            for i in range(1000)
+        ])
+        # Enough destinations that scanning them all costs more than their
+        # search index, as it does for users
+        cls.destinations = Destination.objects.bulk_create([
+            Destination(name=f'Destino {i}', code=f'{i:03d}')
+            for i in range(1000)
+        ])
+        cls.target_date = date.today() + timedelta(days=2)
+
+        user_ids = [user.id for user in cls.users]
+        destination_ids = [destination.id for destination in cls.destinations]
+        # ~5% pending, ~60% reserved (mostly already notified), rest closed;
+        # travel dates spread over a year around today.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {FlightRequest._meta.db_table} (
+                    user_id, destination_id, travel_date, status,
+                    notification_sent, created_at, updated_at
+                )
+                SELECT
+                    (%s::bigint[])[1 + i %% %s],
+                    (%s::bigint[])[1 + i %% %s],
+                    CURRENT_DATE + (i %% 365 - 180),
+                    CASE
+                        WHEN i %% 20 = 0 THEN 'pending'
+                        WHEN i %% 20 < 13 THEN 'reserved'
+                        WHEN i %% 20 < 17 THEN 'completed'
+                        ELSE 'cancelled'
+                    END,
+                    i %% 365 - 180 < 2,
+                    now() - make_interval(secs => %s - i),
+                    now()
+                FROM generate_series(1, %s) AS i
+                """,
+                [user_ids, len(user_ids), destination_ids, len(destination_ids), SEED_ROWS, SEED_ROWS],
+            )
+            # Tables joined by the queries need fresh statistics too, or the
+            # planner may take them as empty and drive the join from them
+            for model in (FlightRequest, User, Destination):
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+    def assertUsesIndex(self, queryset, *index_names):
+        """
+        Assert the plan reads the table through at least one of index_names
+        and return it
+        """
+        plan = queryset.explain()
+        self.assertTrue(any(name in plan for name in index_names), plan)
+        self.assertNotIn(f'Seq Scan on {FlightRequest._meta.db_table}', plan)
+        return plan
+
+    def test_pending_queue_uses_partial_index(self):
+        """Test the operator pending queue page"""
+        queryset = FlightRequest.objects.filter(status='pending').order_by('-created_at', '-id')[:21]
+        self.assertUsesIndex(queryset, 'flightreq_pending_idx')
+
+    def test_reminder_scan_uses_partial_index(self):
+        """Test the hourly reminder pass over today's and tomorrow's reminders"""
+        queryset = FlightRequest.objects.filter(
+            status='reserved',
+            travel_date__gte=self.target_date,
+            travel_date__lte=self.target_date + timedelta(days=1),
+            notification_sent=False
+        )
+        self.assertUsesIndex(queryset, 'flightreq_reminder_due_idx')
+
+    def test_client_listing_uses_user_index(self):
+        """Test a client's own requests ordered by creation"""
+        queryset = FlightRequest.objects.filter(user=self.users[0]).order_by('-created_at', '-id')[:21]
+        self.assertUsesIndex(queryset, 'flightreq_user_created_idx')
+
+    def test_operator_listing_uses_created_index(self):
+        """Test the operator listing page"""
+        queryset = FlightRequest.objects.order_by('-created_at', '-id')[:21]
+        self.assertUsesIndex(queryset, 'flightreq_created_idx')
+
+    def test_later_listing_page_uses_created_index(self):
+        """Test a page after a (created_at, id) cursor position"""
+        ordering = ('-created_at', '-id')
+        position = FlightRequest.objects.order_by(*ordering).values_list('created_at', 'id')[SEED_ROWS // 2]
+        queryset = FlightRequest.objects.filter(rows_after(ordering, position)).order_by(*ordering)[:21]
+        self.assertUsesIndex(queryset, 'flightreq_created_idx')
+
+    def test_search_uses_gin_indexes(self):
+        """Test the ?q= search over users, destinations and notes"""
+        # The matching users and destinations are looked up through their
+        # search indexes (the rank then joins the matched rows to them)
+        for text, index_name, model in (
+            ('user7@example.com', 'user_search_idx', User),
+            ('destino 123', 'destination_search_idx', Destination),
+        ):
+            with self.subTest(text=text):
+                plan = self.assertUsesIndex(FlightRequest.objects.search(text), 'flightreq_notes_search_idx')
+                self.assertIn(index_name, plan)
+                lookups = '\n'.join(init_plans(plan))
+                self.assertNotIn('Seq Scan', lookups, plan)
+                self.assertIn(f'on {model._meta.db_table}', lookups, plan)
+
+def init_plans(plan):
+    """
+    Text of each InitPlan node of an EXPLAIN plan, i.e. the subqueries
+    PostgreSQL runs once before the main query
+    """
+    nodes = []
+    lines = plan.splitlines()
+    for i, line in enumerate(lines):
+        if line.lstrip().startswith('InitPlan'):
+            indent = len(line) - len(line.lstrip())
+            node = [line]
+            for child in lines[i + 1:]:
+                if len(child) - len(child.lstrip()) <= indent:
+                    break
+                node.append(child)
+            nodes.append('\n'.join(node))
+    return nodes
@@ -1,15 +1,27 @@
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django_celery_results.models import TaskResult
+from django.test import SimpleTestCase, TestCase, override_settings
 from django.utils import timezone
 from datetime import date, timedelta
 from unittest.mock import patch, MagicMock
 from users.models import User
 from destinations.models import Destination
-from flight_requests.models import FlightRequest
+from flight_requests.models import FlightRequest, OutboxEmail
+from flight_requests import outbox, reminders
 from flight_requests.tasks import (
     send_flight_reminder_notification,
+    send_flight_reminder_batch,
     check_and_send_flight_reminders,
-    send_reservation_confirmation
+    schedule_flight_reminders,
+    send_reservation_confirmation,
+    send_reservation_confirmation_batch,
+    dispatch_email_outbox,
+    purge_email_outbox,
+    release_expired_claims
 )
+from users.tasks import purge_expired_sessions
+from evolutionflyapp.celery import app, purge_task_results
 
 class CeleryTasksTest(TestCase):
     def setUp(self):
@@ -37,23 +49,25 @@ class CeleryTasksTest(TestCase):
             status='reserved'
         )
 
-    @patch('flight_requests.tasks.send_mail')
-    def test_send_flight_reminder_notification_success(self, mock_send_mail):
+    def test_send_flight_reminder_notification_success(self):
         """Test successful flight reminder notification"""
         result = send_flight_reminder_notification(self.flight_request.id)
         
-        # Check that email was sent
-        mock_send_mail.assert_called_once()
+        # Check that the email was queued in the outbox
+        email = OutboxEmail.objects.get(flight_request=self.flight_request, kind='flight_reminder')
+        self.assertEqual(
+            email.idempotency_key,
+            outbox.reminder_key(self.flight_request.id, self.flight_request.travel_date)
+        )
         
         # Check that notification was marked as sent
         self.flight_request.refresh_from_db()
         self.assertTrue(self.flight_request.notification_sent)
         
         # Check return value
-        self.assertIn(f"Notification sent to {self.user.email}", result)
+        self.assertIn(f"Notification queued for {self.user.email}", result)
 
-    @patch('flight_requests.tasks.send_mail')
-    def test_send_flight_reminder_already_sent(self, mock_send_mail):
+    def test_send_flight_reminder_already_sent(self):
         """Test that reminder is not sent if already sent"""
         # Mark as already sent
         self.flight_request.notification_sent = True
@@ -61,14 +75,13 @@ class CeleryTasksTest(TestCase):
         
         result = send_flight_reminder_notification(self.flight_request.id)
         
-        # Email should not be sent
-        mock_send_mail.assert_not_called()
+        # Email should not be queued
+        self.assertFalse(OutboxEmail.objects.filter(kind='flight_reminder').exists())
         
         # Check log message
         self.assertIn(f"Notification already sent for flight request {self.flight_request.id}", result)
 
-    @patch('flight_requests.tasks.send_mail')
-    def test_send_flight_reminder_not_reserved(self, mock_send_mail):
+    def test_send_flight_reminder_not_reserved(self):
         """Test that reminder is not sent for non-reserved flights"""
         # Change status to pending
         self.flight_request.status = 'pending'
@@ -76,14 +89,13 @@ class CeleryTasksTest(TestCase):
         
         result = send_flight_reminder_notification(self.flight_request.id)
         
-        # Email should not be sent
-        mock_send_mail.assert_not_called()
+        # Email should not be queued
+        self.assertFalse(OutboxEmail.objects.filter(kind='flight_reminder').exists())
         
         # Check log message
         self.assertIn(f"Flight request {self.flight_request.id} is not reserved", result)
 
-    @patch('flight_requests.tasks.send_mail')
-    def test_send_flight_reminder_wrong_timing(self, mock_send_mail):
+    def test_send_flight_reminder_wrong_timing(self):
         """Test that reminder is not sent if not 2 days before"""
         # Change travel date to 5 days from now
         self.flight_request.travel_date = date.today() + timedelta(days=5)
@@ -91,8 +103,8 @@ class CeleryTasksTest(TestCase):
         
         result = send_flight_reminder_notification(self.flight_request.id)
         
-        # Email should not be sent
-        mock_send_mail.assert_not_called()
+        # Email should not be queued
+        self.assertFalse(OutboxEmail.objects.filter(kind='flight_reminder').exists())
         
         # Check log message
         self.assertIn(f"Flight request {self.flight_request.id} is 5 days away, not 2 days", result)
@@ -103,6 +115,7 @@ class CeleryTasksTest(TestCase):
         
         self.assertIn("Flight request 99999 not found", result)
 
+    @override_settings(FLIGHT_REMINDER_BATCH_SIZE=1)
     @patch('flight_requests.tasks.send_flight_reminder_notification')
     def test_check_and_send_flight_reminders(self, mock_send_reminder):
         """Test the periodic task that checks for reminders"""
@@ -141,25 +154,439 @@ class CeleryTasksTest(TestCase):
         # Should only call for request1
         mock_send_reminder.delay.assert_called_once_with(request1.id)
         
-        self.assertIn("Queued 1 notifications", result)
+        self.assertEqual(result['queued'], 1)
 
-    @patch('flight_requests.tasks.send_mail')
-    def test_send_reservation_confirmation(self, mock_send_mail):
-        """Test sending reservation confirmation email"""
+    def test_send_reservation_confirmation(self):
+        """Test queueing a reservation confirmation email"""
+        result = send_reservation_confirmation(self.flight_request.id)
         result = send_reservation_confirmation(self.flight_request.id)
         
-        # Check that email was sent
-        mock_send_mail.assert_called_once()
+        # Queued once, however many times the task runs
+        email = OutboxEmail.objects.get(flight_request=self.flight_request)
+        self.assertEqual(email.kind, 'reservation_confirmation')
+        self.assertIn("Queued 1 confirmations", result)
+
+class ReleaseExpiredClaimsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
         
-        # Check return value
-        self.assertIn(f"Confirmation sent to {self.user.email}", result)
+        self.destination = Destination.objects.create(
+            name='Quito',
+            code='UIO',
+            is_active=True
+        )
 
-    @patch('flight_requests.tasks.send_mail', side_effect=Exception('SMTP Error'))
-    def test_send_flight_reminder_email_failure(self, mock_send_mail):
-        """Test handling of email sending failure"""
-        with self.assertRaises(Exception):
-            send_flight_reminder_notification(self.flight_request.id)
+    def test_release_expired_claims(self):
+        """Test that only expired leases are released"""
+        now = timezone.now()
+        expired, active = [
+            FlightRequest.objects.create(
+                user=self.user,
+                destination=self.destination,
+                travel_date=date.today() + timedelta(days=7),
+                claimed_by=self.user,
+                claimed_until=claimed_until
+            )
+            for claimed_until in (now - timedelta(minutes=1), now + timedelta(minutes=5))
+        ]
         
-        # Notification should not be marked as sent
-        self.flight_request.refresh_from_db()
-        self.assertFalse(self.flight_request.notification_sent)
\ No newline at end of file
+        result = release_expired_claims()
+        
+        self.assertIn("Released 1 claims", result)
+        expired.refresh_from_db()
+        active.refresh_from_db()
+        self.assertIsNone(expired.claimed_by)
+        self.assertIsNone(expired.claimed_until)
+        self.assertEqual(active.claimed_by, self.user)
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db')
+class PurgeExpiredSessionsTest(TestCase):
+    def test_purge_expired_sessions(self):
+        """Test that only expired session rows are deleted"""
+        now = timezone.now()
+        Session.objects.create(session_key='expired', session_data='', expire_date=now - timedelta(days=1))
+        Session.objects.create(session_key='active', session_data='', expire_date=now + timedelta(days=1))
+        
+        purge_expired_sessions()
+        
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['active'])
+
+class FlightReminderBatchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123',
+            first_name='Test',
+            last_name='User'
+        )
+        
+        self.destination = Destination.objects.create(
+            name='Quito',
+            code='UIO',
+            is_active=True
+        )
+        
+        self.target_date = timezone.now().date() + timedelta(days=2)
+        self.flight_requests = FlightRequest.objects.bulk_create([
+            FlightRequest(
+                user=self.user,
+                destination=self.destination,
+                travel_date=self.target_date,
+                status='reserved'
+            )
+            for _ in range(5)
+        ])
+        self.ids = [flight_request.id for flight_request in self.flight_requests]
+
+    @override_settings(FLIGHT_REMINDER_BATCH_SIZE=2)
+    @patch('flight_requests.tasks.send_flight_reminder_batch')
+    def test_check_enqueues_chunks(self, mock_send_batch):
+        """Test that the periodic task enqueues one task per chunk"""
+        result = check_and_send_flight_reminders()
+        
+        chunks = [call.args[0] for call in mock_send_batch.delay.call_args_list]
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(sorted(sum(chunks, [])), sorted(self.ids))
+        self.assertEqual(result['queued'], 5)
+
+    def test_batch_queues_and_bulk_marks(self):
+        """Test that a batch is queued with one INSERT and one UPDATE"""
+        # SAVEPOINT, SELECT ... FOR UPDATE, outbox INSERT, bulk UPDATE,
+        # RELEASE SAVEPOINT
+        with self.assertNumQueries(5):
+            result = send_flight_reminder_batch(self.ids)
+        
+        self.assertEqual(OutboxEmail.objects.filter(kind='flight_reminder').count(), 5)
+        self.assertEqual(
+            FlightRequest.objects.filter(id__in=self.ids, notification_sent=True).count(), 5
+        )
+        self.assertIn("Queued 5 notifications, 0 skipped", result)
+
+    def test_batch_skips_ineligible_requests(self):
+        """Test that already notified or non-reserved requests are skipped"""
+        FlightRequest.objects.filter(id=self.ids[0]).update(notification_sent=True)
+        FlightRequest.objects.filter(id=self.ids[1]).update(status='cancelled')
+        
+        result = send_flight_reminder_batch(self.ids)
+        
+        self.assertIn("Queued 3 notifications, 2 skipped", result)
+        self.assertFalse(FlightRequest.objects.get(id=self.ids[1]).notification_sent)
+        self.assertFalse(OutboxEmail.objects.filter(flight_request_id__in=self.ids[:2]).exists())
+
+    def test_confirmation_batch_skips_unreserved(self):
+        """Test that bulk confirmations are only queued for reserved requests"""
+        FlightRequest.objects.filter(id__in=self.ids[:2]).update(status='pending')
+        
+        result = send_reservation_confirmation_batch(self.ids)
+        
+        self.assertEqual(OutboxEmail.objects.filter(kind='reservation_confirmation').count(), 3)
+        self.assertIn("Queued 3 confirmations, 2 skipped", result)
+
+@override_settings(
+    EMAIL_OUTBOX_BATCH_SIZE=2,
+    EMAIL_OUTBOX_MAX_ATTEMPTS=3,
+    EMAIL_OUTBOX_RETRY_BACKOFF=60,
+    EMAIL_OUTBOX_RETRY_BACKOFF_MAX=3600
+)
+class OutboxDispatchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.destination = Destination.objects.create(
+            name='Quito',
+            code='UIO',
+            is_active=True
+        )
+        self.flight_requests = FlightRequest.objects.bulk_create([
+            FlightRequest(
+                user=self.user,
+                destination=self.destination,
+                travel_date=date.today() + timedelta(days=2),
+                status='reserved'
+            )
+            for _ in range(5)
+        ])
+        outbox.enqueue('reservation_confirmation', {
+            flight_request.id: outbox.confirmation_key(flight_request.id)
+            for flight_request in self.flight_requests
+        })
+
+    @patch('flight_requests.outbox.get_connection')
+    def test_dispatch_shares_connection_across_batches(self, mock_get_connection):
+        """Test that every batch is sent over one connection and marked sent"""
+        connection = mock_get_connection.return_value
+        
+        result = dispatch_email_outbox()
+        
+        mock_get_connection.assert_called_once()
+        self.assertEqual(connection.send_messages.call_count, 5)
+        self.assertEqual(OutboxEmail.objects.filter(status='sent', attempts=1).count(), 5)
+        self.assertIn("Sent 5 emails, 0 failed", result)
+        
+        # Message-ID is derived from the idempotency key, so a resend after
+        # a crash carries the same one
+        message = connection.send_messages.call_args_list[0].args[0][0]
+        self.assertIn('reservation_confirmation.', message.extra_headers['Message-ID'])
+        
+        # Nothing left to send
+        self.assertIn("Sent 0 emails, 0 failed", dispatch_email_outbox())
+
+    @override_settings(
+        EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+        EMAIL_USE_TLS=False, EMAIL_HOST_USER='noreply@example.com', EMAIL_HOST_PASSWORD=''
+    )
+    @patch('django.core.mail.backends.smtp.smtplib.SMTP')
+    def test_dispatch_opens_one_smtp_session(self, mock_smtp):
+        """Test that a batch is sent over one SMTP session, reopened only after a failure"""
+        mock_smtp.return_value.sendmail.side_effect = [{}, Exception('SMTP Error'), {}, {}, {}]
+        
+        self.assertEqual(outbox.dispatch(), (4, 1))
+        
+        # The first session, and a new one after the failure closed it
+        self.assertEqual(mock_smtp.call_count, 2)
+        self.assertEqual(mock_smtp.return_value.sendmail.call_count, 5)
+        
+        mock_smtp.reset_mock()
+        mock_smtp.return_value.sendmail.side_effect = None
+        outbox.enqueue('flight_reminder', {
+            flight_request.id: outbox.reminder_key(flight_request.id, flight_request.travel_date)
+            for flight_request in self.flight_requests
+        })
+        self.assertEqual(outbox.dispatch(kinds=['flight_reminder']), (5, 0))
+        mock_smtp.assert_called_once()
+
+    @patch('flight_requests.outbox.get_connection')
+    def test_failure_is_retried_with_backoff(self, mock_get_connection):
+        """Test that a failed send only reschedules that email"""
+        connection = mock_get_connection.return_value
+        connection.send_messages.side_effect = [1, Exception('SMTP Error'), 1, 1, 1]
+        before = timezone.now()
+        
+        result = dispatch_email_outbox()
+        
+        self.assertIn("Sent 4 emails, 1 failed", result)
+        email = OutboxEmail.objects.get(status='pending')
+        self.assertEqual(email.attempts, 1)
+        self.assertEqual(email.last_error, 'SMTP Error')
+        self.assertGreaterEqual(email.next_attempt_at, before + timedelta(seconds=60))
+        
+        # Not due yet
+        connection.send_messages.side_effect = None
+        self.assertIn("Sent 0 emails, 0 failed", dispatch_email_outbox())
+
+    @patch('flight_requests.outbox.get_connection')
+    def test_failed_after_max_attempts(self, mock_get_connection):
+        """Test that an email stops being retried after the last attempt"""
+        mock_get_connection.return_value.send_messages.side_effect = Exception('SMTP Error')
+        
+        for _ in range(3):
+            dispatch_email_outbox()
+            OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        
+        self.assertEqual(OutboxEmail.objects.filter(status='failed', attempts=3).count(), 5)
+        self.assertIn("Sent 0 emails, 0 failed", dispatch_email_outbox())
+
+    @patch('flight_requests.outbox.get_connection')
+    def test_dispatch_only_sends_given_kinds(self, mock_get_connection):
+        """Test that a reminder dispatcher leaves confirmations to their own"""
+        outbox.enqueue('flight_reminder', {
+            self.flight_requests[0].id: outbox.reminder_key(
+                self.flight_requests[0].id, self.flight_requests[0].travel_date
+            )
+        })
+        
+        result = dispatch_email_outbox(kinds=['flight_reminder'])
+        
+        self.assertIn("Sent 1 emails, 0 failed", result)
+        self.assertEqual(
+            OutboxEmail.objects.filter(kind='reservation_confirmation', status='pending').count(), 5
+        )
+
+    @patch('flight_requests.tasks.dispatch_email_outbox')
+    def test_reminders_wake_their_own_dispatcher(self, mock_dispatch):
+        """Test that queued reminders are dispatched from the reminders queue"""
+        flight_request = self.flight_requests[0]
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            outbox.enqueue('flight_reminder', {
+                flight_request.id: outbox.reminder_key(flight_request.id, flight_request.travel_date)
+            })
+        
+        mock_dispatch.apply_async.assert_called_once_with(
+            kwargs={'kinds': ['flight_reminder']}, queue='reminders', priority=3
+        )
+
+    def test_claim_leases_batch(self):
+        """Test that claimed emails are not claimed again until the lease expires"""
+        now = timezone.now()
+        
+        first = outbox.claim(2, now)
+        second = outbox.claim(10, now)
+        
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 3)
+        self.assertFalse({email.id for email in first} & {email.id for email in second})
+        self.assertEqual(outbox.claim(10, now), [])
+        
+        # A dispatcher that died mid-send leaves its batch to be retried
+        expired = now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS + 1)
+        self.assertEqual(len(outbox.claim(10, expired)), 5)
+
+    def test_retry_delay_is_capped(self):
+        """Test the exponential backoff between attempts"""
+        self.assertEqual(outbox.retry_delay(1), 60)
+        self.assertEqual(outbox.retry_delay(3), 240)
+        self.assertEqual(outbox.retry_delay(20), 3600)
+
+    def test_purge_only_old_sent_emails(self):
+        """Test that purging keeps recent and unsent emails"""
+        old = timezone.now() - timedelta(days=31)
+        emails = list(OutboxEmail.objects.order_by('id'))
+        OutboxEmail.objects.filter(id__in=[emails[0].id, emails[1].id]).update(status='sent', sent_at=old)
+        OutboxEmail.objects.filter(id=emails[2].id).update(status='sent', sent_at=timezone.now())
+        OutboxEmail.objects.filter(id=emails[3].id).update(status='failed')
+        
+        result = purge_email_outbox()
+        
+        self.assertEqual(result, {'deleted': 2})
+        self.assertEqual(OutboxEmail.objects.count(), 3)
+
+@override_settings(FLIGHT_REMINDER_BATCH_SIZE=1, FLIGHT_REMINDER_SCHEDULE_WINDOW=3600)
+class FlightReminderSchedulingTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.destination = Destination.objects.create(
+            name='Quito',
+            code='UIO',
+            is_active=True
+        )
+        self.now = timezone.now()
+        self.today = self.now.date()
+
+    def reserve(self, travel_date, reserved_at):
+        return FlightRequest.objects.create(
+            user=self.user,
+            destination=self.destination,
+            travel_date=travel_date,
+            status='reserved',
+            reserved_at=reserved_at
+        )
+
+    def test_plan(self):
+        """Test which reminders are sent now, scheduled or left for later"""
+        travel_date = self.today + timedelta(days=2)
+        rows = [
+            (1, travel_date, self.now - timedelta(minutes=10)),
+            (2, travel_date, self.now + timedelta(minutes=30)),
+            (3, travel_date, self.now + timedelta(hours=3)),
+            (4, travel_date - timedelta(days=1), self.now - timedelta(minutes=10)),
+        ]
+        send_now, scheduled = reminders.plan(rows, self.now)
+        
+        # Crossing midnight moves the reminder day, so only compare when
+        # the shifted times stay on today
+        if (self.now - timedelta(minutes=10)).date() == (self.now + timedelta(hours=3)).date() == self.today:
+            self.assertEqual(send_now, [1])
+            self.assertEqual(scheduled, [(2, reminders.reminder_eta(travel_date, rows[1][2]))])
+
+    @patch('flight_requests.tasks.send_flight_reminder_notification')
+    def test_reservation_schedules_reminder_with_eta(self, mock_send_reminder):
+        """Test that a reservation due within the window is queued with its ETA"""
+        reserved_at = self.now + timedelta(minutes=30)
+        flight_request = self.reserve(reserved_at.date() + timedelta(days=2), reserved_at)
+        far = self.reserve(self.today + timedelta(days=30), self.now)
+        
+        result = schedule_flight_reminders([flight_request.id, far.id])
+        
+        mock_send_reminder.apply_async.assert_called_once_with(
+            (flight_request.id,), eta=reminders.reminder_eta(flight_request.travel_date, reserved_at)
+        )
+        mock_send_reminder.delay.assert_not_called()
+        self.assertIn("Queued 0 notifications, scheduled 1", result)
+
+    @patch('flight_requests.tasks.send_flight_reminder_notification')
+    def test_hourly_pass_reconciles_missed_reminders(self, mock_send_reminder):
+        """Test that the pass sends overdue reminders and skips cancelled ones"""
+        reserved_at = self.now - timedelta(seconds=1)
+        missed = self.reserve(reserved_at.date() + timedelta(days=2), reserved_at)
+        cancelled = self.reserve(reserved_at.date() + timedelta(days=2), reserved_at)
+        cancelled.status = 'cancelled'
+        cancelled.save()
+        
+        result = check_and_send_flight_reminders()
+        
+        mock_send_reminder.delay.assert_called_once_with(missed.id)
+        self.assertEqual(result['queued'], 1)
+
+    def test_cancelled_reservation_reminder_is_ignored(self):
+        """Test that a reminder queued before a cancellation sends nothing"""
+        flight_request = self.reserve(self.today + timedelta(days=2), self.now)
+        FlightRequest.objects.filter(id=flight_request.id).update(status='cancelled')
+        
+        send_flight_reminder_notification(flight_request.id)
+        
+        self.assertFalse(OutboxEmail.objects.filter(kind='flight_reminder').exists())
+
+class CeleryRoutingTest(SimpleTestCase):
+    def route(self, name):
+        options = app.amqp.router.route({}, name)
+        return options['queue'].name, options.get('priority')
+
+    def test_notification_tasks_have_their_own_queues(self):
+        """Test that confirmations never share a queue with reminder bursts"""
+        self.assertEqual(self.route('flight_requests.tasks.dispatch_email_outbox'), ('confirmations', 0))
+        self.assertEqual(self.route('flight_requests.tasks.send_reservation_confirmation'), ('confirmations', 0))
+        self.assertEqual(self.route('flight_requests.tasks.send_flight_reminder_notification'), ('reminders', 3))
+        self.assertEqual(self.route('flight_requests.tasks.send_flight_reminder_batch'), ('reminders', 6))
+        self.assertEqual(self.route('flight_requests.tasks.reconcile_flight_request_stats'), ('maintenance', 9))
+
+    def test_every_task_is_routed_to_a_declared_queue(self):
+        """Test that no app task falls back to the default queue"""
+        declared = {queue.name for queue in settings.CELERY_TASK_QUEUES}
+        names = [name for name in app.tasks if name.startswith(('flight_requests.', 'users.'))]
+        
+        self.assertTrue(names)
+        for name in names:
+            queue, priority = self.route(name)
+            self.assertIn(queue, declared - {'celery'}, name)
+            self.assertIsNotNone(priority, name)
+
+class TaskResultStorageTest(TestCase):
+    def test_fire_and_forget_tasks_skip_results(self):
+        """Test that per-request and per-minute tasks store no result"""
+        for name in (
+            'flight_requests.tasks.send_flight_reminder_notification',
+            'flight_requests.tasks.send_flight_reminder_batch',
+            'flight_requests.tasks.schedule_flight_reminders',
+            'flight_requests.tasks.send_reservation_confirmation',
+            'flight_requests.tasks.dispatch_email_outbox',
+            'flight_requests.tasks.release_expired_claims',
+        ):
+            self.assertTrue(app.tasks[name].ignore_result, name)
+        self.assertFalse(app.tasks['flight_requests.tasks.check_and_send_flight_reminders'].ignore_result)
+
+    @override_settings(TASK_RESULT_RETENTION_DAYS=7)
+    def test_purge_task_results_in_chunks(self):
+        """Test that only results older than the retention are deleted"""
+        now = timezone.now()
+        for i in range(5):
+            TaskResult.objects.create(task_id=f'old-{i}', status='SUCCESS')
+        TaskResult.objects.create(task_id='recent', status='SUCCESS')
+        TaskResult.objects.filter(task_id__startswith='old-').update(date_done=now - timedelta(days=8))
+        
+        result = purge_task_results(chunk_size=2)
+        
+        self.assertEqual(result, {'deleted': 5})
+        self.assertEqual(list(TaskResult.objects.values_list('task_id', flat=True)), ['recent'])
@@ -0,0 +1,150 @@
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+from . import tokens
+from .models import User
+
+def token_cache_key(key):
+    # Hash the key so raw tokens never appear in the cache backend
+    return 'auth_token:' + hashlib.sha256(key.encode()).hexdigest()
+
+def invalidate_token(key):
+    cache.delete(token_cache_key(key))
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that keeps the token -> user resolution in the
+    cache for AUTH_TOKEN_CACHE_TIMEOUT seconds.
+
+    Entries are dropped when the token is deleted (logout, user deletion)
+    or its user is saved, see users.signals.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        token = cache.get(cache_key)
+        
+        if token is None:
+            model = self.get_model()
+            try:
+                token = model.objects.select_related('user').get(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            cache.set(cache_key, token, timeout=settings.AUTH_TOKEN_CACHE_TIMEOUT)
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return (token.user, token)
+
+    async def aauthenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        token = await cache.aget(cache_key)
+        
+        if token is None:
+            model = self.get_model()
+            try:
+                token = await model.objects.select_related('user').aget(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            await cache.aset(cache_key, token, timeout=settings.AUTH_TOKEN_CACHE_TIMEOUT)
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return (token.user, token)
+
+class SignedTokenAuthentication(TokenAuthentication):
+    """
+    Authenticate "Authorization: Bearer <access token>" headers issued by
+    users.tokens.issue_token_pair.
+
+    The user is built from the token claims without touching the database:
+    id, role and superuser flag are set and every other field is deferred,
+    so it is only loaded if a view actually reads it. request.auth holds the
+    token claims.
+
+    The claims may be stale (the user could have been demoted or
+    deactivated since the token was issued), so the user is read-only:
+    views that write to it must load it from the database.
+    """
+    keyword = 'Bearer'
+
+    def authenticate_credentials(self, key):
+        claims = self.get_claims(key)
+
+        # Opt-in: costs one cache read per request
+        if settings.SIGNED_TOKEN_CHECK_REVOCATION and tokens.is_revoked(claims):
+            raise exceptions.AuthenticationFailed('El token ha sido revocado.')
+
+        return (self.get_user(claims), claims)
+
+    async def aauthenticate_credentials(self, key):
+        claims = self.get_claims(key)
+
+        if settings.SIGNED_TOKEN_CHECK_REVOCATION and await tokens.ais_revoked(claims):
+            raise exceptions.AuthenticationFailed('El token ha sido revocado.')
+
+        return (self.get_user(claims), claims)
+
+    def get_claims(self, key):
+        try:
+            return tokens.load_access_token(key)
+        except tokens.InvalidToken as exc:
+            raise exceptions.AuthenticationFailed(str(exc))
+
+    def get_user(self, claims):
+        loaded = {
+            'id': claims['uid'],
+            'role': claims['role'],
+            'is_superuser': claims['su'],
+            'is_active': True,
+        }
+        # from_db expects values in model field order
+        field_names = [f.attname for f in User._meta.concrete_fields if f.attname in loaded]
+        user = User.from_db(None, field_names, [loaded[name] for name in field_names])
+        user.from_token_claims = True
+        return user
+
+def _get_key(authentication, auth):
+    # Same header checks as TokenAuthentication.authenticate
+    if len(auth) == 1:
+        raise exceptions.AuthenticationFailed(_('Invalid token header. No credentials provided.'))
+    elif len(auth) > 2:
+        raise exceptions.AuthenticationFailed(_('Invalid token header. Token string should not contain spaces.'))
+    try:
+        return auth[1].decode()
+    except UnicodeError:
+        raise exceptions.AuthenticationFailed(_('Invalid token header. Token string should not contain invalid characters.'))
+
+async def aauthenticate(request):
+    """
+    Resolve the user for a plain Django async view, trying the same schemes
+    in the same order as DEFAULT_AUTHENTICATION_CLASSES: signed Bearer
+    token, session, authtoken key.
+
+    Returns None for anonymous requests and raises AuthenticationFailed
+    for invalid credentials.
+    """
+    auth = get_authorization_header(request).split()
+    keyword = auth[0].lower() if auth else None
+
+    if keyword == SignedTokenAuthentication.keyword.lower().encode():
+        authentication = SignedTokenAuthentication()
+        user, _claims = await authentication.aauthenticate_credentials(_get_key(authentication, auth))
+        return user
+
+    # Session reads never need CSRF checks: async views are read-only
+    user = await request.auser()
+    if user.is_authenticated and user.is_active:
+        return user
+
+    if keyword == CachedTokenAuthentication.keyword.lower().encode():
+        authentication = CachedTokenAuthentication()
+        user, _token = await authentication.aauthenticate_credentials(_get_key(authentication, auth))
+        return user
+
+    return None
@@ -1,6 +1,15 @@
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 from django.db import models
 
+def search_vector():
+    """
+    Document searched by flight request search; filters must use this exact
+    expression for PostgreSQL to match it against user_search_idx
+    """
+    return SearchVector('first_name', 'last_name', 'email', config='simple')
+
 class User(AbstractUser):
     """
     Custom User model with role-based access
@@ -28,16 +37,30 @@ class User(AbstractUser):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Set by users.authentication.SignedTokenAuthentication
+    from_token_claims = False
+    
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
     
     class Meta:
         verbose_name = 'Usuario'
         verbose_name_plural = 'Usuarios'
+        indexes = [
+            GinIndex(search_vector(), name='user_search_idx'),
+        ]
         
     def __str__(self):
         return f"{self.get_full_name()} ({self.email})"
     
+    def save(self, *args, **kwargs):
+        # Users built from signed token claims carry the role and flags the
+        # token was issued with, which may be stale; saving them would write
+        # those values back over the row
+        if self.from_token_claims:
+            raise ValueError('Cannot save a user built from token claims; load it from the database first.')
+        super().save(*args, **kwargs)
+    
     def is_client(self):
         return self.role == 'client'
     
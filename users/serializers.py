@@ -30,6 +30,11 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
 class UserLoginSerializer(serializers.Serializer):
     email = serializers.EmailField()
     password = serializers.CharField(write_only=True)
+    session = serializers.BooleanField(
+        required=False,
+        default=False,
+        help_text='Crear también una sesión de Django (API navegable)'
+    )
     
     def validate(self, attrs):
         email = attrs.get('email')
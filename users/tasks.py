@@ -0,0 +1,16 @@
+from importlib import import_module
+from celery import shared_task
+from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+@shared_task(ignore_result=True)
+def purge_expired_sessions():
+    """
+    Delete expired sessions from the configured session backend
+    """
+    engine = import_module(settings.SESSION_ENGINE)
+    engine.SessionStore.clear_expired()
+    logger.info('Expired sessions purged')
+    return 'Expired sessions purged'
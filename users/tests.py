@@ -1,9 +1,17 @@
 import pytest
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.contrib.sessions.models import Session
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from datetime import date, timedelta
 from users.models import User
+from users import tokens
+from users.authentication import SignedTokenAuthentication
+from destinations.models import Destination
+from flight_requests.models import FlightRequest
 
 class UserModelTest(TestCase):
     def setUp(self):
@@ -79,3 +87,244 @@ class UserModelTest(TestCase):
         
         with self.assertRaises(Exception):
             User.objects.create_user(**duplicate_data)
+
+class CachedTokenAuthenticationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='operator',
+            email='operator@example.com',
+            password='testpass123',
+            role='operator'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = '/api/destinations/destinations/active-destinations/'
+
+    def test_cached_token_costs_no_queries(self):
+        """Test that a warm token and payload cache need no DB work"""
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_logout_invalidates_token(self):
+        """Test that a logged out token stops authenticating immediately"""
+        self.client.get(self.url)
+        
+        response = self.client.post('/api/auth/logout/')
+        self.assertEqual(response.status_code, 200)
+        
+        response = self.client.get(self.url)
+        self.assertIn(response.status_code, (401, 403))
+
+    def test_deactivation_invalidates_token(self):
+        """Test that deactivating a user is seen on the next request"""
+        self.client.get(self.url)
+        
+        self.user.is_active = False
+        self.user.save()
+        
+        response = self.client.get(self.url)
+        self.assertIn(response.status_code, (401, 403))
+
+    def test_role_change_invalidates_cached_user(self):
+        """Test that a role change is not served from the cache"""
+        self.client.get('/api/flight-requests/pending/')
+        
+        self.user.role = 'client'
+        self.user.save()
+        
+        response = self.client.get('/api/flight-requests/pending/')
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db')
+class LoginSessionTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+
+    def test_token_login_creates_no_session(self):
+        """Test that a plain API login only returns a token"""
+        response = self.client.post('/api/auth/login/', {
+            'email': 'test@example.com',
+            'password': 'testpass123'
+        }, format='json')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('token', response.data)
+        self.assertFalse(Session.objects.exists())
+        self.assertNotIn('sessionid', response.cookies)
+        
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+
+    def test_session_login_is_opt_in(self):
+        """Test that session=true also logs the user into a session"""
+        response = self.client.post('/api/auth/login/', {
+            'email': 'test@example.com',
+            'password': 'testpass123',
+            'session': True
+        }, format='json')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Session.objects.count(), 1)
+        self.assertIn('sessionid', response.cookies)
+
+@override_settings(AUTH_TOKEN_MODE='signed')
+class SignedTokenAuthenticationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.operator = User.objects.create_user(
+            username='operator',
+            email='operator@example.com',
+            password='testpass123',
+            role='operator'
+        )
+        self.client_user = User.objects.create_user(
+            username='client',
+            email='client@example.com',
+            password='testpass123',
+            role='client'
+        )
+        destination = Destination.objects.create(name='Lima', code='LIM')
+        self.flight_request = FlightRequest.objects.create(
+            user=self.client_user,
+            destination=destination,
+            travel_date=date.today() + timedelta(days=10)
+        )
+        self.client = APIClient()
+
+    def login(self, email):
+        response = self.client.post('/api/auth/login/', {
+            'email': email,
+            'password': 'testpass123'
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_login_issues_signed_tokens(self):
+        """Test that signed mode issues a Bearer token pair and no authtoken row"""
+        data = self.login('operator@example.com')
+        
+        self.assertEqual(data['token_type'], 'Bearer')
+        self.assertIn('refresh', data)
+        self.assertFalse(Token.objects.filter(user=self.operator).exists())
+
+    def test_access_token_needs_no_queries(self):
+        """Test that an access token authorizes an object without loading the user"""
+        token = tokens.issue_token_pair(self.operator)['token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        
+        # One query for the flight request itself
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/flight-requests/{self.flight_request.id}/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_client_cannot_read_other_requests(self):
+        """Test that the role claim is enforced"""
+        other = User.objects.create_user(
+            username='other',
+            email='other@example.com',
+            password='testpass123'
+        )
+        token = tokens.issue_token_pair(other)['token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        
+        response = self.client.get(f'/api/flight-requests/{self.flight_request.id}/')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get('/api/flight-requests/pending/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_expired_and_tampered_tokens_rejected(self):
+        """Test that expired or modified access tokens fail with 401"""
+        with override_settings(ACCESS_TOKEN_LIFETIME=-1):
+            expired = tokens.issue_token_pair(self.operator)['token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {expired}')
+        self.assertEqual(self.client.get('/api/flight-requests/').status_code, 401)
+        
+        token = tokens.issue_token_pair(self.client_user)['token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token[:-2]}xx')
+        self.assertEqual(self.client.get('/api/flight-requests/').status_code, 401)
+
+    def test_refresh_rotates_tokens(self):
+        """Test that a refresh token can be used once"""
+        data = self.login('client@example.com')
+        
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': data['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.data['token'], data['token'])
+        
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': data['refresh']}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_refresh_rejects_inactive_user(self):
+        """Test that refresh re-checks the user in the database"""
+        data = self.login('client@example.com')
+        self.client_user.is_active = False
+        self.client_user.save()
+        
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': data['refresh']}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_logout_revokes_tokens(self):
+        """Test that logout puts the refresh token on the revocation list"""
+        data = self.login('client@example.com')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {data["token"]}')
+        
+        response = self.client.post('/api/auth/logout/', {'refresh': data['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        
+        self.client.credentials()
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': data['refresh']}, format='json')
+        self.assertEqual(response.status_code, 401)
+        
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {data["token"]}')
+        with override_settings(SIGNED_TOKEN_CHECK_REVOCATION=True):
+            self.assertEqual(self.client.get('/api/flight-requests/').status_code, 401)
+
+    def test_profile_update_ignores_stale_claims(self):
+        """Test that a profile PUT with an old token cannot restore the role or active flag"""
+        token = tokens.issue_token_pair(self.operator)['token']
+        self.operator.role = 'client'
+        self.operator.save()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        
+        response = self.client.put('/api/auth/profile/', {'first_name': 'Nuevo'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.operator.refresh_from_db()
+        self.assertEqual(self.operator.role, 'client')
+        self.assertEqual(self.operator.first_name, 'Nuevo')
+        
+        self.operator.is_active = False
+        self.operator.save()
+        response = self.client.put('/api/auth/profile/', {'first_name': 'Otro'}, format='json')
+        self.assertEqual(response.status_code, 401)
+        self.operator.refresh_from_db()
+        self.assertFalse(self.operator.is_active)
+        self.assertEqual(self.operator.first_name, 'Nuevo')
+
+    def test_profile_loads_the_row_once(self):
+        """Test that a signed-token profile GET reads the user in one query"""
+        token = tokens.issue_token_pair(self.client_user)['token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/auth/profile/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['email'], 'client@example.com')
+
+    def test_claims_user_is_read_only(self):
+        """Test that a user built from token claims cannot be saved"""
+        claims = tokens.load_access_token(tokens.issue_token_pair(self.operator)['token'])
+        user = SignedTokenAuthentication().get_user(claims)
+        
+        with self.assertRaises(ValueError):
+            user.save()
@@ -0,0 +1,71 @@
+import time
+import uuid
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+
+ACCESS_SALT = 'users.tokens.access'
+REFRESH_SALT = 'users.tokens.refresh'
+
+class InvalidToken(Exception):
+    pass
+
+def _dump(claims, salt, lifetime):
+    claims = dict(claims, jti=uuid.uuid4().hex, exp=int(time.time()) + lifetime)
+    return signing.dumps(claims, salt=salt, compress=True)
+
+def _load(token, salt):
+    try:
+        claims = signing.loads(token, salt=salt)
+    except signing.BadSignature:
+        raise InvalidToken('Firma de token inválida.')
+    if claims.get('exp', 0) <= time.time():
+        raise InvalidToken('El token ha expirado.')
+    return claims
+
+def issue_token_pair(user):
+    """
+    Return a signed access token and refresh token for user.
+
+    The access token carries everything needed to authorize a request
+    (user id, role, superuser flag), so it is verified from its signature
+    alone. The refresh token only identifies the user and is checked against
+    the database and the revocation list when it is exchanged.
+    """
+    access = _dump(
+        {'uid': user.pk, 'role': user.role, 'su': user.is_superuser},
+        ACCESS_SALT, settings.ACCESS_TOKEN_LIFETIME
+    )
+    refresh = _dump({'uid': user.pk}, REFRESH_SALT, settings.REFRESH_TOKEN_LIFETIME)
+    return {
+        'token': access,
+        'refresh': refresh,
+        'token_type': 'Bearer',
+        'expires_in': settings.ACCESS_TOKEN_LIFETIME,
+    }
+
+def load_access_token(token):
+    return _load(token, ACCESS_SALT)
+
+def load_refresh_token(token):
+    claims = _load(token, REFRESH_SALT)
+    if is_revoked(claims):
+        raise InvalidToken('El token ha sido revocado.')
+    return claims
+
+def revoked_cache_key(jti):
+    return f'revoked_token:{jti}'
+
+def revoke(claims):
+    """
+    Put a token on the revocation list until it would have expired anyway
+    """
+    remaining = int(claims['exp'] - time.time())
+    if remaining > 0:
+        cache.set(revoked_cache_key(claims['jti']), True, timeout=remaining)
+
+def is_revoked(claims):
+    return cache.get(revoked_cache_key(claims['jti'])) is not None
+
+async def ais_revoked(claims):
+    return await cache.aget(revoked_cache_key(claims['jti'])) is not None
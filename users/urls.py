@@ -6,6 +6,7 @@ app_name = 'users'
 urlpatterns = [
     path('register/', views.register_user, name='register'),
     path('login/', views.login_user, name='login'),
+    path('token/refresh/', views.refresh_token, name='token-refresh'),
     path('logout/', views.logout_user, name='logout'),
     path('profile/', views.user_profile, name='profile'),
 ]
\ No newline at end of file
@@ -2,12 +2,23 @@ from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
-from django.contrib.auth import login, logout
+from django.conf import settings
+from django.contrib.auth import login, logout, user_logged_in
 from .serializers import (
     UserRegistrationSerializer, UserLoginSerializer, 
     UserSerializer, UserProfileSerializer
 )
 from .models import User
+from . import tokens
+
+def token_response_data(user):
+    """
+    Credentials returned on register/login, depending on AUTH_TOKEN_MODE
+    """
+    if settings.AUTH_TOKEN_MODE == 'signed':
+        return tokens.issue_token_pair(user)
+    token, created = Token.objects.get_or_create(user=user)
+    return {'token': token.key}
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
@@ -16,10 +27,9 @@ def register_user(request):
     serializer = UserRegistrationSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.save()
-        token, created = Token.objects.get_or_create(user=user)
         return Response({
             'user': UserSerializer(user).data,
-            'token': token.key
+            **token_response_data(user)
         }, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -30,18 +40,32 @@ def login_user(request):
     serializer = UserLoginSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.validated_data['user']
-        login(request, user)
-        token, created = Token.objects.get_or_create(user=user)
+        if serializer.validated_data['session']:
+            login(request, user)
+        else:
+            # Token clients never send the session cookie back, so don't
+            # write a session row; still fire the signal (last_login)
+            user_logged_in.send(sender=user.__class__, request=request, user=user)
         return Response({
             'user': UserSerializer(user).data,
-            'token': token.key
+            **token_response_data(user)
         }, status=status.HTTP_200_OK)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def logout_user(request):
-    """Logout user and delete token"""
+    """Logout user and delete or revoke its tokens"""
+    if isinstance(request.auth, dict):
+        # Signed access token: revoke it and the refresh token sent with it
+        tokens.revoke(request.auth)
+        try:
+            claims = tokens.load_refresh_token(request.data.get('refresh', ''))
+        except tokens.InvalidToken:
+            claims = None
+        if claims and claims['uid'] == request.user.pk:
+            tokens.revoke(claims)
+    
     try:
         request.user.auth_token.delete()
     except:
@@ -49,16 +73,41 @@ def logout_user(request):
     logout(request)
     return Response({'message': 'Logged out successfully'}, status=status.HTTP_200_OK)
 
+@api_view(['POST'])
+@permission_classes([permissions.AllowAny])
+def refresh_token(request):
+    """Exchange a refresh token for a new access/refresh token pair"""
+    try:
+        claims = tokens.load_refresh_token(request.data.get('refresh', ''))
+    except tokens.InvalidToken as exc:
+        return Response({'message': str(exc)}, status=status.HTTP_401_UNAUTHORIZED)
+    
+    user = User.objects.filter(pk=claims['uid'], is_active=True).first()
+    if user is None:
+        return Response({'message': 'Usuario inactivo o eliminado.'}, status=status.HTTP_401_UNAUTHORIZED)
+    
+    # Refresh tokens are single use
+    tokens.revoke(claims)
+    return Response(tokens.issue_token_pair(user), status=status.HTTP_200_OK)
+
 @api_view(['GET', 'PUT'])
 @permission_classes([permissions.IsAuthenticated])
 def user_profile(request):
     """Get or update user profile"""
+    user = request.user
+    if request.method == 'PUT' or user.from_token_claims:
+        # A user built from signed token claims defers every profile field
+        # and may be stale; read the row as it is now in one query
+        user = User.objects.filter(pk=request.user.pk, is_active=True).first()
+        if user is None:
+            return Response({'message': 'Usuario inactivo o eliminado.'}, status=status.HTTP_401_UNAUTHORIZED)
+    
     if request.method == 'GET':
-        serializer = UserProfileSerializer(request.user)
+        serializer = UserProfileSerializer(user)
         return Response(serializer.data)
     
     elif request.method == 'PUT':
-        serializer = UserProfileSerializer(request.user, data=request.data, partial=True)
+        serializer = UserProfileSerializer(user, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data)